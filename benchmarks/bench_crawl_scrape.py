@@ -0,0 +1,206 @@
+# bench_crawl_scrape.py -- Offline throughput benchmark for the mapper and the scrape worker.
+# Starts the generated site from site_farm.py in a subprocess, routes every
+# *.farm.test request made in this process to it (a requests transport adapter
+# rewrites https://host/path to the local server and keeps the Host header),
+# then runs:
+#   map          mapper.map_domain on the farm homepage (sitemap + BFS); with
+#                --fused it also saves the crawled pages to the worker's page store
+#   scrape cold  the /scrape code path (worker.get_or_build_pack) over the mapped
+#                URLs in scrape_all-sized batches, against an empty worker DB (or,
+#                with --fused, reusing the pages the mapper captured)
+#   scrape warm  the same batches again with force_refresh, so pages are
+#                revalidated with their validators (304s unless --no-304)
+# and reports wall time, pages/s, requests and bytes served, 304s, and CPU time
+# per page (this process only; the farm's own CPU is not counted).
+# Usage: python benchmarks/bench_crawl_scrape.py
+#        python benchmarks/bench_crawl_scrape.py --pages 3000 --latency-ms 30 --concurrency 8
+#        python benchmarks/bench_crawl_scrape.py --no-304 --no-traps --skip-map
+#        python benchmarks/bench_crawl_scrape.py --fused
+
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "mapper"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from site_farm import FARM_DOMAIN, FARM_HOMEPAGE, Farm, add_farm_arguments, farm_options, serve_options  # noqa: E402
+
+SCRAPE_BATCH = 100
+
+
+# Sends requests for farm hosts to the local farm server over plain HTTP,
+# keeping the original host in the Host header. Other hosts pass through.
+class _FarmAdapter(HTTPAdapter):
+    def __init__(self, port, **kwargs):
+        self.port = port
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        host = (parts.hostname or "").lower()
+        if host == FARM_DOMAIN or host.endswith("." + FARM_DOMAIN):
+            request.headers["Host"] = host
+            query = f"?{parts.query}" if parts.query else ""
+            request.url = f"http://127.0.0.1:{self.port}{parts.path or '/'}{query}"
+        return super().send(request, **kwargs)
+
+
+# Mounts _FarmAdapter on every requests.Session created from here on, which
+# covers the mapper's and the worker's per-thread sessions.
+def _route_farm_hosts(port):
+    original_init = requests.Session.__init__
+
+    def init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        adapter = _FarmAdapter(port, pool_maxsize=32)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    requests.Session.__init__ = init
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_farm(options, port):
+    proc = multiprocessing.Process(target=serve_options, args=(options, port), daemon=True)
+    proc.start()
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/__stats", timeout=1)
+            return proc
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"Site farm failed to start on port {port}")
+
+
+def _farm_stats(port, reset=False):
+    stats = requests.get(f"http://127.0.0.1:{port}/__stats", timeout=5).json()
+    if reset:
+        requests.get(f"http://127.0.0.1:{port}/__reset", timeout=5)
+    return stats
+
+
+# Runs fn() and returns (result, wall_s, cpu_s, farm stats for the run).
+def _measure(port, fn):
+    _farm_stats(port, reset=True)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    result = fn()
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    return result, wall, cpu, _farm_stats(port)
+
+
+def _scrape_all(get_or_build_pack, urls, fetch_workers, reuse_within_s=0):
+    pages = 0
+    errors = []
+    for start in range(0, len(urls), SCRAPE_BATCH):
+        batch = urls[start:start + SCRAPE_BATCH]
+        _hit, pack, _unchanged, batch_errors = get_or_build_pack(
+            FARM_HOMEPAGE,
+            [{"url": url} for url in batch],
+            rate_limit_ms=0,
+            timeout_s=30,
+            force_refresh=True,
+            client_has_pack=False,
+            max_workers=fetch_workers,
+            reuse_within_s=reuse_within_s,
+        )
+        pages += len(pack)
+        errors.extend(batch_errors)
+    return pages, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark map_domain and the scrape worker against a local site farm.")
+    add_farm_arguments(parser)
+    parser.add_argument("--max-pages", type=int, default=None, help="BFS page budget (default: unlimited)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Mapper fetches in flight")
+    parser.add_argument("--per-host", type=int, default=2, help="Mapper requests in flight per host")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Worker fetch threads per batch")
+    parser.add_argument("--scrape-limit", type=int, default=None, help="Scrape at most this many URLs")
+    parser.add_argument("--skip-map", action="store_true", help="Scrape the farm's own URL list instead of mapping")
+    parser.add_argument("--skip-scrape", action="store_true", help="Only run the mapper")
+    parser.add_argument("--fused", action="store_true",
+                        help="Map with page capture and let the cold scrape reuse the captured pages")
+    args = parser.parse_args()
+
+    options = farm_options(args)
+    farm = Farm(**options)
+    port = _free_port()
+    server = _start_farm(options, port)
+    _route_farm_hosts(port)
+
+    tmp_dir = tempfile.TemporaryDirectory(prefix="lpbd_bench_")
+    # The worker picks its database when worker_service is first imported.
+    os.environ["LPBD_WORKER_DB"] = str(Path(tmp_dir.name) / "worker_state.db")
+
+    print(f"Farm: {farm.page_count()} pages on {len(farm.hosts)} host(s), "
+          f"latency {args.latency_ms:g}+{args.jitter_ms:g} ms, traps={'off' if args.no_traps else 'on'}, "
+          f"304={'off' if args.no_304 else 'on'}\n")
+
+    rows = []
+    try:
+        urls = farm.urls()
+        if not args.skip_map:
+            from mapper import map_domain
+
+            result, wall, cpu, stats = _measure(port, lambda: map_domain(
+                FARM_HOMEPAGE, max_pages=args.max_pages, delay=0,
+                concurrency=args.concurrency, per_host=args.per_host, checkpoint_every=0,
+                fused=args.fused,
+            ))
+            if result["status"] != "success":
+                raise RuntimeError(f"map_domain failed: {result.get('message')}")
+            urls = result["urls"]
+            rows.append(("map", result["crawl_pages_fetched"], wall, cpu, stats))
+            print(f"\nMapped {result['found_count']} URLs "
+                  f"({result['sitemap_count']} from sitemaps, {len(result.get('traps') or [])} trap(s), "
+                  f"{result['pages_captured']} page(s) captured).\n")
+
+        if not args.skip_scrape:
+            from worker_service.worker import get_or_build_pack
+
+            urls = urls[:args.scrape_limit] if args.scrape_limit else urls
+            # Reuse only applies to the cold pass; the warm pass always revalidates.
+            reuse_within_s = 3600 if args.fused and not args.skip_map else 0
+            for label, reuse in (("scrape cold", reuse_within_s), ("scrape warm", 0)):
+                (pages, errors), wall, cpu, stats = _measure(
+                    port, lambda: _scrape_all(get_or_build_pack, urls, args.fetch_workers, reuse),
+                )
+                rows.append((label, pages, wall, cpu, stats))
+                if errors:
+                    print(f"{label}: {len(errors)} error(s), e.g. {errors[0]['url']}: {errors[0]['error']}")
+    finally:
+        server.terminate()
+        server.join()
+        tmp_dir.cleanup()
+
+    print(f"  {'':<12} {'pages':>7} {'wall s':>8} {'pages/s':>9} {'requests':>9} "
+          f"{'304s':>6} {'KB served':>10} {'KB/page':>8} {'CPU ms/page':>12}")
+    for label, pages, wall, cpu, stats in rows:
+        per_page = max(1, pages)
+        print(f"  {label:<12} {pages:>7} {wall:>8.2f} {pages / wall if wall else 0:>9.1f} "
+              f"{stats['requests']:>9} {stats['not_modified']:>6} {stats['bytes'] / 1024:>10.0f} "
+              f"{stats['bytes'] / 1024 / per_page:>8.1f} {cpu * 1000 / per_page:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# bench_extract.py -- Per-page HTML extraction benchmark for the scraper worker.
+# Compares the single-pass lxml extractor (worker._extract_page) with the
+# previous BeautifulSoup path (_page_title + _normalize_text on response.text,
+# two html.parser trees plus a find_all(True) class/id scan).
+# Usage: python benchmarks/bench_extract.py
+#        python benchmarks/bench_extract.py --pages 200 --paragraphs 120
+#        python benchmarks/bench_extract.py --html-dir saved_pages/
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bs4 import BeautifulSoup
+
+from worker_service.worker import (
+    _SITE_CHROME_PATTERNS,
+    _content_quality_check,
+    _extract_page,
+)
+
+
+# -- previous implementation (baseline) ------------------------------------
+
+def _legacy_normalize_text(html_text):
+    soup = BeautifulSoup(html_text, "html.parser")
+    for tag in soup(["script", "style", "noscript", "nav", "footer", "aside"]):
+        tag.decompose()
+    for el in soup.find_all(True):
+        if el.name in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            continue
+        attrs = getattr(el, "attrs", None)
+        if not isinstance(attrs, dict):
+            continue
+        cls = attrs.get("class")
+        if cls is not None:
+            if isinstance(cls, str):
+                cls = [cls]
+            cls_lower = " ".join(c.lower() for c in cls)
+            if any(p in cls_lower for p in _SITE_CHROME_PATTERNS):
+                el.decompose()
+                continue
+        el_id = attrs.get("id")
+        if el_id is not None:
+            id_lower = el_id.lower()
+            if any(p in id_lower for p in _SITE_CHROME_PATTERNS):
+                el.decompose()
+    return " ".join(soup.get_text(" ", strip=True).split())
+
+
+def _legacy_page_title(html_text):
+    soup = BeautifulSoup(html_text, "html.parser")
+    if soup.title and soup.title.string:
+        return soup.title.string.strip()
+    return ""
+
+
+def _legacy_extract(url, content, content_type):
+    # requests' response.text: header charset or ISO-8859-1 for text/*.
+    charset = "iso-8859-1"
+    for part in (content_type or "").split(";"):
+        key, _, value = part.strip().partition("=")
+        if key.lower() == "charset" and value:
+            charset = value
+    html_text = content.decode(charset, errors="replace")
+    title = _legacy_page_title(html_text)
+    normalized_text = _legacy_normalize_text(html_text)
+    return title, normalized_text, _content_quality_check(url, title, normalized_text)
+
+
+# -- synthetic pages -------------------------------------------------------
+
+WORDS = (
+    "student financial aid scholarship grant tuition deadline campus office "
+    "apply eligibility award semester program support services counseling "
+    "housing meal plan veteran accessibility employment work study fafsa"
+).split()
+
+
+def _sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+
+def build_page(rng, paragraphs):
+    nav = "".join(f'<li class="menu-item"><a href="/s{i}">Section {i}</a></li>' for i in range(40))
+    body = []
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            body.append(f"<h2>Heading {i}</h2>")
+        body.append(f'<div class="content-block"><p>{_sentence(rng)} <b>{_sentence(rng)}</b></p></div>')
+    sidebar = "".join(f"<p>{_sentence(rng)}</p>" for _ in range(8))
+    html = f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Financial Aid &amp; Scholarships</title>
+<style>body {{ font-family: sans-serif; }}</style><script>var x = 1;</script></head>
+<body>
+<header class="site-header"><div id="masthead">University</div></header>
+<nav class="navbar"><ul>{nav}</ul></nav>
+<div class="breadcrumb"><a href="/">Home</a> / Aid</div>
+<main><h1>Financial Aid</h1>{''.join(body)}</main>
+<div id="sidebar-right">{sidebar}</div>
+<!-- tracking comment -->
+<footer><p>Copyright</p></footer>
+</body></html>"""
+    return html.encode("utf-8")
+
+
+def load_pages(args):
+    if args.html_dir:
+        files = sorted(Path(args.html_dir).glob("*.htm*"))
+        return [(f.as_uri(), f.read_bytes(), None) for f in files]
+    rng = random.Random(args.seed)
+    return [
+        (f"https://bench.example.edu/page{i}", build_page(rng, args.paragraphs), "text/html; charset=utf-8")
+        for i in range(args.pages)
+    ]
+
+
+def _time_per_page(fn, pages, repeat):
+    timings = []
+    outputs = []
+    for url, content, content_type in pages:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = fn(url, content, content_type)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+        outputs.append(out)
+    return timings, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker HTML extraction.")
+    parser.add_argument("--pages", type=int, default=100, help="Synthetic pages to generate")
+    parser.add_argument("--paragraphs", type=int, default=80, help="Content blocks per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page (best is kept)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--html-dir", type=str, default=None, help="Benchmark saved .html files instead")
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        print("No pages to benchmark.")
+        return
+    avg_kb = sum(len(c) for _u, c, _t in pages) / len(pages) / 1024
+    print(f"Pages: {len(pages)} (avg {avg_kb:.1f} KB)\n")
+
+    legacy_t, legacy_out = _time_per_page(_legacy_extract, pages, args.repeat)
+    new_t, new_out = _time_per_page(_extract_page, pages, args.repeat)
+
+    print(f"  {'':<22} {'mean ms':>9} {'median ms':>10} {'p95 ms':>8}")
+    for label, ts in (("bs4 html.parser (old)", legacy_t), ("lxml single pass", new_t)):
+        ms = sorted(t * 1000 for t in ts)
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        print(f"  {label:<22} {statistics.mean(ms):>9.2f} {statistics.median(ms):>10.2f} {p95:>8.2f}")
+    print(f"\n  Speedup (mean): {statistics.mean(legacy_t) / statistics.mean(new_t):.1f}x")
+
+    same = sum(1 for a, b in zip(legacy_out, new_out) if a == b)
+    print(f"  Identical (title, text, verdict): {same}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
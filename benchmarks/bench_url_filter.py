@@ -0,0 +1,197 @@
+# bench_url_filter.py -- Link-filtering micro-benchmark for the mapper's crawl hot path.
+# Compares the previous per-link string loops (one substring search per
+# EXCLUDED_PATH_FRAGMENTS entry, one endswith per EXCLUDED_SUBDOMAINS and
+# SKIP_EXTENSIONS entry) with the precompiled matcher in mapper._is_excluded_url,
+# and per-link clean_and_join/is_allowed_host with the per-crawl href cache used
+# by extract_same_domain_link_texts.
+# Usage: python benchmarks/bench_url_filter.py
+#        python benchmarks/bench_url_filter.py --pages 500 --links 300
+#        python benchmarks/bench_url_filter.py --mapped mapped_pages.json
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "mapper"))
+
+from mapper import (  # noqa: E402
+    BENEFIT_HUB_PATHS,
+    EXCLUDED_PATH_FRAGMENTS,
+    EXCLUDED_SUBDOMAINS,
+    SKIP_EXTENSIONS,
+    _LANG_CODES,
+    _is_excluded_url,
+    clean_and_join,
+    get_root_host,
+    is_allowed_host,
+)
+
+
+# -- previous implementation (baseline) ------------------------------------
+
+def _legacy_is_excluded_url(url):
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    path = parsed.path.lower()
+    for sub in EXCLUDED_SUBDOMAINS:
+        if host == sub or host.endswith("." + sub):
+            return True
+    for frag in EXCLUDED_PATH_FRAGMENTS:
+        if frag in path:
+            return True
+    parts = path.strip("/").split("/")
+    if parts:
+        lang_base = parts[0].split("-")[0]
+        if lang_base in _LANG_CODES and len(parts) > 1:
+            return True
+    return False
+
+
+def _legacy_clean_and_join(base_url, href):
+    full_url = urljoin(base_url, href)
+    parsed = urlparse(full_url)
+    if parsed.scheme not in {"http", "https"}:
+        return None
+    clean_url = f"https://{parsed.netloc}{parsed.path}"
+    lower_path = parsed.path.lower()
+    if any(lower_path.endswith(ext) for ext in SKIP_EXTENSIONS):
+        return None
+    return clean_url.rstrip("/") or clean_url
+
+
+def _normalize_links(base_url, hrefs, root_host, clean, cache=None):
+    out = []
+    for href in hrefs:
+        if cache is not None and href in cache:
+            normalized = cache[href]
+        else:
+            normalized = clean(base_url, href)
+            if normalized and not is_allowed_host(urlparse(normalized).netloc, root_host):
+                normalized = None
+            if cache is not None:
+                cache[href] = normalized
+        out.append(normalized)
+    return out
+
+
+# -- synthetic link set ----------------------------------------------------
+
+SECTIONS = [p.strip("/") for p in BENEFIT_HUB_PATHS] + [
+    "news", "about", "academics", "research", "library", "athletics", "alumni", "it",
+]
+SUBDOMAINS = ["www", "admissions", "finaid", "library", "it", "my", "calendar", "careers"]
+
+
+# One hub page's hrefs: a nav bar and footer repeated on every page, plus
+# body links that mix content pages, event/calendar noise, translated copies,
+# documents, other subdomains and off-site links.
+def build_page_hrefs(rng, nav, links):
+    body = []
+    for _ in range(links):
+        roll = rng.random()
+        section = rng.choice(SECTIONS)
+        if roll < 0.45:
+            body.append(f"/{section}/{rng.choice(SECTIONS)}-{rng.randint(1, 400)}")
+        elif roll < 0.55:
+            body.append(f"/events/{rng.randint(2024, 2026)}/{rng.randint(1, 12)}/{rng.randint(1, 28)}")
+        elif roll < 0.62:
+            body.append(f"/{rng.choice(['es', 'zh-hans', 'pt-br', 'vi'])}/{section}")
+        elif roll < 0.68:
+            body.append(f"/{section}/forms/form-{rng.randint(1, 90)}.pdf")
+        elif roll < 0.85:
+            body.append(f"https://{rng.choice(SUBDOMAINS)}.example.edu/{section}/page-{rng.randint(1, 200)}")
+        elif roll < 0.92:
+            body.append(f"https://www.example.edu/{section}/page-{rng.randint(1, 200)}/")
+        elif roll < 0.96:
+            body.append(f"https://twitter.com/example{rng.randint(1, 5)}")
+        else:
+            body.append(f"mailto:office{rng.randint(1, 30)}@example.edu")
+    return nav + body
+
+
+def load_link_set(args):
+    if args.mapped:
+        data = json.loads(Path(args.mapped).read_text(encoding="utf-8"))
+        urls = [u for info in data.get("domains", {}).values() for u in info.get("urls", [])]
+        # Real mapped URLs, chunked into "pages" of --links each.
+        base = next(iter(data.get("domains", {})), "https://www.example.edu")
+        pages = [urls[i:i + args.links] for i in range(0, len(urls), args.links)]
+        return base, pages
+    rng = random.Random(args.seed)
+    nav = [f"/{section}" for section in SECTIONS] + ["/", "/login", "/my-account", "/calendar"]
+    return "https://www.example.edu", [build_page_hrefs(rng, nav, args.links) for _ in range(args.pages)]
+
+
+def _best_of(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mapper link normalization and exclusion.")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic hub pages to generate")
+    parser.add_argument("--links", type=int, default=200, help="Body links per synthetic page")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant (best is kept)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mapped", type=str, default=None, help="Use URLs from a mapped_pages.json instead")
+    args = parser.parse_args()
+
+    base_url, pages = load_link_set(args)
+    root_host = get_root_host(base_url)
+    total = sum(len(p) for p in pages)
+    print(f"Pages: {len(pages)} | Links: {total} ({len({h for p in pages for h in p})} distinct)\n")
+
+    # Link normalization across a crawl: per link vs. shared href cache.
+    def legacy_normalize():
+        return [_normalize_links(base_url, hrefs, root_host, _legacy_clean_and_join) for hrefs in pages]
+
+    def cached_normalize():
+        cache = {}
+        return [_normalize_links(base_url, hrefs, root_host, clean_and_join, cache) for hrefs in pages]
+
+    norm_old_t, norm_old = _best_of(legacy_normalize, args.repeat)
+    norm_new_t, norm_new = _best_of(cached_normalize, args.repeat)
+
+    # Exclusion check over every normalized link, duplicates included (as each
+    # page reports them). The new matcher is timed with and without its memo.
+    urls = [u for page in norm_old for u in page if u]
+    uncached = _is_excluded_url.__wrapped__
+
+    def memoized():
+        _is_excluded_url.cache_clear()
+        return [_is_excluded_url(u) for u in urls]
+
+    excl_old_t, excl_old = _best_of(lambda: [_legacy_is_excluded_url(u) for u in urls], args.repeat)
+    excl_new_t, excl_new = _best_of(lambda: [uncached(u) for u in urls], args.repeat)
+    excl_memo_t, excl_memo = _best_of(memoized, args.repeat)
+
+    print(f"  {'':<34} {'total ms':>9} {'us/link':>8} {'speedup':>8}")
+    rows = (
+        ("normalize: per link (old)", norm_old_t, total, norm_old_t),
+        ("normalize: per-crawl href cache", norm_new_t, total, norm_old_t),
+        ("exclude: string loops (old)", excl_old_t, len(urls), excl_old_t),
+        ("exclude: compiled matcher", excl_new_t, len(urls), excl_old_t),
+        ("exclude: compiled + memo", excl_memo_t, len(urls), excl_old_t),
+    )
+    for label, elapsed, count, baseline in rows:
+        print(f"  {label:<34} {elapsed * 1000:>9.1f} {elapsed / max(1, count) * 1e6:>8.2f} "
+              f"{baseline / elapsed:>7.1f}x")
+
+    print(f"\n  Identical normalized links: {norm_old == norm_new}")
+    print(f"  Identical exclusion verdicts: {excl_old == excl_new == excl_memo} "
+          f"({sum(excl_old)} of {len(urls)} excluded)")
+
+
+if __name__ == "__main__":
+    main()
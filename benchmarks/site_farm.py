@@ -0,0 +1,291 @@
+# site_farm.py -- Generated university-style website served on localhost, for
+# offline crawl and scrape benchmarks (see bench_crawl_scrape.py).
+# One server answers for every host of the farm domain (www.farm.test,
+# admissions.farm.test, ...) by Host header. Pages, links and text are derived
+# from a seed, so every run sees the same site. The farm can serve:
+#   - robots.txt pointing at a sitemap index with child sitemaps (optionally gzipped);
+#   - subdomains linked from the main site;
+#   - per-day calendar traps that are in no sitemap and no exclusion list;
+#   - ETag / Last-Modified validators with 304 answers (can be switched off);
+#   - injected per-request latency with jitter.
+# GET /__stats on any host returns request/byte counters; /__reset zeroes them.
+# Usage: python benchmarks/site_farm.py --port 8900 --pages 2000 --latency-ms 20
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FARM_DOMAIN = "farm.test"
+FARM_HOMEPAGE = f"https://www.{FARM_DOMAIN}"
+
+SECTIONS = [
+    "financial-aid", "scholarships", "student-services", "counseling", "health-services",
+    "veterans", "disability", "food-pantry", "housing", "tuition", "admissions",
+    "academics", "research", "news", "about", "library", "athletics", "alumni",
+]
+WORDS = (
+    "student financial aid scholarship grant tuition deadline campus office apply "
+    "eligibility award semester program support services counseling housing meal plan "
+    "veteran accessibility employment work study fafsa emergency fund transfer advising "
+    "wellness clinic appointment pantry childcare parking transit registrar enrollment"
+).split()
+SITEMAP_CHUNK = 500
+TRAP_START = date(2026, 1, 1)
+LAST_MODIFIED = formatdate(time.mktime((2026, 1, 15, 12, 0, 0, 0, 0, 0)), usegmt=True)
+
+
+# The generated site: per host, a list of page paths; per page, its outgoing
+# links. Pages hang off section hubs so everything is reachable from the
+# homepage in a few hops, and every page also links to a few random siblings.
+class Farm:
+    def __init__(self, pages=1000, subdomains=3, words_per_page=400, links_per_page=8,
+                 traps=True, sitemap=True, gzip_sitemaps=False, conditional=True,
+                 latency_ms=0.0, jitter_ms=0.0, seed=7):
+        self.words_per_page = words_per_page
+        self.traps = traps
+        self.sitemap = sitemap
+        self.gzip_sitemaps = gzip_sitemaps
+        self.conditional = conditional
+        self.latency_s = latency_ms / 1000.0
+        self.jitter_s = jitter_ms / 1000.0
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self.hosts = [f"www.{FARM_DOMAIN}"] + [
+            f"{name}.{FARM_DOMAIN}" for name in ("admissions", "finaid", "studentlife", "library",
+                                                 "it", "research", "alumni")[:max(0, subdomains)]
+        ]
+        self.pages = {host: {"/": []} for host in self.hosts}
+        for i in range(max(0, pages)):
+            host = self.hosts[0] if i % 3 else rng.choice(self.hosts)
+            section = rng.choice(SECTIONS)
+            self.pages[host].setdefault(f"/{section}", [])
+            self.pages[host][f"/{section}/{section}-topic-{i}"] = []
+
+        for host, host_pages in self.pages.items():
+            paths = list(host_pages)
+            hubs = [p for p in paths if p.count("/") == 1 and p != "/"]
+            host_pages["/"] = hubs + [f"https://{h}/" for h in self.hosts if h != host]
+            for path in paths:
+                if path == "/" or path in hubs:
+                    continue
+                hub = "/" + path.split("/")[1]
+                host_pages[hub].append(path)
+                host_pages[path] = [rng.choice(paths) for _ in range(links_per_page)]
+            if traps:
+                host_pages["/"].append(f"/happenings/{TRAP_START.isoformat()}")
+
+        self.stats = {"requests": 0, "bytes": 0, "not_modified": 0, "not_found": 0}
+        self._stats_lock = threading.Lock()
+
+    def page_count(self):
+        return sum(len(pages) for pages in self.pages.values())
+
+    def urls(self):
+        return [f"https://{host}{path}".rstrip("/") or f"https://{host}"
+                for host, pages in self.pages.items() for path in pages]
+
+    def _count(self, body_len, key=None):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += body_len
+            if key:
+                self.stats[key] += 1
+
+    # Deterministic page body for (host, path).
+    def render_page(self, host, path, links):
+        rng = random.Random(f"{self.seed}:{host}:{path}")
+        words = [rng.choice(WORDS) for _ in range(self.words_per_page)]
+        paragraphs = [" ".join(words[i:i + 60]) for i in range(0, len(words), 60)]
+        title = path.strip("/").replace("-", " ").replace("/", " - ").title() or "Home"
+        # Absolute links: the mapper resolves hrefs against the homepage, so
+        # relative links on subdomain pages would point back at www.
+        nav = "".join(f'<li><a href="https://{host}/{s}">{s.replace("-", " ").title()}</a></li>'
+                      for s in SECTIONS[:10] if f"/{s}" in self.pages[host])
+        body_links = "".join(
+            f'<li><a href="{link if link.startswith("https://") else f"https://{host}{link}"}">'
+            f'{link.rstrip("/").rsplit("/", 1)[-1]}</a></li>'
+            for link in links
+        )
+        body = "".join(f"<p>{p.capitalize()}.</p>" for p in paragraphs)
+        return (
+            "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+            f"<title>{title} | Farm University</title></head><body>"
+            f"<header class=\"site-header\">Farm University</header><nav class=\"navbar\"><ul>{nav}</ul></nav>"
+            f"<main><h1>{title}</h1>{body}<ul>{body_links}</ul></main>"
+            f"<footer class=\"site-footer\"><a href=\"https://{host}/\">Home</a></footer></body></html>"
+        ).encode("utf-8")
+
+    def render_trap(self, host, day):
+        links = [f"https://{host}/happenings/{(day + timedelta(days=k)).isoformat()}" for k in (-1, 1, 7)]
+        nav = "".join(f'<a href="https://{host}/{s}">{s}</a>' for s in SECTIONS[:10]
+                      if f"/{s}" in self.pages[host])
+        items = "".join(f'<a href="{link}">{link}</a>' for link in links)
+        return (f"<html><head><title>Happenings {day}</title></head><body>{nav}"
+                f"<h1>Events for {day}</h1><p>No events scheduled.</p>{items}</body></html>").encode("utf-8")
+
+    def robots(self, host):
+        lines = ["User-agent: *", "Disallow: /admin"]
+        if self.sitemap:
+            lines.append(f"Sitemap: https://{host}/sitemap_index.xml")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def sitemap_index(self, host):
+        count = (len(self.pages[host]) + SITEMAP_CHUNK - 1) // SITEMAP_CHUNK
+        ext = "xml.gz" if self.gzip_sitemaps else "xml"
+        entries = "".join(f"<sitemap><loc>https://{host}/sitemap-{i}.{ext}</loc></sitemap>"
+                          for i in range(count))
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f"{entries}</sitemapindex>").encode("utf-8")
+
+    def sitemap_chunk(self, host, index):
+        paths = list(self.pages[host])[index * SITEMAP_CHUNK:(index + 1) * SITEMAP_CHUNK]
+        entries = "".join(f"<url><loc>https://{host}{p}</loc><lastmod>2026-01-15</lastmod></url>"
+                          for p in paths)
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f"{entries}</urlset>").encode("utf-8")
+        return gzip.compress(body) if self.gzip_sitemaps else body
+
+    # Returns (status, headers, body) for one GET.
+    def respond(self, host, path, request_headers):
+        host = host.split(":")[0].lower()
+        if path == "/__stats":
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.stats).encode("utf-8")
+        if path == "/__reset":
+            with self._stats_lock:
+                for key in self.stats:
+                    self.stats[key] = 0
+            return 200, {"Content-Type": "text/plain"}, b"ok"
+
+        if self.latency_s or self.jitter_s:
+            time.sleep(self.latency_s + random.random() * self.jitter_s)
+
+        if host not in self.pages:
+            return self._not_found()
+        if path == "/robots.txt":
+            return self._ok(self.robots(host), "text/plain")
+        if self.sitemap and path == "/sitemap_index.xml":
+            return self._ok(self.sitemap_index(host), "application/xml")
+        if self.sitemap and path.startswith("/sitemap-"):
+            try:
+                index = int(path[len("/sitemap-"):].split(".")[0])
+            except ValueError:
+                return self._not_found()
+            ctype = "application/x-gzip" if path.endswith(".gz") else "application/xml"
+            return self._ok(self.sitemap_chunk(host, index), ctype)
+
+        if self.traps and path.startswith("/happenings/"):
+            try:
+                day = date.fromisoformat(path[len("/happenings/"):])
+            except ValueError:
+                return self._not_found()
+            return self._ok(self.render_trap(host, day), "text/html; charset=utf-8")
+
+        page_path = path.rstrip("/") or "/"
+        links = self.pages[host].get(page_path)
+        if links is None:
+            return self._not_found()
+
+        body = self.render_page(host, page_path, links)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.conditional and (
+            request_headers.get("If-None-Match") == etag
+            or request_headers.get("If-Modified-Since") == LAST_MODIFIED
+        ):
+            self._count(0, "not_modified")
+            return 304, {"ETag": etag, "Last-Modified": LAST_MODIFIED}, b""
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if self.conditional:
+            headers.update({"ETag": etag, "Last-Modified": LAST_MODIFIED})
+        self._count(len(body))
+        return 200, headers, body
+
+    def _ok(self, body, content_type):
+        self._count(len(body))
+        return 200, {"Content-Type": content_type}, body
+
+    def _not_found(self):
+        self._count(0, "not_found")
+        return 404, {"Content-Type": "text/plain"}, b""
+
+
+def make_handler(farm):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, headers, body = farm.respond(
+                self.headers.get("Host", ""), urlsplit(self.path).path, self.headers,
+            )
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(farm, port):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(farm))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def add_farm_arguments(parser):
+    parser.add_argument("--pages", type=int, default=1000, help="Topic pages across all farm hosts (hubs and homepages come on top)")
+    parser.add_argument("--subdomains", type=int, default=3, help="Subdomains besides www (max 7)")
+    parser.add_argument("--words", type=int, default=400, help="Words of body text per page")
+    parser.add_argument("--links", type=int, default=8, help="Sibling links per page")
+    parser.add_argument("--no-traps", action="store_true", help="Leave out the per-day calendar trap")
+    parser.add_argument("--no-sitemap", action="store_true", help="Serve no sitemaps")
+    parser.add_argument("--gzip-sitemaps", action="store_true", help="Serve child sitemaps as .xml.gz")
+    parser.add_argument("--no-304", action="store_true", help="Send no validators and never answer 304")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency per request")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+# Farm keyword arguments from add_farm_arguments() flags (a plain dict, so it
+# can be handed to a server subprocess).
+def farm_options(args):
+    return {
+        "pages": args.pages, "subdomains": args.subdomains, "words_per_page": args.words,
+        "links_per_page": args.links, "traps": not args.no_traps, "sitemap": not args.no_sitemap,
+        "gzip_sitemaps": args.gzip_sitemaps, "conditional": not args.no_304,
+        "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "seed": args.seed,
+    }
+
+
+# Subprocess entry point: build the farm and serve it.
+def serve_options(options, port):
+    serve(Farm(**options), port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a generated website farm on localhost.")
+    parser.add_argument("--port", type=int, default=8900)
+    add_farm_arguments(parser)
+    args = parser.parse_args()
+    farm = Farm(**farm_options(args))
+    print(f"Serving {farm.page_count()} pages on {len(farm.hosts)} host(s) "
+          f"({', '.join(farm.hosts)}) at 127.0.0.1:{args.port}")
+    serve(farm, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# llm_cache.py -- On-disk cache for Ollama /api/generate responses.
+# Used by ollama_client.generate so reruns of match.py don't resend prompts
+# whose inputs haven't changed (matcher chunks, pass-2 verification, profile
+# keyword expansion). Entries are keyed by a hash of everything that shapes
+# the reply and evicted least-recently-used once the cache passes its size cap.
+#
+# Settings (env vars):
+#   LPBD_LLM_CACHE=0           disables the cache
+#   LPBD_LLM_CACHE_PATH=...    cache file location (default: llm_cache.db in the repo root)
+#   LPBD_LLM_CACHE_MAX_MB=256  size cap before LRU eviction kicks in
+
+import hashlib
+import json
+import os
+import atexit
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+CACHE_PATH = Path(os.getenv("LPBD_LLM_CACHE_PATH", "").strip() or PROJECT_ROOT / "llm_cache.db")
+MAX_BYTES = int(float(os.getenv("LPBD_LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+ENABLED = os.getenv("LPBD_LLM_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+# Every open per-thread connection, so close() can reach them. Weak, so a
+# finished worker thread's connection is closed along with its thread-local.
+_open_conns = weakref.WeakSet()
+
+# Running total of cached response bytes, read from the table once and then
+# kept up to date by put() and eviction (None until first needed).
+_size_lock = threading.Lock()
+_total_bytes = None
+
+
+# Holds one thread's connection (sqlite3 connections can't be weakly
+# referenced themselves). close() marks it closed so its thread reopens.
+class _ThreadConn:
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+
+
+# Returns this thread's connection to the cache database, opening it on first
+# use. The table, index and WAL mode (which lets the matcher's worker threads
+# read while another thread writes) are set up once per process.
+def _connect():
+    global _schema_ready
+    holder = getattr(_local, "holder", None)
+    if holder is not None and not holder.closed:
+        return holder.conn
+
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, check_same_thread=False)
+    with _schema_lock:
+        if not _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used_at)"
+            )
+            conn.commit()
+            _schema_ready = True
+    holder = _ThreadConn(conn)
+    _local.holder = holder
+    _open_conns.add(holder)
+    return conn
+
+
+# Closes every open cache connection (registered to run at exit). Each
+# holder is marked closed, so any thread that uses the cache afterwards,
+# not just the one calling close(), opens a new connection.
+def close():
+    global _schema_ready
+    for holder in list(_open_conns):
+        holder.closed = True
+        try:
+            holder.conn.close()
+        except sqlite3.Error:
+            pass
+    _open_conns.clear()
+    with _schema_lock:
+        _schema_ready = False
+
+
+atexit.register(close)
+
+
+def _bump(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+# Stable content hash of every input that changes what the model returns.
+# keep_alive and timeout are left out on purpose: they don't affect the reply.
+def make_key(model, system, prompt, options=None, format=None):
+    raw = json.dumps(
+        {
+            "model": model,
+            "system": system or "",
+            "prompt": prompt,
+            "options": options or {},
+            "format": format or "",
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Returns the cached response text for key, or None on a miss.
+# A hit refreshes the entry's LRU timestamp.
+def get(key):
+    if not ENABLED:
+        return None
+    try:
+        conn = _connect()
+        with conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE llm_cache SET last_used_at = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+    except sqlite3.Error:
+        row = None
+
+    if row is None:
+        _bump("misses")
+        return None
+    _bump("hits")
+    return row[0]
+
+
+# Stores a response and evicts least-recently-used entries past MAX_BYTES.
+# Cache failures never break generation -- the response is still returned upstream.
+def put(key, model, response):
+    if not ENABLED:
+        return
+    size = len(response.encode("utf-8"))
+    now = time.time()
+    try:
+        conn = _connect()
+        with conn:
+            old = conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                """
+                INSERT INTO llm_cache (key, model, response, size, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    response = excluded.response,
+                    size = excluded.size,
+                    last_used_at = excluded.last_used_at
+                """,
+                (key, model, response, size, now, now),
+            )
+            _bump("writes")
+            if _add_bytes(conn, size - (old[0] if old else 0)) > MAX_BYTES:
+                _evict(conn)
+    except sqlite3.Error:
+        pass
+
+
+# Adds delta to the running size total and returns the new total. The
+# first call reads the table's total once.
+def _add_bytes(conn, delta):
+    global _total_bytes
+    with _size_lock:
+        if _total_bytes is None:
+            _total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        else:
+            _total_bytes += delta
+        return _total_bytes
+
+
+# Evicts least-recently-used entries until the cache fits MAX_BYTES. Only
+# runs once the running total says the cap is passed; the total is re-read
+# here since other processes may have written or evicted in the meantime.
+def _evict(conn):
+    global _total_bytes
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+    if total <= MAX_BYTES:
+        with _size_lock:
+            _total_bytes = total
+        return
+
+    stale = []
+    for key, size in conn.execute(
+        "SELECT key, size FROM llm_cache ORDER BY last_used_at ASC"
+    ):
+        if total <= MAX_BYTES:
+            break
+        stale.append((key,))
+        total -= size
+
+    conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+    with _size_lock:
+        _total_bytes = total
+    _bump("evictions", len(stale))
+
+
+# Deletes every cached response.
+def clear():
+    global _total_bytes
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM llm_cache")
+    with _size_lock:
+        _total_bytes = 0
+
+
+# Counters since the last reset_stats(), for the run summary.
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+# One-line summary like "12 hit(s), 3 miss(es) (80% hit rate)".
+def format_stats(stats=None):
+    stats = stats or get_stats()
+    hits = stats.get("hits", 0)
+    misses = stats.get("misses", 0)
+    lookups = hits + misses
+    rate = f" ({hits / lookups * 100:.0f}% hit rate)" if lookups else ""
+    text = f"{hits} hit(s), {misses} miss(es){rate}"
+    if stats.get("evictions"):
+        text += f", {stats['evictions']} evicted"
+    if not ENABLED:
+        text = "disabled"
+    return text
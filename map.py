@@ -2,6 +2,9 @@
 # and runs the mapper on every collected domain to produce a fresh mapped_pages.json.
 # Usage: python map.py
 #        python map.py --max-pages 100 --delay 0.5
+#        python map.py --resume    (continue an interrupted run)
+#        python map.py --incremental --max-age-hours 24    (refresh instead of remapping)
+#        python map.py --fused    (keep crawled pages for scrape_all.py --reuse-within-hours)
 
 import argparse
 import json
@@ -16,7 +19,7 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 # needs its own directory on sys.path.
 sys.path.insert(0, str(PROJECT_ROOT / "mapper"))
 
-from mapper import map_domains_batch  # noqa: E402
+from mapper import export_mapped_json, map_domains_batch, open_mapped_store  # noqa: E402
 
 
 # Duplicates writes to both a terminal stream and a log file.
@@ -127,6 +130,15 @@ def domain_to_url(bare):
     return f"https://{bare}"
 
 
+# Domains that already have a successful entry in the mapped-URL store.
+def _mapped_domains(output_path):
+    store = open_mapped_store(output_path)
+    try:
+        return store.successful_domains()
+    finally:
+        store.close()
+
+
 def main():
     log_dir = PROJECT_ROOT / "logs"
     log_dir.mkdir(exist_ok=True)
@@ -151,7 +163,27 @@ def _main_inner():
                         help="Output path for mapped_pages.json")
     parser.add_argument("--max-pages", type=int, default=None,
                         help="Max pages to crawl per domain (default: unlimited)")
-    parser.add_argument("--delay", type=float, default=0.3, help="Delay between requests in seconds")
+    parser.add_argument("--delay", type=float, default=0.3,
+                        help="Starting delay between requests to the same host in seconds; "
+                             "adapts to each host's speed, errors and robots.txt Crawl-delay")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Max pages fetched at once per domain (default: 4)")
+    parser.add_argument("--per-host", type=int, default=2,
+                        help="Max concurrent requests to any one host (default: 2)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run: keep the existing output, skip domains "
+                             "already mapped, and resume partial crawls from their last checkpoint")
+    parser.add_argument("--breadth-first", action="store_true",
+                        help="Crawl in plain breadth-first order instead of ranking links "
+                             "by benefit likelihood")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Keep the existing output and refresh mapped domains from sitemap "
+                             "lastmod and conditional requests instead of crawling them again")
+    parser.add_argument("--max-age-hours", type=float, default=None,
+                        help="With --incremental, skip domains mapped less than this many hours ago")
+    parser.add_argument("--fused", action="store_true",
+                        help="Also save every crawled page to the scrape worker's page store, so "
+                             "scrape_all.py --reuse-within-hours needn't download it again")
     args = parser.parse_args()
 
     print("=== LPBD Domain Mapper ===\n")
@@ -183,12 +215,28 @@ def _main_inner():
         print(f"  - {url}")
     print()
 
-    if args.output.exists():
-        args.output.unlink()
+    if args.resume:
+        done = _mapped_domains(args.output)
+        if done:
+            urls = [u for u in urls if u not in done]
+            print(f"Resuming: {len(done)} domain(s) already mapped, {len(urls)} left.\n")
+    elif args.incremental:
+        done = _mapped_domains(args.output)
+        print(f"Incremental: {len(done)} domain(s) will be refreshed, "
+              f"{len([u for u in urls if u not in done])} mapped from scratch.\n")
+    else:
+        store = open_mapped_store(args.output)
+        try:
+            store.clear()
+        finally:
+            store.close()
+        if args.output.exists():
+            args.output.unlink()
         print(f"Cleared old {args.output.name}\n")
 
     limit_display = args.max_pages if args.max_pages is not None else "unlimited"
-    print(f"Mapping with max_pages={limit_display}, delay={args.delay}s ...\n")
+    print(f"Mapping with max_pages={limit_display}, delay={args.delay}s, "
+          f"concurrency={args.concurrency}, per_host={args.per_host} ...\n")
     map_domains_batch(
         domains=urls,
         include_subdomains=True,
@@ -196,6 +244,13 @@ def _main_inner():
         max_pages=args.max_pages,
         delay=args.delay,
         output_path=args.output,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        resume=args.resume,
+        best_first=not args.breadth_first,
+        incremental=args.incremental,
+        max_age_hours=args.max_age_hours,
+        fused=args.fused,
     )
 
     if args.output.exists():
@@ -209,8 +264,12 @@ def _main_inner():
                 del data["domains"][k]
             if empty:
                 data["domain_count"] = len(data["domains"])
-                with open(args.output, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False)
+                store = open_mapped_store(args.output)
+                try:
+                    store.delete_domains(empty)
+                    export_mapped_json(args.output, store=store)
+                finally:
+                    store.close()
                 print(f"\nPruned {len(empty)} domain(s) with 0 URLs: {', '.join(empty)}")
 
                 # Also remove them from the database so they are skipped next time
@@ -87,6 +87,14 @@ def build_background_command(
     output_path,
     max_pages=500,
     delay=0.3,
+    concurrency=4,
+    per_host=2,
+    resume=False,
+    checkpoint_every=50,
+    best_first=True,
+    incremental=False,
+    max_age_hours=None,
+    fused=False,
 ):
     cmd = [
         sys.executable,
@@ -102,11 +110,27 @@ def build_background_command(
         str(max_pages),
         "--delay",
         str(delay),
+        "--concurrency",
+        str(concurrency),
+        "--per-host",
+        str(per_host),
+        "--checkpoint-every",
+        str(checkpoint_every),
         "--output",
         str(output_path),
     ]
     if not include_subdomains:
         cmd.append("--no-subdomains")
+    if resume:
+        cmd.append("--resume")
+    if not best_first:
+        cmd.append("--breadth-first")
+    if incremental:
+        cmd.append("--incremental")
+    if max_age_hours is not None:
+        cmd.extend(["--max-age-hours", str(max_age_hours)])
+    if fused:
+        cmd.append("--fused")
     cmd.extend(domains)
     return cmd
 
@@ -121,6 +145,14 @@ def launch_background(
     output_path,
     max_pages=500,
     delay=0.3,
+    concurrency=4,
+    per_host=2,
+    resume=False,
+    checkpoint_every=50,
+    best_first=True,
+    incremental=False,
+    max_age_hours=None,
+    fused=False,
     log_file="",
 ):
     LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -134,6 +166,14 @@ def launch_background(
         output_path=output_path,
         max_pages=max_pages,
         delay=delay,
+        concurrency=concurrency,
+        per_host=per_host,
+        resume=resume,
+        checkpoint_every=checkpoint_every,
+        best_first=best_first,
+        incremental=incremental,
+        max_age_hours=max_age_hours,
+        fused=fused,
     )
 
     creationflags = 0
@@ -0,0 +1,217 @@
+import sqlite3
+import time
+from pathlib import Path
+
+STATE_FILE = Path(__file__).resolve().parent / "crawl_state.db"
+
+
+# Opens the checkpoint database and makes sure the tables exist.
+# crawl_run holds per-domain counters; crawl_url holds one row per URL the
+# crawl knows about, with flags for found (goes into results), queued (ever
+# put on the frontier) and visited (fetch finished). seq and priority keep
+# frontier order. crawl_sitemap keeps the domain's sitemap entries (URL and
+# <lastmod>) so a resumed crawl still knows which URLs came from the sitemap.
+def _connect(path=STATE_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_run (
+            domain TEXT PRIMARY KEY,
+            sitemap_count INTEGER NOT NULL DEFAULT 0,
+            sitemap_filtered INTEGER NOT NULL DEFAULT 0,
+            pages_fetched INTEGER NOT NULL DEFAULT 0,
+            links_excluded INTEGER NOT NULL DEFAULT 0,
+            links_duplicate INTEGER NOT NULL DEFAULT 0,
+            next_seq INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_url (
+            domain TEXT NOT NULL,
+            url TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            found INTEGER NOT NULL DEFAULT 0,
+            queued INTEGER NOT NULL DEFAULT 0,
+            visited INTEGER NOT NULL DEFAULT 0,
+            priority REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (domain, url)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_sitemap (
+            domain TEXT NOT NULL,
+            url TEXT NOT NULL,
+            lastmod TEXT,
+            PRIMARY KEY (domain, url)
+        )
+        """
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(crawl_url)")}
+    if "priority" not in columns:
+        conn.execute("ALTER TABLE crawl_url ADD COLUMN priority REAL NOT NULL DEFAULT 0")
+    conn.commit()
+    return conn
+
+
+# Crash-safe record of one domain's crawl. bfs_crawl reports every change
+# through the mark_* methods and calls checkpoint() every N pages; only rows
+# touched since the last checkpoint are written, so a checkpoint costs the
+# same on page 50 and page 50,000. A URL counts as visited only once its fetch
+# has finished, so requests in flight at a crash are simply retried on resume.
+class CrawlState:
+    def __init__(self, domain, path=STATE_FILE, resume=False):
+        self.domain = domain
+        self.path = Path(path)
+        self.conn = _connect(self.path)
+        self.run = {
+            "sitemap_count": 0,
+            "sitemap_filtered": 0,
+            "pages_fetched": 0,
+            "links_excluded": 0,
+            "links_duplicate": 0,
+        }
+        self._rows = {}      # url -> [seq, found, queued, visited, priority]
+        self._dirty = set()
+        self._next_seq = 0
+        self.resumed = False
+
+        if resume:
+            self._load()
+        else:
+            self.clear()
+
+    def _load(self):
+        run = self.conn.execute(
+            """
+            SELECT sitemap_count, sitemap_filtered, pages_fetched, links_excluded,
+                   links_duplicate, next_seq
+            FROM crawl_run WHERE domain = ?
+            """,
+            (self.domain,),
+        ).fetchone()
+        if not run:
+            return
+        (self.run["sitemap_count"], self.run["sitemap_filtered"], self.run["pages_fetched"],
+         self.run["links_excluded"], self.run["links_duplicate"], self._next_seq) = run
+        for url, seq, found, queued, visited, priority in self.conn.execute(
+            "SELECT url, seq, found, queued, visited, priority FROM crawl_url WHERE domain = ?",
+            (self.domain,),
+        ):
+            self._rows[url] = [seq, found, queued, visited, priority]
+        self.resumed = True
+
+    def _row(self, url):
+        row = self._rows.get(url)
+        if row is None:
+            row = [self._next_seq, 0, 0, 0, 0.0]
+            self._next_seq += 1
+            self._rows[url] = row
+        self._dirty.add(url)
+        return row
+
+    def mark_found(self, url):
+        self._row(url)[1] = 1
+
+    def mark_queued(self, url, priority=0.0):
+        row = self._row(url)
+        row[2] = 1
+        row[4] = priority
+
+    def mark_visited(self, url):
+        self._row(url)[3] = 1
+
+    # Pruned as a crawler trap: neither a result nor pending any more.
+    def mark_pruned(self, url):
+        row = self._row(url)
+        row[1] = 0
+        row[3] = 1
+
+    # URLs that belong in the crawl's results.
+    def found_urls(self):
+        return {url for url, row in self._rows.items() if row[1]}
+
+    def queued_urls(self):
+        return {url for url, row in self._rows.items() if row[2]}
+
+    def visited_urls(self):
+        return {url for url, row in self._rows.items() if row[3]}
+
+    # Queued but not yet fetched, as (url, priority) in the order they were queued.
+    def pending_urls(self):
+        pending = [(row[0], url, row[4]) for url, row in self._rows.items() if row[2] and not row[3]]
+        return [(url, priority) for _seq, url, priority in sorted(pending)]
+
+    # Records the sitemap entries ({url: lastmod or None}) the crawl was
+    # seeded with, replacing any from an earlier run.
+    def save_sitemap(self, entries):
+        with self.conn:
+            self.conn.execute("DELETE FROM crawl_sitemap WHERE domain = ?", (self.domain,))
+            self.conn.executemany(
+                "INSERT INTO crawl_sitemap (domain, url, lastmod) VALUES (?, ?, ?)",
+                [(self.domain, url, lastmod) for url, lastmod in entries.items()],
+            )
+
+    # The sitemap entries saved by save_sitemap, as {url: lastmod or None}.
+    def sitemap_entries(self):
+        return dict(self.conn.execute(
+            "SELECT url, lastmod FROM crawl_sitemap WHERE domain = ?", (self.domain,)
+        ))
+
+    # Writes counters and every URL row changed since the last checkpoint in
+    # one transaction.
+    def checkpoint(self, **counters):
+        self.run.update(counters)
+        rows = [(self.domain, url, *self._rows[url]) for url in self._dirty]
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO crawl_run (
+                    domain, sitemap_count, sitemap_filtered, pages_fetched,
+                    links_excluded, links_duplicate, next_seq, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(domain) DO UPDATE SET
+                    sitemap_count = excluded.sitemap_count,
+                    sitemap_filtered = excluded.sitemap_filtered,
+                    pages_fetched = excluded.pages_fetched,
+                    links_excluded = excluded.links_excluded,
+                    links_duplicate = excluded.links_duplicate,
+                    next_seq = excluded.next_seq,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    self.domain,
+                    self.run["sitemap_count"],
+                    self.run["sitemap_filtered"],
+                    self.run["pages_fetched"],
+                    self.run["links_excluded"],
+                    self.run["links_duplicate"],
+                    self._next_seq,
+                    time.time(),
+                ),
+            )
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO crawl_url (domain, url, seq, found, queued, visited, priority)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        self._dirty.clear()
+
+    # Forgets this domain's checkpoint (fresh start or finished crawl).
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM crawl_url WHERE domain = ?", (self.domain,))
+            self.conn.execute("DELETE FROM crawl_sitemap WHERE domain = ?", (self.domain,))
+            self.conn.execute("DELETE FROM crawl_run WHERE domain = ?", (self.domain,))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+
+# Crawl frontier split into one queue per host. Each host has at most
+# `per_host` requests in flight, and request starts to the same host are
+# spaced at least `delay` seconds apart. URLs carry a priority: among the
+# hosts that are ready, the one whose best pending URL scores highest goes
+# next, and ties (including the all-zero case) fall back to FIFO within a
+# host and round-robin across hosts, i.e. plain breadth-first order. Only the
+# crawl's dispatch thread touches it, so there is no locking.
+# With a HostScheduler, request spacing comes from the scheduler instead of
+# the fixed `delay`: its per-host adaptive interval, Crawl-delay and
+# Retry-After holds.
+class HostFrontier:
+    def __init__(self, per_host=2, delay=0.3, scheduler=None):
+        self.per_host = max(1, per_host)
+        self.delay = max(0.0, delay)
+        self.scheduler = scheduler
+        self._queues = {}          # host -> heap of (-priority, seq, url)
+        self._hosts = deque()      # hosts with pending urls, in round-robin order
+        self._in_flight = {}       # host -> requests currently out
+        self._next_at = {}         # host -> earliest monotonic time for the next request
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    # Adds a url to its host's queue. Higher priority is fetched sooner.
+    def push(self, url, priority=0.0):
+        host = urlparse(url).netloc.lower()
+        queue = self._queues.setdefault(host, [])
+        if not queue:
+            self._hosts.append(host)
+        heapq.heappush(queue, (-priority, next(self._seq), url))
+        self._size += 1
+
+    # Takes the best url whose host is under its in-flight cap and past its
+    # delay. Returns (url, None) on success, or (None, wait_s) where wait_s is
+    # how long until some host's delay runs out (None if every pending host is
+    # only blocked on in-flight requests, or nothing is pending).
+    def pop_ready(self, now=None):
+        now = time.monotonic() if now is None else now
+        soonest = None
+        best_host = None
+        best_key = None
+        for host in self._hosts:
+            if self._in_flight.get(host, 0) >= self.per_host:
+                continue
+            if self.scheduler:
+                ready_at = self.scheduler.ready_at(host)
+            else:
+                ready_at = self._next_at.get(host, 0.0)
+            if ready_at > now:
+                wait_s = ready_at - now
+                soonest = wait_s if soonest is None else min(soonest, wait_s)
+                continue
+            # Strictly better only, so equal scores go to the host that is
+            # earliest in the rotation.
+            key = self._queues[host][0][0]
+            if best_key is None or key < best_key:
+                best_host, best_key = host, key
+
+        if best_host is None:
+            return None, soonest
+
+        queue = self._queues[best_host]
+        _neg_priority, _seq, url = heapq.heappop(queue)
+        self._size -= 1
+        self._hosts.remove(best_host)
+        if queue:
+            self._hosts.append(best_host)
+        self._in_flight[best_host] = self._in_flight.get(best_host, 0) + 1
+        if self.scheduler:
+            self.scheduler.reserve(best_host, now)
+        else:
+            self._next_at[best_host] = now + self.delay
+        return url, None
+
+    # Removes every pending url for which predicate(url) is true and returns
+    # them, e.g. to prune a crawler trap that was detected mid-crawl.
+    def discard(self, predicate):
+        removed = []
+        for host in list(self._hosts):
+            queue = self._queues[host]
+            kept = []
+            for entry in queue:
+                if predicate(entry[2]):
+                    removed.append(entry[2])
+                else:
+                    kept.append(entry)
+            if len(kept) == len(queue):
+                continue
+            heapq.heapify(kept)
+            self._queues[host] = kept
+            if not kept:
+                self._hosts.remove(host)
+        self._size -= len(removed)
+        return removed
+
+    # Marks a url handed out by pop_ready() as finished.
+    def done(self, url):
+        host = urlparse(url).netloc.lower()
+        self._in_flight[host] = max(0, self._in_flight.get(host, 0) - 1)
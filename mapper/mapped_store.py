@@ -0,0 +1,210 @@
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+# The store lives next to the JSON export it replaces: mapped_pages.json ->
+# mapped_pages.db.
+def store_path_for(output_path):
+    return Path(output_path).with_suffix(".db")
+
+
+def _timestamp_utc():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Opens the store and makes sure the tables exist.
+# mapped_domain holds one row per domain with the rest of its mapper result
+# (status, counters, sitemap_lastmod, ...) as JSON; mapped_url holds one row
+# per URL currently mapped for a domain, with how it was first discovered and
+# when it was first and last seen.
+def _connect(path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mapped_domain (
+            domain TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            result_json TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mapped_url (
+            domain TEXT NOT NULL,
+            url TEXT NOT NULL,
+            discovered_via TEXT NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (domain, url)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS mapped_domain_status ON mapped_domain (status)")
+    conn.commit()
+    return conn
+
+
+# Mapped URLs for every domain, in SQLite. Saving a finished domain touches
+# only that domain's rows, so it costs the same for the first domain and the
+# hundredth and needs no file lock; mapped_pages.json is written from here by
+# export_json() for anything that still reads the file.
+class MappedStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = _connect(self.path)
+
+    # Saves one map_domain/remap_domain result. A successful result replaces
+    # the domain's URL set: URLs seen before keep their first_seen and
+    # discovered_via, new ones are added, and ones no longer found are
+    # dropped. A failed result clears the domain's URLs, like the old JSON
+    # upsert did.
+    def upsert_domain(self, result):
+        now = _timestamp_utc()
+        domain = result.get("domain") or f"unknown_{self.domain_count() + 1}"
+        meta = {k: v for k, v in result.items() if k not in ("urls", "sitemap_urls")}
+        meta["updated_at"] = now
+        urls = (result.get("urls") or []) if result.get("status") == "success" else []
+        sitemap_urls = set(result.get("sitemap_urls") or ())
+
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO mapped_domain (domain, status, result_json, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(domain) DO UPDATE SET
+                    status = excluded.status,
+                    result_json = excluded.result_json,
+                    updated_at = excluded.updated_at
+                """,
+                (domain, meta.get("status") or "", json.dumps(meta, ensure_ascii=False), now),
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO mapped_url (domain, url, discovered_via, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(domain, url) DO UPDATE SET last_seen = excluded.last_seen
+                """,
+                [
+                    (domain, url, "sitemap" if url in sitemap_urls else "crawl", now, now)
+                    for url in urls
+                ],
+            )
+            self.conn.execute(
+                "DELETE FROM mapped_url WHERE domain = ? AND last_seen != ?", (domain, now)
+            )
+        meta["urls"] = sorted(urls)
+        return meta
+
+    def domain_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM mapped_domain").fetchone()[0]
+
+    # Full results keyed by domain, URLs included, in the same shape as the
+    # "domains" map of mapped_pages.json.
+    def domain_results(self):
+        results = {}
+        for domain, result_json in self.conn.execute(
+            "SELECT domain, result_json FROM mapped_domain ORDER BY domain"
+        ).fetchall():
+            result = json.loads(result_json)
+            result["urls"] = self.urls_for(domain)
+            results[domain] = result
+        return results
+
+    # Domains whose last result was a success.
+    def successful_domains(self):
+        return {
+            row[0]
+            for row in self.conn.execute(
+                "SELECT domain FROM mapped_domain WHERE status = 'success'"
+            )
+        }
+
+    def urls_for(self, domain):
+        return [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT url FROM mapped_url WHERE domain = ? ORDER BY url", (domain,)
+            )
+        ]
+
+    # {domain: [urls]} for every successfully mapped domain, read straight
+    # off the (domain, url) primary key.
+    def successful_domain_urls(self):
+        mapped = {domain: [] for domain in sorted(self.successful_domains())}
+        for domain, url in self.conn.execute(
+            """
+            SELECT u.domain, u.url
+            FROM mapped_url u
+            JOIN mapped_domain d ON d.domain = u.domain
+            WHERE d.status = 'success'
+            ORDER BY u.domain, u.url
+            """
+        ):
+            mapped[domain].append(url)
+        return mapped
+
+    def delete_domains(self, domains):
+        rows = [(domain,) for domain in domains]
+        with self.conn:
+            self.conn.executemany("DELETE FROM mapped_url WHERE domain = ?", rows)
+            self.conn.executemany("DELETE FROM mapped_domain WHERE domain = ?", rows)
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM mapped_url")
+            self.conn.execute("DELETE FROM mapped_domain")
+
+    # Loads domains from an existing mapped_pages.json payload (as returned
+    # by _load_mapped_payload) that the store doesn't have yet, keeping their
+    # original updated_at. Used once to carry over output from before the store.
+    def import_payload(self, payload):
+        known = {row[0] for row in self.conn.execute("SELECT domain FROM mapped_domain")}
+        with self.conn:
+            for domain, result in (payload.get("domains") or {}).items():
+                if domain in known:
+                    continue
+                updated_at = result.get("updated_at") or _timestamp_utc()
+                meta = {k: v for k, v in result.items() if k != "urls"}
+                self.conn.execute(
+                    """
+                    INSERT INTO mapped_domain (domain, status, result_json, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (domain, result.get("status") or "", json.dumps(meta, ensure_ascii=False), updated_at),
+                )
+                self.conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO mapped_url (domain, url, discovered_via, first_seen, last_seen)
+                    VALUES (?, ?, 'import', ?, ?)
+                    """,
+                    [(domain, url, updated_at, updated_at) for url in result.get("urls") or []],
+                )
+
+    # Writes the whole store out in the mapped_pages.json schema (v2). The
+    # file is written beside the target and renamed over it, so readers never
+    # see a half-written export.
+    def export_json(self, output_path):
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        domains = self.domain_results()
+        payload = {
+            "schema_version": 2,
+            "updated_at": _timestamp_utc(),
+            "domain_count": len(domains),
+            "domains": domains,
+        }
+        tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2)
+        os.replace(tmp_path, output_path)
+
+    def close(self):
+        self.conn.close()
@@ -1,17 +1,30 @@
 import argparse
 import json
-import os
+import re
+import sys
+import threading
 import time
-from collections import deque
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from contextlib import contextmanager
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timezone
+from email.utils import format_datetime
+from functools import lru_cache
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlsplit
 
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
 from batch_workers import launch_background, resolve_worker_count, should_run_in_background
+from crawl_state import CrawlState
+from frontier import HostFrontier
+from mapped_store import MappedStore, store_path_for
+from traps import TrapDetector, content_fingerprint, url_template
+
+# matching module lives one level up from mapper/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from matching.filter import detect_benefit_keywords  # noqa: E402
+from worker_service.host_scheduler import THROTTLE_STATUSES, HostScheduler  # noqa: E402
 
 # Identifies us in request headers so site admins can see who's hitting their server.
 USER_AGENT = "UTRGV-StudentBenefitMapper/0.2 (+https://github.com/General-Zilver/LPBD)"
@@ -92,6 +105,18 @@ BENEFIT_HUB_PATHS = [
     "/registrar",
 ]
 
+# Path segments of the hub paths above, used as cheap "this looks like a
+# benefit section" hints when ranking discovered links.
+_HUB_SEGMENTS = {path.strip("/") for path in BENEFIT_HUB_PATHS}
+
+_PATH_WORD_SPLIT = re.compile(r"[-_/.+%]+")
+
+# Priority for the homepage so its links are discovered before anything else.
+_HOMEPAGE_PRIORITY = 100.0
+
+# How many times bfs_crawl re-queues a URL that answered 429/503.
+THROTTLE_RETRIES = 2
+
 # ISO 639-1 two-letter language codes used to detect translated portal duplicates
 # like /es/financial-aid or /zh-hans/page. We keep the original English page and
 # drop the translated variant.
@@ -125,30 +150,56 @@ _LANG_CODES = {
 }
 
 
+# The exclusion lists above, precompiled for _is_excluded_url: every path
+# fragment in one regex alternation (one scan of the path instead of one
+# substring search per fragment), excluded subdomains as a set probed with the
+# host and each of its parent domains (behind a single str.endswith
+# prefilter), and skipped extensions as a tuple for str.endswith.
+_EXCLUDED_PATH_RE = re.compile(
+    "|".join(re.escape(frag) for frag in sorted(set(EXCLUDED_PATH_FRAGMENTS), key=len, reverse=True))
+)
+_EXCLUDED_HOSTS = frozenset(sub.lower() for sub in EXCLUDED_SUBDOMAINS)
+_EXCLUDED_HOST_SUFFIXES = tuple(_EXCLUDED_HOSTS)
+_SKIP_SUFFIXES = tuple(SKIP_EXTENSIONS)
+
+
+# True if host is an excluded subdomain or sits under one.
+def _is_excluded_host(host):
+    if not host.endswith(_EXCLUDED_HOST_SUFFIXES):
+        return False
+    while True:
+        if host in _EXCLUDED_HOSTS:
+            return True
+        dot = host.find(".")
+        if dot < 0:
+            return False
+        host = host[dot + 1:]
+
+
 # Checks if a single URL should be excluded from the mapped output.
+# Memoized: the same URL is checked for the sitemap, every page that links
+# to it, and the final filter_urls pass.
+@lru_cache(maxsize=1 << 16)
 def _is_excluded_url(url):
-    parsed = urlparse(url)
+    # urlsplit is much cheaper than urlparse; the two only differ on ;params.
+    parsed = urlsplit(url) if ";" not in url else urlparse(url)
     host = parsed.netloc.lower()
     path = parsed.path.lower()
 
     # Whole subdomain exclusion
-    for sub in EXCLUDED_SUBDOMAINS:
-        if host == sub or host.endswith("." + sub):
-            return True
+    if _is_excluded_host(host):
+        return True
 
     # Path fragment exclusion
-    for frag in EXCLUDED_PATH_FRAGMENTS:
-        if frag in path:
-            return True
+    if _EXCLUDED_PATH_RE.search(path):
+        return True
 
     # Translated portal duplicate: path starts with /xx/ or /xx-yy/ where xx is a lang code
-    parts = path.strip("/").split("/")
-    if parts:
-        first = parts[0]
-        # Match "es", "zh-hans", "pt-br", etc.
-        lang_base = first.split("-")[0]
-        if lang_base in _LANG_CODES and len(parts) > 1:
-            return True
+    # ("es", "zh-hans", "pt-br", etc.) and something follows it.
+    stripped = path.strip("/")
+    slash = stripped.find("/")
+    if slash > 0 and stripped[:slash].partition("-")[0] in _LANG_CODES:
+        return True
 
     return False
 
@@ -222,103 +273,286 @@ def clean_and_join(base_url, href):
 
     # Normalize http to https so we don't discover both variants of the same page.
     clean_url = f"https://{parsed.netloc}{parsed.path}"
-    lower_path = parsed.path.lower()
-    if any(lower_path.endswith(ext) for ext in SKIP_EXTENSIONS):
+    if parsed.path.lower().endswith(_SKIP_SUFFIXES):
         return None
 
     return clean_url.rstrip("/") or clean_url
 
 
-# Extracts allowed in-domain links from an HTML document.
-def extract_same_domain_links(base_url, html, include_subdomains=True):
-    root_host = get_root_host(base_url)
+# Extracts allowed in-domain links from an HTML document along with their
+# anchor text. Returns {url: anchor text}; a url linked more than once gets
+# all of its anchor texts joined.
+# `link_cache` memoizes href -> normalized allowed url (or None) across the
+# pages of one crawl, where nav bars and footers repeat the same hrefs on
+# every page. Only share it between calls with the same base_url and
+# include_subdomains.
+def extract_same_domain_link_texts(base_url, html, include_subdomains=True, link_cache=None):
     soup = BeautifulSoup(html, "html.parser")
-    links = set()
+    return _soup_link_texts(base_url, soup, include_subdomains, link_cache)
+
+
+# extract_same_domain_link_texts on an already parsed page.
+def _soup_link_texts(base_url, soup, include_subdomains=True, link_cache=None):
+    root_host = get_root_host(base_url)
+    cache = {} if link_cache is None else link_cache
+    links = {}
 
     for tag in soup.find_all("a", href=True):
-        normalized = clean_and_join(base_url, tag["href"])
+        href = tag["href"]
+        if href in cache:
+            normalized = cache[href]
+        else:
+            normalized = clean_and_join(base_url, href)
+            if normalized and not is_allowed_host(
+                urlparse(normalized).netloc, root_host, include_subdomains=include_subdomains
+            ):
+                normalized = None
+            cache[href] = normalized
         if not normalized:
             continue
 
-        link_host = urlparse(normalized).netloc
-        if is_allowed_host(link_host, root_host, include_subdomains=include_subdomains):
-            links.add(normalized)
+        text = tag.get_text(" ", strip=True)
+        if normalized in links:
+            if text and text not in links[normalized]:
+                links[normalized] = f"{links[normalized]} {text}".strip()
+        else:
+            links[normalized] = text
 
     return links
 
 
+# Extracts allowed in-domain links from an HTML document.
+def extract_same_domain_links(base_url, html, include_subdomains=True):
+    return set(extract_same_domain_link_texts(base_url, html, include_subdomains=include_subdomains))
+
+
+# Scores a link by how likely it is to lead to a benefit page, before fetching
+# it. Benefit categories (matching.filter.BENEFIT_KEYWORDS) named in the URL
+# path or the anchor text count most, a benefit hub segment like
+# /financial-aid adds a little, links found on a page that itself scored get a
+# small boost, and very deep paths (news posts, archives) are nudged down.
+def score_link(url, anchor_text="", parent_score=0.0):
+    path = urlparse(url).path.lower()
+    segments = [seg for seg in path.split("/") if seg]
+
+    score = 2.0 * len(detect_benefit_keywords(" ".join(_PATH_WORD_SPLIT.split(path))))
+    if anchor_text:
+        score += 2.0 * len(detect_benefit_keywords(anchor_text))
+    if any(seg in _HUB_SEGMENTS for seg in segments):
+        score += 1.0
+    if parent_score > 0:
+        score += 0.5
+    score -= 0.1 * max(0, len(segments) - 2)
+    return score
+
+
+# Returns (session_for_thread, close_all) for spreading requests over worker
+# threads. requests.Session isn't guaranteed thread-safe, so each thread gets
+# its own, built with the template session's timeout and headers.
+def _thread_sessions(template):
+    timeout = getattr(template, "_default_timeout", 10)
+    local = threading.local()
+    sessions = []
+    lock = threading.Lock()
+
+    def session_for_thread():
+        thread_session = getattr(local, "session", None)
+        if thread_session is None:
+            thread_session = _build_session(timeout=timeout)
+            thread_session.headers.update(template.headers)
+            local.session = thread_session
+            with lock:
+                sessions.append(thread_session)
+        return thread_session
+
+    def close_all():
+        for thread_session in sessions:
+            thread_session.close()
+
+    return session_for_thread, close_all
+
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_SITEMAP_CHUNK = 64 * 1024
+
+
+# Streams one sitemap and parses it incrementally, so a 50k-URL file is never
+# held in memory as a tree. Handles Content-Encoding gzip (via requests) and
+# .xml.gz files served raw. Returns (kind, entries) where kind is "urlset" or
+# "sitemapindex" and entries is a list of (loc, lastmod or None). Bad or
+# truncated XML keeps whatever parsed before the error.
+# With a HostScheduler the request goes through it like a page fetch: a
+# sitemap robots.txt disallows is skipped (kind None), and the request is
+# spaced, capped and retried after a 429/503 under the host's shared pacing.
+def parse_sitemap(sitemap_url, session, scheduler=None):
+    if scheduler is not None and not scheduler.allowed(sitemap_url, session):
+        return None, []
+    entries = []
+    kind = None
+    loc = lastmod = None
+    parser = etree.XMLPullParser(
+        events=("start", "end"), resolve_entities=False, no_network=True, huge_tree=True,
+    )
+    inflater = None
+
+    if scheduler is not None:
+        resp = scheduler.get(session, sitemap_url, stream=True)
+    else:
+        resp = session.get(sitemap_url, stream=True)
+    with resp:
+        resp.raise_for_status()
+        try:
+            for chunk in resp.iter_content(chunk_size=_SITEMAP_CHUNK):
+                if inflater is None and kind is None and chunk[:2] == _GZIP_MAGIC:
+                    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                if inflater is not None:
+                    chunk = inflater.decompress(chunk)
+                parser.feed(chunk)
+
+                for event, el in parser.read_events():
+                    name = etree.QName(el).localname if isinstance(el.tag, str) else ""
+                    if event == "start":
+                        if kind is None:
+                            kind = name
+                        continue
+                    if name == "loc":
+                        loc = (el.text or "").strip()
+                    elif name == "lastmod":
+                        lastmod = (el.text or "").strip() or None
+                    elif name in ("url", "sitemap"):
+                        if loc:
+                            entries.append((loc, lastmod))
+                        loc = lastmod = None
+                        # Drop finished entries so memory stays flat.
+                        el.clear()
+                        while el.getprevious() is not None:
+                            del el.getparent()[0]
+        except (etree.XMLSyntaxError, zlib.error):
+            pass
+    return kind, entries
+
+
 # Looks for sitemaps in the usual places (sitemap.xml, robots.txt) and collects every
-# page URL it can find. Handles both regular sitemaps and sitemap indexes that point
-# to other sitemaps. Returns an empty set if the site doesn't have one.
-def fetch_sitemap_urls(base_url, session=None, include_subdomains=True):
+# page URL it can find, with its <lastmod> when the sitemap gives one. Handles both
+# regular sitemaps and sitemap indexes (nested to any depth); child sitemaps are
+# fetched `workers` at a time and each one is stream-parsed. Page URLs are
+# normalized and host-filtered as they stream in; with exclude=True the junk
+# filter is applied too and the number dropped goes into stats["excluded"].
+# Every request goes through `scheduler` (a fresh HostScheduler if none is
+# given), the same politeness the crawl uses: robots.txt comes from its
+# robots cache, so the crawl that follows doesn't fetch it again, and sitemap
+# fetches share the host's spacing, Crawl-delay and Retry-After backoff.
+# Returns {url: lastmod or None}, empty if the site doesn't have a sitemap.
+def fetch_sitemap_entries(base_url, session=None, include_subdomains=True,
+                          workers=4, exclude=False, stats=None, scheduler=None):
     session = session or _build_session()
+    scheduler = scheduler or HostScheduler()
     base_clean = base_url.rstrip("/")
     candidates = [f"{base_clean}/sitemap.xml", f"{base_clean}/sitemap_index.xml"]
 
-    try:
-        robots = session.get(f"{base_clean}/robots.txt")
-        if robots.ok:
-            for line in robots.text.splitlines():
-                if line.lower().startswith("sitemap:"):
-                    sitemap_url = line.split(":", 1)[1].strip()
-                    if sitemap_url:
-                        candidates.append(sitemap_url)
-    except requests.RequestException:
-        pass
+    rules = scheduler.robots.rules(base_clean, session)
+    if rules is not None:
+        candidates.extend(rules.sitemaps)
 
     seen_sitemaps = set()
-    collected_urls = set()
+    collected = {}
+    excluded = 0
     root_host = get_root_host(base_url)
+    session_for_thread, close_sessions = _thread_sessions(session)
 
-    for sitemap_url in candidates:
-        if sitemap_url in seen_sitemaps:
-            continue
-        seen_sitemaps.add(sitemap_url)
-
+    def fetch(sitemap_url):
         try:
-            response = session.get(sitemap_url)
-            response.raise_for_status()
+            return parse_sitemap(sitemap_url, session_for_thread(), scheduler)
         except requests.RequestException:
-            continue
-
-        xml = BeautifulSoup(response.text, "xml")
-        loc_tags = [loc.get_text(strip=True) for loc in xml.find_all("loc")]
-        if not loc_tags:
-            continue
+            return None, []
 
-        # If this is a sitemap index, fetch each child sitemap and collect page locs.
-        if xml.find("sitemapindex"):
-            for child_sitemap in loc_tags:
-                if child_sitemap in seen_sitemaps:
-                    continue
-                seen_sitemaps.add(child_sitemap)
-                try:
-                    child_resp = session.get(child_sitemap)
-                    child_resp.raise_for_status()
-                except requests.RequestException:
-                    continue
-
-                child_xml = BeautifulSoup(child_resp.text, "xml")
-                for loc in child_xml.find_all("loc"):
-                    page = clean_and_join(base_url, loc.get_text(strip=True))
-                    if not page:
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            pending = set()
+
+            def submit(sitemap_url):
+                if sitemap_url and sitemap_url not in seen_sitemaps:
+                    seen_sitemaps.add(sitemap_url)
+                    pending.add(executor.submit(fetch, sitemap_url))
+
+            for sitemap_url in candidates:
+                submit(sitemap_url)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, entries = future.result()
+                    if kind == "sitemapindex":
+                        for child_sitemap, _lastmod in entries:
+                            submit(child_sitemap)
                         continue
 
-                    page_host = urlparse(page).netloc
-                    if is_allowed_host(page_host, root_host, include_subdomains=include_subdomains):
-                        collected_urls.add(page)
-        else:
-            # Regular sitemap: collect page locs directly.
-            for loc in loc_tags:
-                page = clean_and_join(base_url, loc)
-                if not page:
-                    continue
-
-                page_host = urlparse(page).netloc
-                if is_allowed_host(page_host, root_host, include_subdomains=include_subdomains):
-                    collected_urls.add(page)
-
-    return collected_urls
+                    for loc, lastmod in entries:
+                        page = clean_and_join(base_url, loc)
+                        if not page:
+                            continue
+                        if not is_allowed_host(urlparse(page).netloc, root_host,
+                                               include_subdomains=include_subdomains):
+                            continue
+                        if exclude and _is_excluded_url(page):
+                            excluded += 1
+                            continue
+                        # Keep the newest lastmod if a page is listed twice.
+                        if page not in collected or (lastmod or "") > (collected[page] or ""):
+                            collected[page] = lastmod
+    finally:
+        close_sessions()
+
+    if stats is not None:
+        stats["excluded"] = excluded
+    return collected
+
+
+# Looks for sitemaps in the usual places and returns the set of page URLs
+# they list (see fetch_sitemap_entries).
+def fetch_sitemap_urls(base_url, session=None, include_subdomains=True):
+    return set(fetch_sitemap_entries(base_url, session=session, include_subdomains=include_subdomains))
+
+
+# Fetches one page on a crawl worker thread and returns (status, links,
+# fingerprint) where links is {url: anchor text}. status is "ok", "not_modified" (a 304 to a
+# conditional request, no links), "gone" (404/410), "blocked" (disallowed by
+# robots.txt, not requested), "throttled" (429/503) or "error". Link parsing
+# happens here too so BeautifulSoup work overlaps with other in-flight requests.
+# With a HostScheduler, robots.txt is checked first and the request's outcome
+# and latency are reported back so the host's spacing adapts.
+# With a PageCapture, successfully fetched pages are also extracted for the
+# scrape worker's page store here.
+# With fingerprint=True a fetched page's visible text is reduced to a
+# traps.content_fingerprint for the TrapDetector; otherwise (and for every
+# status but "ok") fingerprint is None.
+def _fetch_links(session_for_thread, url, base_url, include_subdomains, headers=None, link_cache=None,
+                 capture=None, scheduler=None, fingerprint=False):
+    session = session_for_thread()
+    if scheduler and not scheduler.allowed(url, session):
+        return "blocked", {}, None
+    started = time.monotonic()
+    try:
+        resp = session.get(url, headers=headers)
+    except requests.RequestException:
+        if scheduler:
+            scheduler.record(url, None, time.monotonic() - started)
+        return "error", {}, None
+    if scheduler:
+        scheduler.record(url, resp, time.monotonic() - started)
+    if resp.status_code in THROTTLE_STATUSES:
+        return "throttled", {}, None
+    if resp.status_code == 304:
+        return "not_modified", {}, None
+    if resp.status_code in (404, 410):
+        return "gone", {}, None
+    if not resp.ok:
+        return "error", {}, None
+    if capture is not None:
+        capture.add(url, resp)
+    soup = BeautifulSoup(resp.text, "html.parser")
+    links = _soup_link_texts(base_url, soup, include_subdomains, link_cache)
+    return "ok", links, content_fingerprint(soup.get_text(" ")) if fingerprint else None
 
 
 # Crawls a domain starting from the homepage using breadth-first search.
@@ -328,118 +562,325 @@ def fetch_sitemap_urls(base_url, session=None, include_subdomains=True):
 # filtered out during BFS so max_pages doesn't get wasted on junk. Tracks a `queued`
 # set alongside `visited` so each URL is enqueued exactly once (nav bars and footers
 # repeat the same links on every page).
+# Up to `concurrency` pages are fetched at once, at most `per_host` per host.
+# Request starts to the same host are spaced by a HostScheduler: `delay`
+# seconds at first, then shorter for hosts that answer quickly and longer for
+# ones that slow down, error or send 429/503 (Retry-After is honoured), never
+# below the host's robots.txt Crawl-delay. URLs robots.txt disallows are not
+# fetched and are dropped from the results; throttled URLs are queued again
+# up to THROTTLE_RETRIES times. Hosts take turns,
+# so a university with many subdomains crawls them side by side. Results are
+# handled on this thread, and max_pages counts fetched pages plus requests in
+# flight so the budget is never overshot.
+# With a CrawlState, every change is recorded and checkpointed every
+# `checkpoint_every` pages (and on the way out of an interrupted crawl); a
+# resumed state restores results, visited and the pending frontier instead of
+# starting over from the homepage.
+# With best_first=True (the default) the frontier is ordered by score_link(), so
+# a max_pages budget is spent on likely benefit pages first; best_first=False
+# keeps plain breadth-first order.
+# For incremental remaps, `seeds` replaces the homepage and hub seeds, `known`
+# URLs are never queued again, and URLs in `revalidate` are fetched with
+# If-Modified-Since: `if_modified_since`, so an unchanged page costs a 304.
+# With detect_traps=True (the default) a TrapDetector watches the path
+# templates and text of fetched pages; once a template proves to be a crawler
+# trap (calendar days and empty pagination repeating the same text, looping
+# relative links), its queued URLs are pruned and dropped from the results
+# (sitemap URLs excepted) and new links to it are ignored. Pages of the
+# template already fetched stay in the results.
+# With a PageCapture (fused map+scrape), every fetched page is also saved to
+# the scrape worker's page store, so the scrape stage needn't download it again.
+# When given, `stats` collects "gone" (URLs that answered 404/410),
+# "not_modified" (how many answered 304), "traps" (TrapDetector.report())
+# "captured" (pages saved through `capture`) and "blocked" (URLs robots.txt
+# disallowed).
 def bfs_crawl(base_url, preseed=None, session=None, include_subdomains=True,
-              max_pages=None, delay=0.3):
+              max_pages=None, delay=0.3, concurrency=4, per_host=2,
+              state=None, checkpoint_every=50, best_first=True,
+              seeds=None, known=None, revalidate=None, if_modified_since=None,
+              stats=None, detect_traps=True, capture=None, scheduler=None):
     session = session or _build_session()
+    scheduler = scheduler or HostScheduler(interval_s=delay)
+    traps = TrapDetector() if detect_traps else None
+    preseed = set(preseed or ())
+    revalidate = revalidate or set()
+    conditional_headers = {"If-Modified-Since": if_modified_since} if if_modified_since else None
+    gone = set()
+    not_modified = 0
+    blocked = 0
+
+    results = set()
+    visited = set()                   # URLs we've fetched
+    queued = set()                    # URLs ever added to queue (prevents re-enqueue)
+    frontier = HostFrontier(per_host=per_host, delay=delay, scheduler=scheduler)
+
+    def add_result(url):
+        results.add(url)
+        if state:
+            state.mark_found(url)
+
+    priorities = {}                   # fetched-or-queued url -> its score
+
+    def enqueue(url, priority=0.0):
+        frontier.push(url, priority)
+        queued.add(url)
+        priorities[url] = priority
+        if state:
+            state.mark_queued(url, priority)
 
     # Preseed (sitemap URLs) should already be filtered by map_domain before
     # reaching here, so we accept them directly.
-    results = set(preseed or set())
-
-    visited = set()                   # URLs we've fetched
-    queued = set()                    # URLs ever added to queue (prevents re-enqueue)
-    queue = deque()
+    for url in preseed:
+        add_result(url)
 
     # If the homepage itself is excluded (e.g. entire subdomain blocked), abort early.
     if _is_excluded_url(base_url):
         print(f"   Homepage {base_url} is excluded. Skipping BFS.")
         return results, 0
 
-    queue.append(base_url)
-    queued.add(base_url)
-
-    # Seed benefit hub URLs alongside the homepage. Pages that don't exist (404)
-    # fail fast and get skipped. Pages that do exist give BFS a huge head start.
-    base_clean = base_url.rstrip("/")
-    for path in BENEFIT_HUB_PATHS:
-        hub_url = base_clean + path
-        if hub_url not in queued:
-            queue.append(hub_url)
-            queued.add(hub_url)
-
     pages_fetched = 0
-    links_new = 0
     links_excluded = 0
     links_duplicate = 0
-    domain_label = urlparse(base_url).netloc.replace("www.", "")
 
-    while queue and (max_pages is None or pages_fetched < max_pages):
-        current_url = queue.popleft()
+    if state and state.resumed:
+        results |= state.found_urls()
+        visited = state.visited_urls()
+        queued = state.queued_urls()
+        for url, priority in state.pending_urls():
+            frontier.push(url, priority)
+            priorities[url] = priority
+        pages_fetched = state.run["pages_fetched"]
+        links_excluded = state.run["links_excluded"]
+        links_duplicate = state.run["links_duplicate"]
+        print(f"   Resuming BFS: {pages_fetched} pages already fetched, "
+              f"{len(frontier)} URL(s) still queued.")
+    elif seeds is not None:
+        for url in seeds:
+            if url not in queued:
+                enqueue(url, score_link(url) if best_first else 0.0)
+        queued |= set(known or ())
+    else:
+        enqueue(base_url, _HOMEPAGE_PRIORITY if best_first else 0.0)
+
+        # Seed benefit hub URLs alongside the homepage. Pages that don't exist (404)
+        # fail fast and get skipped. Pages that do exist give BFS a huge head start.
+        base_clean = base_url.rstrip("/")
+        for path in BENEFIT_HUB_PATHS:
+            hub_url = base_clean + path
+            if hub_url not in queued:
+                enqueue(hub_url, score_link(hub_url) if best_first else 0.0)
+
+    def checkpoint():
+        if state:
+            state.checkpoint(
+                pages_fetched=pages_fetched,
+                links_excluded=links_excluded,
+                links_duplicate=links_duplicate,
+            )
+
+    # Persist the seeds and sitemap URLs before the first fetch.
+    checkpoint()
+
+    session_for_thread, close_sessions = _thread_sessions(session)
+    concurrency = max(1, concurrency)
+    domain_label = urlparse(base_url).netloc.replace("www.", "")
+    in_flight = {}
+    link_cache = {}                   # href -> normalized url, shared by the fetch threads
+    throttle_retries = {}             # url -> times requeued after a 429/503
 
-        # Don't fetch the same page twice.
-        if current_url in visited:
-            continue
-        visited.add(current_url)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                # Hand out as many ready URLs as the concurrency and page budget allow.
+                wait_s = None
+                while len(in_flight) < concurrency and (
+                    max_pages is None or pages_fetched + len(in_flight) < max_pages
+                ):
+                    current_url, wait_s = frontier.pop_ready()
+                    if current_url is None:
+                        break
+                    # Don't fetch the same page twice.
+                    if current_url in visited:
+                        frontier.done(current_url)
+                        continue
+                    visited.add(current_url)
+                    future = executor.submit(
+                        _fetch_links, session_for_thread, current_url, base_url, include_subdomains,
+                        conditional_headers if current_url in revalidate else None,
+                        link_cache, capture, scheduler, traps is not None,
+                    )
+                    in_flight[future] = current_url
+
+                if not in_flight:
+                    budget_left = max_pages is None or pages_fetched < max_pages
+                    if not frontier or not budget_left or wait_s is None:
+                        break
+                    # Everything pending is waiting out its host's delay.
+                    time.sleep(wait_s)
+                    continue
 
-        try:
-            resp = session.get(current_url)
-            resp.raise_for_status()
-        except requests.RequestException:
-            continue
+                done, _ = wait(in_flight, timeout=wait_s, return_when=FIRST_COMPLETED)
+                for future in done:
+                    current_url = in_flight.pop(future)
+                    frontier.done(current_url)
+                    status, new_links, fingerprint = future.result()
+                    if status == "throttled" and throttle_retries.get(current_url, 0) < THROTTLE_RETRIES:
+                        # The scheduler has already pushed the host back; try again later.
+                        throttle_retries[current_url] = throttle_retries.get(current_url, 0) + 1
+                        visited.discard(current_url)
+                        frontier.push(current_url, priorities.get(current_url, 0.0))
+                        continue
+                    if status == "blocked":
+                        blocked += 1
+                        results.discard(current_url)
+                        if state:
+                            state.mark_pruned(current_url)
+                        continue
+                    if state:
+                        state.mark_visited(current_url)
+                    if status == "gone":
+                        gone.add(current_url)
+                    elif status == "not_modified":
+                        not_modified += 1
+                    if status not in ("ok", "not_modified"):
+                        continue
 
-        pages_fetched += 1
-        results.add(current_url)
-
-        # Progress log every 25 pages so long crawls don't look hung.
-        # Found = total unique URLs in the result set so far (what ends up in the JSON).
-        # Excluded = links rejected by the junk filter. Dupes = links already seen.
-        if pages_fetched % 25 == 0:
-            short_path = (urlparse(current_url).path or "/")[:40]
-            print(f"   [{domain_label}] Crawled {pages_fetched} | "
-                  f"Found: {len(results)} | Queue: {len(queue)} | "
-                  f"Excluded: {links_excluded} | Dupes: {links_duplicate} | "
-                  f"Current: {short_path}")
-
-        new_links = extract_same_domain_links(
-            base_url, resp.text, include_subdomains=include_subdomains
-        )
+                    pages_fetched += 1
+                    # Requests already in flight when their template was flagged as a trap.
+                    if traps and traps.flagged(current_url):
+                        continue
+                    add_result(current_url)
+
+                    # Progress log every 25 pages so long crawls don't look hung.
+                    # Found = total unique URLs in the result set so far (what ends up in the JSON).
+                    # Excluded = links rejected by the junk filter. Dupes = links already seen.
+                    if pages_fetched % 25 == 0:
+                        short_path = (urlparse(current_url).path or "/")[:40]
+                        print(f"   [{domain_label}] Crawled {pages_fetched} | "
+                              f"Found: {len(results)} | Queue: {len(frontier)} | "
+                              f"Excluded: {links_excluded} | Dupes: {links_duplicate} | "
+                              f"Current: {short_path}")
+
+                    parent_score = priorities.pop(current_url, 0.0)
+                    discovered = []
+                    for link, anchor_text in new_links.items():
+                        # Skip if already fetched or already in queue.
+                        if link in visited or link in queued:
+                            links_duplicate += 1
+                            continue
+                        # Pre-filter junk so it never enters the queue or counts toward max_pages.
+                        if _is_excluded_url(link):
+                            links_excluded += 1
+                            continue
+                        if traps and traps.is_trap(link):
+                            continue
+                        add_result(link)
+                        enqueue(link, score_link(link, anchor_text, parent_score) if best_first else 0.0)
+                        discovered.append(link)
+
+                    trap = traps.record(current_url, discovered, fingerprint) if traps else None
+                    if trap:
+                        pruned = frontier.discard(lambda u: url_template(u) == trap)
+                        # Only the queued URLs go: pages of the template that were
+                        # already fetched stay in the results, and so do queued
+                        # URLs the sitemap listed.
+                        for url in pruned:
+                            priorities.pop(url, None)
+                            if url not in preseed:
+                                results.discard(url)
+                            if state:
+                                state.mark_pruned(url)
+                                if url in preseed:
+                                    state.mark_found(url)
+                        traps.note_pruned(trap, len(pruned))
+                        print(f"   [{domain_label}] Crawler trap: {trap} "
+                              f"(pruned {len(pruned)} queued URL(s))")
+
+                    if checkpoint_every and pages_fetched % checkpoint_every == 0:
+                        checkpoint()
+                if capture:
+                    capture.flush()
+    except BaseException:
+        # Save progress before an interrupt or crash unwinds the crawl.
+        checkpoint()
+        raise
+    finally:
+        close_sessions()
+        if capture:
+            capture.flush(force=True)
+
+    if stats is not None:
+        stats["gone"] = gone
+        stats["not_modified"] = not_modified
+        stats["traps"] = traps.report() if traps else []
+        stats["captured"] = capture.captured if capture else 0
+        stats["blocked"] = blocked
+    return results, pages_fetched
 
-        for link in new_links:
-            # Skip if already fetched or already in queue.
-            if link in visited or link in queued:
-                links_duplicate += 1
-                continue
-            # Pre-filter junk so it never enters the queue or counts toward max_pages.
-            if _is_excluded_url(link):
-                links_excluded += 1
-                continue
-            results.add(link)
-            queue.append(link)
-            queued.add(link)
-            links_new += 1
-
-        if delay > 0:
-            time.sleep(delay)
 
-    return results, pages_fetched
+# The PageCapture for a fused map+scrape run, or None. Imported only when
+# needed so plain mapping never loads the scrape worker, which picks and
+# probes its database on import.
+def _page_capture(url, fused):
+    if not fused:
+        return None
+    from page_capture import PageCapture
+    return PageCapture(url)
 
 
 # Runs the full discovery pipeline for a single domain. First tries the sitemap to get
 # a head start for free, then BFS crawls from the homepage to find anything the sitemap
 # missed. Returns everything we found in one result dict.
-def map_domain(url, include_subdomains=True, max_pages=None, delay=0.3):
+# Crawl progress is checkpointed to crawl_state.db every `checkpoint_every`
+# pages (0 disables it). With resume=True an interrupted crawl of this domain
+# picks up from its last checkpoint, skipping the sitemap step it already did
+# (the sitemap entries it found are restored from the checkpoint).
+# With fused=True the pages BFS fetches are also saved to the scrape worker's
+# page store under `url` (see PageCapture).
+def map_domain(url, include_subdomains=True, max_pages=None, delay=0.3,
+               concurrency=4, per_host=2, resume=False, checkpoint_every=50,
+               best_first=True, fused=False):
     print(f"Mapping {url}...")
     session = _build_session()
+    # One scheduler for the sitemap fetches and the crawl, so both follow the
+    # same robots rules and per-host pacing.
+    scheduler = HostScheduler(interval_s=delay)
+    state = CrawlState(url, resume=resume) if checkpoint_every else None
 
     try:
-        # Step 1: Try to grab the sitemap for a free head start.
-        sitemap_urls_raw = fetch_sitemap_urls(url, session=session, include_subdomains=include_subdomains)
-        sitemap_raw_count = len(sitemap_urls_raw)
-
-        # Filter junk from sitemap URLs before passing to BFS.
-        sitemap_urls, sitemap_filtered = filter_urls(sitemap_urls_raw)
-        sitemap_count = len(sitemap_urls)
-
-        if sitemap_raw_count:
-            if sitemap_filtered:
-                print(f"   Sitemap found. Pre-seeded {sitemap_count} URLs ({sitemap_filtered} filtered out).")
-            else:
-                print(f"   Sitemap found. Pre-seeded {sitemap_count} URLs.")
+        if state and state.resumed:
+            # Sitemap provenance and <lastmod> come back from the checkpoint,
+            # so the result still records them and trap pruning spares them.
+            sitemap_entries = state.sitemap_entries()
+            sitemap_urls = set(sitemap_entries)
+            sitemap_count = state.run["sitemap_count"]
+            print(f"   Resuming from checkpoint ({sitemap_count} sitemap URLs already collected).")
         else:
-            print("   No sitemap found. BFS will do all discovery.")
+            # Step 1: Try to grab the sitemap for a free head start. Junk URLs are
+            # filtered out while the sitemaps stream in, before passing to BFS.
+            sitemap_stats = {}
+            sitemap_entries = fetch_sitemap_entries(
+                url, session=session, include_subdomains=include_subdomains,
+                exclude=True, stats=sitemap_stats, scheduler=scheduler,
+            )
+            sitemap_urls = set(sitemap_entries)
+            sitemap_filtered = sitemap_stats["excluded"]
+            sitemap_count = len(sitemap_urls)
+
+            if sitemap_count or sitemap_filtered:
+                if sitemap_filtered:
+                    print(f"   Sitemap found. Pre-seeded {sitemap_count} URLs ({sitemap_filtered} filtered out).")
+                else:
+                    print(f"   Sitemap found. Pre-seeded {sitemap_count} URLs.")
+            else:
+                print("   No sitemap found. BFS will do all discovery.")
+            if state:
+                state.run.update(sitemap_count=sitemap_count, sitemap_filtered=sitemap_filtered)
+                state.save_sitemap(sitemap_entries)
 
         # Step 2: BFS from homepage. Sitemap URLs are pre-seeded into results but can
         # still be visited for their outgoing links if BFS reaches them naturally.
+        crawl_stats = {}
         all_urls, pages_fetched = bfs_crawl(
             base_url=url,
             preseed=sitemap_urls,
@@ -447,7 +888,17 @@ def map_domain(url, include_subdomains=True, max_pages=None, delay=0.3):
             include_subdomains=include_subdomains,
             max_pages=max_pages,
             delay=delay,
+            concurrency=concurrency,
+            per_host=per_host,
+            state=state,
+            checkpoint_every=checkpoint_every,
+            best_first=best_first,
+            stats=crawl_stats,
+            capture=_page_capture(url, fused),
+            scheduler=scheduler,
         )
+        if state:
+            state.clear()
 
         crawl_found = len(all_urls) - sitemap_count
         print(f"   BFS fetched {pages_fetched} pages, discovered {crawl_found} additional URLs.")
@@ -467,6 +918,123 @@ def map_domain(url, include_subdomains=True, max_pages=None, delay=0.3):
             "filtered_out": excluded_count,
             "found_count": len(all_urls),
             "urls": sorted(all_urls),
+            "sitemap_urls": sorted(all_urls & set(sitemap_entries)),
+            "sitemap_lastmod": _sitemap_lastmod(sitemap_entries, all_urls),
+            "traps": crawl_stats["traps"],
+            "pages_captured": crawl_stats["captured"],
+            "robots_blocked": crawl_stats["blocked"],
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "domain": url,
+            "include_subdomains": include_subdomains,
+            "message": str(e),
+        }
+    finally:
+        if state:
+            state.close()
+
+
+# Sitemap <lastmod> values worth remembering for the next incremental remap:
+# only kept URLs that actually had one.
+def _sitemap_lastmod(sitemap_entries, kept_urls):
+    return {u: lastmod for u, lastmod in sorted(sitemap_entries.items()) if lastmod and u in kept_urls}
+
+
+# Converts a stored ISO timestamp into an HTTP date for If-Modified-Since.
+def _http_date(iso_timestamp):
+    if not iso_timestamp:
+        return None
+    try:
+        moment = datetime.fromisoformat(iso_timestamp)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+# Incrementally refreshes a domain that was mapped before, given its previous
+# result from mapped_pages.json. Instead of crawling from the homepage again:
+#   - sitemap URLs that are new or whose <lastmod> moved are re-crawled (and
+#     whatever new links they lead to), unchanged sitemap URLs are kept as is;
+#   - known URLs the sitemap doesn't vouch for (BFS finds, or URLs dropped from
+#     the sitemap) are revalidated with If-Modified-Since the last map, so
+#     unchanged pages cost a 304 and 404/410 pages are dropped;
+#   - known URLs are never queued again, and max_pages still caps the work.
+# The result has the same shape as map_domain's plus "added_urls" and
+# "removed_urls" relative to the previous mapping, for the scrape stage.
+def remap_domain(url, previous, include_subdomains=True, max_pages=None, delay=0.3,
+                 concurrency=4, per_host=2, best_first=True, fused=False):
+    print(f"Remapping {url} (incremental)...")
+    session = _build_session()
+    scheduler = HostScheduler(interval_s=delay)
+
+    try:
+        sitemap_stats = {}
+        sitemap_entries = fetch_sitemap_entries(
+            url, session=session, include_subdomains=include_subdomains,
+            exclude=True, stats=sitemap_stats, scheduler=scheduler,
+        )
+        previous_urls = set(previous.get("urls") or [])
+        previous_lastmod = previous.get("sitemap_lastmod") or {}
+
+        changed = {
+            u for u, lastmod in sitemap_entries.items()
+            if u not in previous_urls or (lastmod and lastmod != previous_lastmod.get(u))
+        }
+        revalidate = previous_urls - set(sitemap_entries)
+        print(f"   Sitemap: {len(sitemap_entries)} URLs, {len(changed)} new or changed. "
+              f"Revalidating {len(revalidate)} known URL(s) not in the sitemap.")
+
+        crawl_stats = {}
+        found, pages_fetched = bfs_crawl(
+            base_url=url,
+            preseed=set(sitemap_entries),
+            session=session,
+            include_subdomains=include_subdomains,
+            max_pages=max_pages,
+            delay=delay,
+            concurrency=concurrency,
+            per_host=per_host,
+            checkpoint_every=0,
+            best_first=best_first,
+            seeds=sorted(changed) + sorted(revalidate),
+            known=previous_urls,
+            revalidate=revalidate,
+            if_modified_since=_http_date(previous.get("updated_at")),
+            stats=crawl_stats,
+            capture=_page_capture(url, fused),
+            scheduler=scheduler,
+        )
+        gone = crawl_stats["gone"]
+
+        # Known URLs the budget didn't reach are kept; only confirmed-gone ones drop.
+        all_urls, excluded_count = filter_urls((found | previous_urls) - gone)
+        added = sorted(all_urls - previous_urls)
+        removed = sorted(previous_urls - all_urls)
+        print(f"   Fetched {pages_fetched} pages ({crawl_stats['not_modified']} not modified). "
+              f"+{len(added)} / -{len(removed)} URLs.")
+
+        return {
+            "status": "success",
+            "domain": url,
+            "include_subdomains": include_subdomains,
+            "mode": "incremental",
+            "sitemap_count": len(sitemap_entries),
+            "crawl_pages_fetched": pages_fetched,
+            "crawl_additional": len(added),
+            "filtered_out": excluded_count,
+            "found_count": len(all_urls),
+            "urls": sorted(all_urls),
+            "sitemap_urls": sorted(all_urls & set(sitemap_entries)),
+            "sitemap_lastmod": _sitemap_lastmod(sitemap_entries, all_urls),
+            "traps": crawl_stats["traps"],
+            "pages_captured": crawl_stats["captured"],
+            "robots_blocked": crawl_stats["blocked"],
+            "added_urls": added,
+            "removed_urls": removed,
         }
     except Exception as e:
         return {
@@ -516,85 +1084,103 @@ def _load_mapped_payload(raw_text):
 
     return _empty_mapped_payload()
 
-# Locks the output file before we read/write so multiple workers don't step on each other.
-# Works on both Windows (msvcrt) and Linux/Mac (fcntl).
-@contextmanager
-def _exclusive_file_lock(path):
-
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "a+", encoding="utf-8") as handle:
-        if os.name == "nt":
-            import msvcrt
-
-            handle.seek(0)
-            while True:
-                try:
-                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
-                    break
-                except OSError:
-                    time.sleep(0.05)
-            try:
-                yield handle
-            finally:
-                handle.seek(0)
-                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
-        else:
-            import fcntl
-
-            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
-            try:
-                yield handle
-            finally:
-                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
-
-# Saves or updates a single domain's results into the shared output file.
-# Handles the lock-read-modify-write cycle so it's safe to call from multiple threads.
-def upsert_domain_result(result, output_path=OUTPUT_FILE):
+# Opens the mapped-URL store behind an output file (mapped_pages.json ->
+# mapped_pages.db). Output written before the store existed is imported the
+# first time, so --resume and --incremental still see those domains.
+def open_mapped_store(output_path=OUTPUT_FILE):
     output_path = Path(output_path)
+    store = MappedStore(store_path_for(output_path))
+    if not store.domain_count() and output_path.exists():
+        store.import_payload(_load_mapped_payload(output_path.read_text(encoding="utf-8")))
+    return store
+
+# Saves or updates a single domain's results in the mapped-URL store. Only that
+# domain's rows are written, so this stays cheap however many domains are
+# mapped; export_mapped_json() refreshes the JSON file from the store.
+def upsert_domain_result(result, output_path=OUTPUT_FILE, store=None):
+    if store is not None:
+        return store.upsert_domain(result)
+    store = open_mapped_store(output_path)
+    try:
+        return store.upsert_domain(result)
+    finally:
+        store.close()
+
+# Rewrites the output file from the mapped-URL store.
+def export_mapped_json(output_path=OUTPUT_FILE, store=None):
+    if store is not None:
+        store.export_json(output_path)
+        return
+    store = open_mapped_store(output_path)
+    try:
+        store.export_json(output_path)
+    finally:
+        store.close()
 
-    with _exclusive_file_lock(output_path) as handle:
-        handle.seek(0)
-        payload = _load_mapped_payload(handle.read())
-
-        domain_key = result.get("domain") or f"unknown_{len(payload['domains']) + 1}"
-        result_with_timestamp = dict(result)
-        result_with_timestamp["updated_at"] = _timestamp_utc()
-        payload["domains"][domain_key] = result_with_timestamp
 
-        payload["domains"] = dict(sorted(payload["domains"].items()))
-        payload["domain_count"] = len(payload["domains"])
-        payload["updated_at"] = _timestamp_utc()
+# True if a stored domain result was written less than max_age_hours ago.
+def _is_recent(result, max_age_hours):
+    if not max_age_hours or not result.get("updated_at"):
+        return False
+    try:
+        updated = datetime.fromisoformat(result["updated_at"])
+    except ValueError:
+        return False
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - updated).total_seconds() < max_age_hours * 3600
 
-        handle.seek(0)
-        handle.truncate()
-        json.dump(payload, handle, indent=2)
-        handle.flush()
 
-# Maps a list of domains, optionally in parallel, and writes each result to the output file
-# as soon as it finishes. Falls back to one-at-a-time if there's only one domain.
+# Maps a list of domains, optionally in parallel, and saves each result to the mapped-URL
+# store as soon as it finishes. The output file is exported from the store once at the end
+# (also when interrupted). Falls back to one-at-a-time if there's only one domain.
+# With incremental=True, domains already in the output file are refreshed with
+# remap_domain instead of a full crawl, and ones mapped less than max_age_hours
+# ago are skipped entirely. fused=True passes through to map_domain/remap_domain.
 def map_domains_batch(domains, include_subdomains=True, workers=1,
-                      max_pages=None, delay=0.3, output_path=OUTPUT_FILE):
+                      max_pages=None, delay=0.3, output_path=OUTPUT_FILE,
+                      concurrency=4, per_host=2, resume=False, checkpoint_every=50,
+                      best_first=True, incremental=False, max_age_hours=None,
+                      fused=False):
 
     workers = max(1, min(workers, len(domains)))
+    store = open_mapped_store(output_path)
+    previous = store.domain_results() if incremental else {}
+
+    def map_one(domain):
+        prior = previous.get(domain)
+        if prior and prior.get("status") == "success":
+            if _is_recent(prior, max_age_hours):
+                print(f"Skipping {domain}: mapped {prior['updated_at']} (< {max_age_hours}h ago).")
+                return None
+            return remap_domain(domain, prior, include_subdomains=include_subdomains,
+                                max_pages=max_pages, delay=delay, concurrency=concurrency,
+                                per_host=per_host, best_first=best_first, fused=fused)
+        return map_domain(domain, include_subdomains=include_subdomains,
+                          max_pages=max_pages, delay=delay,
+                          concurrency=concurrency, per_host=per_host,
+                          resume=resume, checkpoint_every=checkpoint_every,
+                          best_first=best_first, fused=fused)
+
+    def finish(result):
+        if result is None:
+            return
+        upsert_domain_result(result, store=store)
+        _print_result_summary(result, store.path)
 
-    if workers == 1:
-        for domain in domains:
-            result = map_domain(domain, include_subdomains=include_subdomains,
-                                max_pages=max_pages, delay=delay)
-            upsert_domain_result(result, output_path=output_path)
-            _print_result_summary(result, output_path)
-        return
-
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {
-            executor.submit(map_domain, domain, include_subdomains,
-                            max_pages, delay): domain
-            for domain in domains
-        }
-        for future in as_completed(futures):
-            result = future.result()
-            upsert_domain_result(result, output_path=output_path)
-            _print_result_summary(result, output_path)
+    try:
+        if workers == 1:
+            for domain in domains:
+                finish(map_one(domain))
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(map_one, domain): domain for domain in domains}
+            for future in as_completed(futures):
+                finish(future.result())
+    finally:
+        store.export_json(output_path)
+        store.close()
 
 # Prints a quick summary after each domain finishes so you can see progress in the terminal
 def _print_result_summary(result, output_path):
@@ -606,6 +1192,15 @@ def _print_result_summary(result, output_path):
             f"Total: {result['found_count']} URLs."
         )
         print(f"Saved/updated {output_path}")
+        if result.get("robots_blocked"):
+            print(f"Skipped {result['robots_blocked']} URL(s) disallowed by robots.txt.")
+        if result.get("pages_captured"):
+            print(f"Captured {result['pages_captured']} page(s) into the scrape worker's page store.")
+
+        for trap in result.get("traps") or []:
+            print(f"Crawler trap ({trap['reason']}): {trap['template']} | "
+                  f"{trap['pages_fetched']} fetched, {trap['urls_pruned']} pruned, "
+                  f"{trap['links_dropped']} links dropped")
 
         print("Top 5 examples:")
         for u in result["urls"][:5]:
@@ -643,7 +1238,52 @@ def _parse_args():
         "--delay",
         type=float,
         default=0.3,
-        help="Seconds to wait between requests during BFS (default: 0.3).",
+        help="Starting seconds between requests to the same host during BFS; adapts to the "
+             "host's speed, errors and robots.txt Crawl-delay (default: 0.3).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Max pages fetched at once per domain during BFS (default: 4).",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=2,
+        help="Max concurrent requests to any one host during BFS (default: 2).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume interrupted crawls from mapper/crawl_state.db instead of starting over.",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=50,
+        help="Checkpoint crawl progress every N pages (0 = off, default: 50).",
+    )
+    parser.add_argument(
+        "--breadth-first",
+        action="store_true",
+        help="Crawl in plain breadth-first order instead of ranking links by benefit likelihood.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Refresh domains already in the output file from sitemap lastmod and conditional requests.",
+    )
+    parser.add_argument(
+        "--max-age-hours",
+        type=float,
+        default=None,
+        help="With --incremental, skip domains mapped less than this many hours ago.",
+    )
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="Also save fetched pages to the scrape worker's page store (fused map+scrape).",
     )
     parser.add_argument(
         "--no-subdomains",
@@ -698,6 +1338,14 @@ if __name__ == "__main__":
             output_path=output_file,
             max_pages=args.max_pages,
             delay=args.delay,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            resume=args.resume,
+            checkpoint_every=args.checkpoint_every,
+            best_first=not args.breadth_first,
+            incremental=args.incremental,
+            max_age_hours=args.max_age_hours,
+            fused=args.fused,
             log_file=args.log_file,
         )
         print(f"Started background mapper process PID {pid}.")
@@ -714,4 +1362,12 @@ if __name__ == "__main__":
         max_pages=args.max_pages,
         delay=args.delay,
         output_path=output_file,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        resume=args.resume,
+        checkpoint_every=args.checkpoint_every,
+        best_first=not args.breadth_first,
+        incremental=args.incremental,
+        max_age_hours=args.max_age_hours,
+        fused=args.fused,
     )
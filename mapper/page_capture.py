@@ -0,0 +1,63 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# worker_service lives one level up from mapper/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from worker_service.pack_store import save_pages  # noqa: E402
+from worker_service.worker import _extract_page, _sha256  # noqa: E402
+
+# Captured pages are written to the worker's page store this many at a time.
+CAPTURE_BATCH = 50
+
+
+# Fused map+scrape: hands the pages bfs_crawl downloads to the scrape worker's
+# page store instead of throwing the HTML away once its links are read.
+# add() runs on the crawl's fetch threads and extracts each page exactly the
+# way the worker does (same title, normalized text and quality check; rejected
+# pages are left for the worker to fetch and report). flush() runs on the
+# crawl thread and saves the batch under `domain`, the same key scrape_all.py
+# scrapes the domain under, with the page's ETag and Last-Modified so later
+# scrapes can revalidate it. A scrape run with --reuse-within-hours then
+# serves these pages from the store instead of downloading them again.
+class PageCapture:
+    def __init__(self, domain, batch_size=CAPTURE_BATCH):
+        self.domain = domain
+        self.batch_size = max(1, batch_size)
+        self.captured = 0
+        self.rejected = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+    # Extracts one fetched page (a requests.Response with a 2xx status) and
+    # queues it for the next flush.
+    def add(self, url, response):
+        title, normalized_text, reject_reason = _extract_page(
+            url, response.content, response.headers.get("Content-Type"),
+        )
+        if reject_reason:
+            with self._lock:
+                self.rejected += 1
+            return
+        page = {
+            "url": url,
+            "title": title,
+            "normalized_text": normalized_text,
+            "text_hash": _sha256(normalized_text),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self._pending.append(page)
+
+    # Saves queued pages once a full batch is waiting, or all of them with
+    # force=True (at the end of a crawl).
+    def flush(self, force=False):
+        with self._lock:
+            if not self._pending or (not force and len(self._pending) < self.batch_size):
+                return
+            pages, self._pending = self._pending, []
+        save_pages(self.domain, pages, time.time())
+        self.captured += len(pages)
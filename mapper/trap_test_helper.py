@@ -0,0 +1,81 @@
+# trap_test_helper.py -- Manual checks for crawler trap detection: article
+# families that link to each other stay in the crawl, per-day calendars don't.
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from traps import TRAP_MIN_PAGES, TrapDetector, content_fingerprint
+
+
+def _article_text(n):
+    topics = ["tuition waiver", "food pantry", "emergency grant", "laptop loan", "child care",
+              "bus pass", "housing aid", "counseling", "textbook fund", "tax clinic"]
+    offices = ["financial aid", "student life", "the dean of students", "career services",
+               "the library", "veteran services", "housing", "the health center", "it services",
+               "the registrar", "athletics"]
+    audiences = ["first-year students", "transfer students", "graduate students", "parents",
+                 "commuters", "international students", "veterans", "part-time students",
+                 "student workers", "residents", "online learners", "seniors", "athletes"]
+    topic = topics[n % len(topics)]
+    office = offices[(n * 7) % len(offices)]
+    audience = audiences[(n * 3) % len(audiences)]
+    return (f"Campus News | Article {n} | {office.title()} opens a {topic} program for "
+            f"{audience}. Read the {topic} eligibility rules and how to apply through {office}. "
+            f"Next article | Related: {topics[(n + 3) % len(topics)]}")
+
+
+def _calendar_text(day):
+    return f"Campus Calendar | Events for {day.isoformat()} | No events scheduled. Previous day | Next day"
+
+
+def run_manual_trap_checks():
+    pages = TRAP_MIN_PAGES * 3
+
+    # /news/{n}: every article links to the next one and nowhere else new,
+    # but each body is different, so the template is content, not a trap.
+    detector = TrapDetector()
+    for n in range(1, pages + 1):
+        url = f"https://www.x.edu/news/{n}"
+        flagged = detector.record(url, [f"https://www.x.edu/news/{n + 1}"],
+                                  content_fingerprint(_article_text(n)))
+        if flagged:
+            raise AssertionError(f"article template flagged as a trap after {n} pages: {flagged}")
+    if detector.report():
+        raise AssertionError(f"article template reported as a trap: {detector.report()}")
+
+    # /calendar/{date}: every day links to the next day and shows the same
+    # empty listing, so it is flagged once TRAP_MIN_PAGES days are fetched.
+    detector = TrapDetector()
+    start = date(2026, 3, 1)
+    flagged_at = None
+    for k in range(pages):
+        day = start + timedelta(days=k)
+        url = f"https://www.x.edu/calendar/{day.isoformat()}"
+        next_url = f"https://www.x.edu/calendar/{(day + timedelta(days=1)).isoformat()}"
+        if detector.record(url, [next_url], content_fingerprint(_calendar_text(day))):
+            flagged_at = k + 1
+            break
+    if flagged_at != TRAP_MIN_PAGES:
+        raise AssertionError(f"calendar template flagged after {flagged_at} pages, "
+                             f"expected {TRAP_MIN_PAGES}")
+    if not detector.flagged("https://www.x.edu/calendar/2027-01-01"):
+        raise AssertionError("calendar template not reported as flagged")
+
+    # Without fingerprints (e.g. every page answered 304) there is no content
+    # evidence, so nothing is flagged.
+    detector = TrapDetector()
+    for k in range(pages):
+        day = start + timedelta(days=k)
+        if detector.record(f"https://www.x.edu/calendar/{day.isoformat()}",
+                           [f"https://www.x.edu/calendar/{(day + timedelta(days=1)).isoformat()}"]):
+            raise AssertionError("template flagged without content fingerprints")
+
+    print("Manual trap detection checks passed.")
+    print(f"Calendar template flagged after {flagged_at} pages; article template never flagged.")
+
+
+if __name__ == "__main__":
+    run_manual_trap_checks()
@@ -0,0 +1,158 @@
+import hashlib
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# A template needs this many fetched pages before it can be judged a trap.
+TRAP_MIN_PAGES = 20
+# Trap templates keep producing new URLs of their own template (next day,
+# next page, next tag) on at least this share of fetched pages...
+TRAP_MIN_SELF_RATE = 0.5
+# ...while leading to new URLs outside the template on at most this share...
+TRAP_MAX_NOVELTY = 0.1
+# ...and repeating the same text: at most this share of its fetched pages may
+# have distinct content (digits aside, so "Events for 2026-03-14" and "Events
+# for 2026-03-15" count as the same page). Article and listing families link
+# to each other just as much but carry a different body on every page.
+TRAP_MAX_DISTINCT_CONTENT = 0.5
+# A path that repeats one segment this many times is a relative-link loop
+# (/a/b/a/b/a/b) and is treated as a trap straight away.
+TRAP_MAX_SEGMENT_REPEATS = 3
+
+_DATE_SEGMENT = re.compile(r"\d{4}-\d{1,2}(?:-\d{1,2})?|\d{8}")
+_HEX_ID_SEGMENT = re.compile(r"(?=[0-9a-f-]*\d)[0-9a-f-]{16,}")
+_DIGITS = re.compile(r"\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+# Reduces a URL to its path template: host plus path with the variable parts
+# replaced, e.g. https://www.x.edu/events/2026-03-14/page-2 ->
+# www.x.edu/events/{date}/page-{n}. Pages generated from one pattern (per-day
+# calendar views, numbered listings, tag pages) share a template.
+@lru_cache(maxsize=1 << 16)
+def url_template(url):
+    parts = urlsplit(url)
+    template = []
+    for segment in parts.path.lower().split("/"):
+        if not segment:
+            continue
+        if _DATE_SEGMENT.fullmatch(segment):
+            template.append("{date}")
+        elif segment.isdigit():
+            template.append("{n}")
+        elif _HEX_ID_SEGMENT.fullmatch(segment):
+            template.append("{id}")
+        else:
+            template.append(_DIGITS.sub("{n}", segment))
+    return parts.netloc.lower() + "/" + "/".join(template)
+
+
+# Fingerprint of a page's visible text for TrapDetector.record: lowercased,
+# whitespace collapsed and digit runs masked, so pages that differ only in the
+# date or page number they show get the same fingerprint.
+def content_fingerprint(text):
+    normalized = _WHITESPACE.sub(" ", _DIGITS.sub("#", text.lower())).strip()
+    return hashlib.sha1(normalized.encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+
+def _repeats_segment(url, limit):
+    segments = [seg for seg in urlsplit(url).path.lower().split("/") if seg]
+    return any(segments.count(seg) >= limit for seg in set(segments))
+
+
+# Learns crawler traps during one crawl. For every fetched page, bfs_crawl
+# reports the URLs it newly discovered; per path template the detector counts
+# pages fetched, pages that led to new URLs of the same template, pages that
+# led to anything else, and the distinct content fingerprints among them. A
+# template that keeps feeding itself, almost never leads anywhere new and
+# keeps serving the same text (calendar day views linking to the next day,
+# empty pagination) is flagged once it has TRAP_MIN_PAGES fetched pages, and
+# bfs_crawl prunes it from the frontier and drops new links to it. Pages of a
+# template with real content (/news/{n} with "next article" links) differ in
+# text, so that template is never flagged however much it links to itself.
+# Only bfs_crawl's dispatch thread uses it, so there is no locking.
+class TrapDetector:
+    def __init__(self, min_pages=TRAP_MIN_PAGES, min_self_rate=TRAP_MIN_SELF_RATE,
+                 max_novelty=TRAP_MAX_NOVELTY, max_distinct_content=TRAP_MAX_DISTINCT_CONTENT,
+                 max_segment_repeats=TRAP_MAX_SEGMENT_REPEATS):
+        self.min_pages = max(1, min_pages)
+        self.min_self_rate = min_self_rate
+        self.max_novelty = max_novelty
+        self.max_distinct_content = max_distinct_content
+        self.max_segment_repeats = max_segment_repeats
+        self._stats = {}       # template -> [fetched, fed_itself, found_other]
+        self._content = {}     # template -> [pages fingerprinted, {fingerprints}]
+        self.traps = {}        # template -> report entry
+
+    # True if url belongs to a trap that has already been flagged.
+    def flagged(self, url):
+        return url_template(url) in self.traps
+
+    # True if url belongs to a known trap (and counts it as dropped). Paths
+    # that loop over the same segment become a trap on first sight.
+    def is_trap(self, url):
+        template = url_template(url)
+        trap = self.traps.get(template)
+        if trap is None and self.max_segment_repeats and _repeats_segment(url, self.max_segment_repeats):
+            trap = self._flag(template, "repeated-path")
+        if trap is None:
+            return False
+        trap["links_dropped"] += 1
+        return True
+
+    # Records a fetched page, the URLs it newly added to the crawl and its
+    # content_fingerprint (None when the page wasn't read, e.g. a 304). Returns
+    # the page's template if this page tipped it into a trap, else None. Only
+    # pages with a fingerprint count as content evidence, so a template is
+    # never flagged without TRAP_MIN_PAGES of them.
+    def record(self, url, new_links, fingerprint=None):
+        template = url_template(url)
+        if template in self.traps:
+            return None
+        stats = self._stats.setdefault(template, [0, 0, 0])
+        stats[0] += 1
+        own = sum(1 for link in new_links if url_template(link) == template)
+        if own:
+            stats[1] += 1
+        if len(new_links) > own:
+            stats[2] += 1
+        content = self._content.setdefault(template, [0, set()])
+        if fingerprint is not None:
+            content[0] += 1
+            content[1].add(fingerprint)
+
+        fetched, fed_itself, found_other = stats
+        read, fingerprints = content
+        if (fetched >= self.min_pages
+                and fed_itself >= self.min_self_rate * fetched
+                and found_other <= self.max_novelty * fetched
+                and read >= self.min_pages
+                and len(fingerprints) <= self.max_distinct_content * read):
+            self._flag(template, "self-generating")
+            return template
+        return None
+
+    def _flag(self, template, reason):
+        fetched, fed_itself, found_other = self._stats.get(template, (0, 0, 0))
+        trap = {
+            "template": template,
+            "reason": reason,
+            "pages_fetched": fetched,
+            "pages_leading_elsewhere": found_other,
+            "distinct_pages": len(self._content.get(template, (0, ()))[1]),
+            "urls_pruned": 0,
+            "links_dropped": 0,
+        }
+        self.traps[template] = trap
+        return trap
+
+    # Adds to a trap's count of queued URLs removed from the frontier.
+    def note_pruned(self, template, count):
+        self.traps[template]["urls_pruned"] += count
+
+    # Trap entries for the map report, most wasteful first.
+    def report(self):
+        return sorted(
+            self.traps.values(),
+            key=lambda t: (-(t["urls_pruned"] + t["links_dropped"]), t["template"]),
+        )
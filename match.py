@@ -2,7 +2,7 @@
 # that match the user's profile. Thin wrapper around matching/controller.py,
 # same pattern as map.py wrapping mapper and scrape_all.py wrapping the worker.
 # Usage: python match.py --user john_doe
-#        python match.py --user john_doe --model llama3:8b --delay 3
+#        python match.py --user john_doe --model llama3:8b --parallel 4
 #        python match.py --user john_doe --url https://example.edu/scholarships
 
 import argparse
@@ -15,6 +15,8 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 import ollama_client
 from matching.controller import run_matching_pipeline, run_single_page
+from matching.filter import DEFAULT_SEMANTIC_THRESHOLD
+from matching.matcher import resolve_parallel
 from viewer.parsers import slim_benefits
 from viewer.templates import BENEFITS_HTML
 
@@ -74,7 +76,9 @@ def _main_inner():
     parser.add_argument("--user", required=True, help="Username from answers.json")
     parser.add_argument("--model", default=ollama_client.DEFAULT_MODEL, help="Ollama model name")
     parser.add_argument("--delay", type=int, default=5,
-                        help="Seconds between Ollama calls (default: 5)")
+                        help="Deprecated: the matcher no longer sleeps between pages (see --parallel)")
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="Max in-flight Ollama match requests (default: $OLLAMA_NUM_PARALLEL or 1)")
     parser.add_argument(
         "--verify-pass2",
         dest="verify_pass2",
@@ -110,6 +114,24 @@ def _main_inner():
         action="store_false",
         help="Disable profile-derived keyword suggestions and use only base keywords",
     )
+    parser.add_argument(
+        "--semantic-filter",
+        dest="semantic",
+        action="store_true",
+        help="Rank/trim keyword-relevant pages by embedding similarity to the profile (default: off)",
+    )
+    parser.add_argument(
+        "--semantic-top-k",
+        type=int,
+        default=None,
+        help="With --semantic-filter, keep at most this many of the most similar pages",
+    )
+    parser.add_argument(
+        "--semantic-threshold",
+        type=float,
+        default=DEFAULT_SEMANTIC_THRESHOLD,
+        help=f"With --semantic-filter, minimum cosine similarity to keep a page (default: {DEFAULT_SEMANTIC_THRESHOLD})",
+    )
     parser.set_defaults(verify_pass2=True, profile_keywords=True)
     parser.add_argument("--scraped-dir", type=Path, default=PROJECT_ROOT / "scraped_output",
                         help="Directory with scraped output files")
@@ -137,6 +159,7 @@ def _main_inner():
             low_priority=args.low_priority,
             num_threads=args.num_threads,
             profile_keywords=args.profile_keywords,
+            parallel=args.parallel,
         )
 
         print(f"\n=== Real-time Matching Complete ===")
@@ -156,7 +179,7 @@ def _main_inner():
         print(f"Model: {resolved_model}")
     else:
         print(f"Model: {resolved_model} (default)")
-    print(f"Delay: {args.delay}s")
+    print(f"Parallel: {resolve_parallel(args.parallel)}")
     print(f"Pass2 verify: {'on' if args.verify_pass2 else 'off'}")
     print(f"Low priority: {'on' if args.low_priority else 'off'}")
     if args.num_threads:
@@ -164,6 +187,7 @@ def _main_inner():
     else:
         print("Ollama threads: default")
     print(f"Profile keywords: {'on' if args.profile_keywords else 'off'}")
+    print(f"Semantic filter: {'on' if args.semantic else 'off'}")
     print(f"Scraped dir: {args.scraped_dir}")
     print(f"Output: {args.output}\n")
 
@@ -177,6 +201,10 @@ def _main_inner():
         low_priority=args.low_priority,
         num_threads=args.num_threads,
         profile_keywords=args.profile_keywords,
+        parallel=args.parallel,
+        semantic=args.semantic,
+        semantic_top_k=args.semantic_top_k,
+        semantic_threshold=args.semantic_threshold,
     )
 
     if envelope.results:
@@ -1,7 +1,7 @@
 # match_it.py -- Convenience script for testing the matching pipeline.
 # Runs against whatever is currently scraped and stored.
 # Usage: python match_it.py
-#        python match_it.py --user default_user --delay 0 --verbose
+#        python match_it.py --user default_user --parallel 2 --verbose
 
 import argparse
 import json
@@ -11,10 +11,13 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from matching.controller import load_user_answers, DEFAULT_RESULTS, DEFAULT_STATE
+from matching.controller import load_user_answers, DEFAULT_RESULTS, DEFAULT_STATE, DEFAULT_EMBEDDINGS
+from matching.filter import DEFAULT_SEMANTIC_THRESHOLD
 from matching.pipeline import run_pipeline, load_results, load_state
-from matching.matcher import load_scraped_lookup
+from matching.matcher import load_scraped_lookup, resolve_parallel
+import llm_cache
 import ollama_client
+from scraped_store import has_corpus
 
 
 def print_validation_report(stats, verbose):
@@ -79,6 +82,8 @@ def print_summary(scraped_count, results_path, state_path, stats, verbose):
     print(f"  Scraped pages on disk:    {scraped_count}")
     print(f"  Passed keyword filter:    {stats.get('pages_relevant', 0)}")
     print(f"  Filtered out:             {stats.get('pages_filtered', 0)}")
+    if stats.get("pages_semantic_cut"):
+        print(f"    (semantic cut:          {stats['pages_semantic_cut']})")
     print(f"  Total matches found:      {len(results)}")
 
     if state:
@@ -169,7 +174,7 @@ def print_performance(stats):
 
     if timings:
         print("\n  Time per stage:")
-        for stage in ["profile_keywords", "filter", "match", "validate", "detect"]:
+        for stage in ["profile_keywords", "filter", "semantic", "match", "validate", "detect"]:
             t = timings.get(stage)
             if t is not None:
                 print(f"    {stage:<12} {_fmt_time(t)}")
@@ -177,6 +182,10 @@ def print_performance(stats):
     if peak_ram > 0:
         print(f"\n  Peak RAM:                 {peak_ram:.0f} MB")
 
+    cache_stats = stats.get("llm_cache")
+    if cache_stats:
+        print(f"  LLM cache:                {llm_cache.format_stats(cache_stats)}")
+
     if llm_proposed > 0:
         pct = (llm_validated / llm_proposed) * 100
         print("\n  LLM efficiency:")
@@ -202,7 +211,13 @@ def main():
         "--delay",
         type=int,
         default=5,
-        help="Seconds between Ollama calls (default: 5, use 0 for fast testing)",
+        help="Deprecated: the matcher no longer sleeps between pages (see --parallel)",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=None,
+        help="Max in-flight Ollama match requests (default: $OLLAMA_NUM_PARALLEL or 1)",
     )
     parser.add_argument(
         "--model",
@@ -249,6 +264,24 @@ def main():
         action="store_false",
         help="Disable profile-derived keyword suggestions and use only base keywords",
     )
+    parser.add_argument(
+        "--semantic-filter",
+        dest="semantic",
+        action="store_true",
+        help="Rank/trim keyword-relevant pages by embedding similarity to the profile (default: off)",
+    )
+    parser.add_argument(
+        "--semantic-top-k",
+        type=int,
+        default=None,
+        help="With --semantic-filter, keep at most this many of the most similar pages",
+    )
+    parser.add_argument(
+        "--semantic-threshold",
+        type=float,
+        default=DEFAULT_SEMANTIC_THRESHOLD,
+        help=f"With --semantic-filter, minimum cosine similarity to keep a page (default: {DEFAULT_SEMANTIC_THRESHOLD})",
+    )
     parser.set_defaults(verify_pass2=True, profile_keywords=True)
     args = parser.parse_args()
 
@@ -273,7 +306,9 @@ def main():
             print("No users found. Complete the questionnaire in the GUI first.")
         sys.exit(1)
 
-    if not scraped_dir.exists() or not list(scraped_dir.glob("scraped_*.txt")):
+    if not scraped_dir.exists() or not (
+        has_corpus(scraped_dir) or list(scraped_dir.glob("scraped_*.txt"))
+    ):
         print(f"Error: No scraped data found in {scraped_dir}")
         print("Run `python scrape_all.py` first.")
         sys.exit(1)
@@ -286,11 +321,12 @@ def main():
         print(f"Model:      {resolved_model}")
     else:
         print(f"Model:      {resolved_model} (default)")
-    print(f"Delay:      {args.delay}s")
+    print(f"Parallel:   {resolve_parallel(args.parallel)}")
     print(f"Pass2:      {'on' if args.verify_pass2 else 'off'}")
     print(f"Priority:   {'low' if args.low_priority else 'normal'}")
     print(f"Threads:    {args.num_threads if args.num_threads else 'default'}")
     print(f"Profile KW: {'on' if args.profile_keywords else 'off'}")
+    print(f"Semantic:   {'on' if args.semantic else 'off'}")
     print(f"Pages:      {scraped_count} scraped")
     print()
 
@@ -308,6 +344,11 @@ def main():
         low_priority=args.low_priority,
         num_threads=args.num_threads,
         use_profile_keywords=args.profile_keywords,
+        parallel=args.parallel,
+        semantic=args.semantic,
+        semantic_top_k=args.semantic_top_k,
+        semantic_threshold=args.semantic_threshold,
+        embeddings_path=DEFAULT_EMBEDDINGS,
     )
 
     # Validation report first (what happened during this run)
@@ -13,6 +13,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from matching.filter import DEFAULT_SEMANTIC_THRESHOLD
 from matching.models import MatchResultsEnvelope
 from matching.pipeline import run_pipeline, load_results, save_results
 from matching.realtime import fetch_single_page_lookup
@@ -22,6 +23,7 @@ DEFAULT_SCRAPED_DIR = PROJECT_ROOT / "scraped_output"
 DEFAULT_RESULTS = PROJECT_ROOT / "matched_benefits.json"
 DEFAULT_STATE = PROJECT_ROOT / "pipeline_state.json"
 DEFAULT_REALTIME_STATE = PROJECT_ROOT / "pipeline_state_realtime.json"
+DEFAULT_EMBEDDINGS = PROJECT_ROOT / "embeddings"
 
 
 # Loads answers for a specific user from answers.json.
@@ -67,7 +69,7 @@ def resolve_user_answers(username):
     return username, None
 
 
-# Runs the full matching pipeline: keyword filter -> match.
+# Runs the full matching pipeline: keyword filter -> (semantic filter) -> match.
 # This is what match.py calls. Returns the results envelope.
 def run_matching_pipeline(
     user,
@@ -79,6 +81,10 @@ def run_matching_pipeline(
     low_priority=False,
     num_threads=None,
     profile_keywords=True,
+    parallel=None,
+    semantic=False,
+    semantic_top_k=None,
+    semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD,
 ):
     resolved_user, answers = resolve_user_answers(user)
     if not answers:
@@ -105,6 +111,11 @@ def run_matching_pipeline(
         low_priority=low_priority,
         num_threads=num_threads,
         use_profile_keywords=profile_keywords,
+        parallel=parallel,
+        semantic=semantic,
+        semantic_top_k=semantic_top_k,
+        semantic_threshold=semantic_threshold,
+        embeddings_path=DEFAULT_EMBEDDINGS,
     )
     return envelope
 
@@ -122,6 +133,7 @@ def run_single_page(
     low_priority=False,
     num_threads=None,
     profile_keywords=True,
+    parallel=None,
 ):
     resolved_user, answers = resolve_user_answers(user)
     if not answers:
@@ -146,6 +158,7 @@ def run_single_page(
         low_priority=low_priority,
         num_threads=num_threads,
         use_profile_keywords=profile_keywords,
+        parallel=parallel,
     )
     return [r for r in envelope.results if r.page_url == url]
 
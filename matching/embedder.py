@@ -1,17 +1,19 @@
 # embedder.py -- Generates vector embeddings for scraped page content
 # using nomic-embed-text through Ollama. First stage of the matching
-# pipeline: reads scraped_output/, embeds each page, saves vectors
-# to embeddings.json for the filter stage.
+# pipeline: reads scraped_output/, embeds each page, appends vectors
+# to the embeddings/ store (see vector_store.py) for the filter stage.
 
-import json
 import re
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import ollama_client
+import scraped_store
+
+from matching import vector_store
 
 EMBED_MODEL = ollama_client.EMBED_MODEL
 
@@ -48,10 +50,50 @@ def embed_text(text):
     return ollama_client.embed(truncate_for_embedding(text), model=EMBED_MODEL)
 
 
+# Batch limits for /api/embed. Batches are closed by total characters so a
+# run of long pages doesn't produce one huge request that hits the timeout,
+# while short pages still get packed many to a call.
+MAX_BATCH_CHARS = 64000
+MAX_BATCH_SIZE = 32
+
+
+# Embeds several texts in one request, returns vectors in input order.
+def embed_texts(texts):
+    return ollama_client.embed_batch(
+        [truncate_for_embedding(t) for t in texts], model=EMBED_MODEL,
+    )
+
+
+# Groups items into batches by total (truncated) text length.
+# items are tuples whose text sits at text_pos. Yields lists of items.
+def _iter_batches(items, text_pos, max_chars=MAX_BATCH_CHARS, max_size=MAX_BATCH_SIZE):
+    batch = []
+    batch_chars = 0
+    for item in items:
+        chars = min(len(item[text_pos]), MAX_EMBED_CHARS)
+        if batch and (batch_chars + chars > max_chars or len(batch) >= max_size):
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append(item)
+        batch_chars += chars
+    if batch:
+        yield batch
+
+
 # Parses scraped output files and yields (url, title, text, text_hash) tuples.
 # Same split logic as match.py's load_scraped_pages but also keeps the hash
-# so we can skip pages that haven't changed since last embed.
+# so we can skip pages that haven't changed since last embed. Reads the
+# corpus store instead when there is one, a chunk of rows at a time.
 def load_scraped_pages(scraped_dir):
+    stored = scraped_store.load_lookup(scraped_dir)
+    if stored is not None:
+        try:
+            yield from stored.iter_pages()
+        finally:
+            stored.close()
+        return
+
     for filepath in sorted(scraped_dir.glob("scraped_*.txt")):
         content = filepath.read_text(encoding="utf-8")
 
@@ -77,60 +119,85 @@ def load_scraped_pages(scraped_dir):
                 yield url, title, text, text_hash
 
 
-# Loads the embeddings cache from disk, or returns an empty structure.
-def load_embeddings(path):
-    if path.exists():
-        return json.loads(path.read_text(encoding="utf-8"))
-    return {"model": EMBED_MODEL, "updated_at": None, "pages": {}}
+# Imports a legacy embeddings.json sitting next to the store (same name with a
+# .json suffix) the first time the store is opened.
+def _migrate_legacy(store_dir):
+    store_dir = Path(store_dir)
+    imported = vector_store.import_legacy_json(store_dir.with_suffix(".json"), store_dir)
+    if imported:
+        print(f"  Imported {imported} embedding(s) from {store_dir.with_suffix('.json').name}.")
 
 
-# Writes the embeddings dict to disk as JSON.
-def save_embeddings(path, embeddings):
-    embeddings["updated_at"] = datetime.now().isoformat()
-    path.write_text(json.dumps(embeddings), encoding="utf-8")
+# Loads the embedding index: {url: {"row", "title", "text_hash", "embedded_at"}}.
+def load_embeddings(store_dir):
+    _migrate_legacy(store_dir)
+    _meta, index = vector_store.load_index(store_dir)
+    return index
 
 
-# Main entry point for the embedding stage.
-# Reads all scraped pages, embeds any that are new or changed since last run,
-# and saves the updated embeddings to output_path.
-# Returns (embedded_count, skipped_count).
-def embed_scraped_pages(scraped_dir, output_path, delay=5):
-    ensure_model()
+# Appends new/changed page embeddings to the store. entries is a list of
+# {"url", "title", "text_hash", "embedding"} dicts.
+def save_embeddings(store_dir, entries):
+    vector_store.append(store_dir, entries, EMBED_MODEL)
 
-    pages = list(load_scraped_pages(scraped_dir))
-    if not pages:
-        print("  No scraped pages found to embed.")
-        return 0, 0
-
-    embeddings = load_embeddings(output_path)
-    embedded_count = 0
-    skipped_count = 0
 
-    for i, (url, title, text, text_hash) in enumerate(pages, 1):
-        existing = embeddings["pages"].get(url)
-        if existing and existing.get("text_hash") == text_hash:
-            skipped_count += 1
-            continue
+# Opens every stored page vector as one float32 matrix for vectorized scoring.
+# Returns (urls, matrix) where matrix[i] is the embedding of urls[i] (None for
+# superseded rows). The matrix is memory-mapped, not copied. Returns ([], None)
+# when there is nothing stored or numpy is unavailable.
+def load_vector_index(store_dir):
+    _migrate_legacy(store_dir)
+    return vector_store.open_matrix(store_dir)
 
-        print(f"  [{i}/{len(pages)}] Embedding {url}...")
 
-        vector = embed_text(text)
-        embeddings["pages"][url] = {
-            "title": title,
-            "text_hash": text_hash,
-            "embedding": vector,
-            "embedded_at": datetime.now().isoformat(),
-        }
-        embedded_count += 1
+# Main entry point for the embedding stage.
+# Reads all scraped pages, embeds any that are new or changed since last run,
+# and appends them to the store at output_path, one batch per Ollama call.
+# Pages are read as batches fill, so at most one batch of page text is held
+# at a time. Each batch is saved as soon as it comes back so progress
+# survives interruption. delay is accepted for backward compatibility and no
+# longer used. Returns (embedded_count, skipped_count).
+def embed_scraped_pages(scraped_dir, output_path, delay=None):
+    ensure_model()
 
-        # Save after each page so progress survives interruption
-        save_embeddings(output_path, embeddings)
+    index = load_embeddings(output_path)
+    skipped_count = 0
 
-        # Delay between embed calls so Ollama isn't overwhelmed
-        if i < len(pages):
-            time.sleep(delay)
+    def pending_pages():
+        nonlocal skipped_count
+        for url, title, text, text_hash in load_scraped_pages(scraped_dir):
+            existing = index.get(url)
+            if existing and existing.get("text_hash") == text_hash:
+                skipped_count += 1
+                continue
+            yield url, title, text, text_hash
 
+    embedded_count = 0
+    for batch in _iter_batches(pending_pages(), text_pos=2):
+        print(
+            f"  [{embedded_count + len(batch)}] "
+            f"Embedding batch of {len(batch)} page(s)..."
+        )
+        vectors = embed_texts([text for _url, _title, text, _hash in batch])
+        now = datetime.now().isoformat()
+        save_embeddings(output_path, [
+            {
+                "url": url,
+                "title": title,
+                "text_hash": text_hash,
+                "embedding": vector,
+                "embedded_at": now,
+            }
+            for (url, title, _text, text_hash), vector in zip(batch, vectors)
+        ])
+        embedded_count += len(batch)
+
+    if not embedded_count and not skipped_count:
+        print("  No scraped pages found to embed.")
+        return 0, 0
     if skipped_count:
         print(f"  Skipped {skipped_count} unchanged page(s).")
+    if embedded_count:
+        vector_store.maybe_compact(output_path)
 
     return embedded_count, skipped_count
@@ -1,11 +1,19 @@
 # filter.py -- Keyword pre-filter for benefit pages.
 # Purpose: quickly answer "does this page talk about benefits at all?"
-# without running embeddings. Student-specific relevance is handled later
-# by the LLM matcher.
+# without running the LLM. Student-specific relevance is handled later
+# by the LLM matcher. An optional semantic stage (semantic_filter) ranks and
+# trims the keyword-relevant set by cosine similarity between the page
+# embeddings and an embedded profile query.
 
-import re
 from urllib.parse import urlparse
 
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
+
 # Category -> strong benefit keywords/phrases.
 # Generic words like "apply" or "deadline" are intentionally excluded,
 # because they create too many false positives on non-benefit pages.
@@ -60,16 +68,100 @@ BENEFIT_KEYWORDS = {
     },
 }
 
-def _build_single_word_patterns(keyword_map):
+def _is_single_word(keyword):
+    return " " not in keyword and "-" not in keyword and "/" not in keyword
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+# Aho-Corasick automaton over every keyword in keyword_map, so one pass over
+# the page text finds all keyword hits (overlapping ones included) instead
+# of one regex/substring scan per keyword. Returned as a plain dict:
+#   delta: per-state {char: next_state}, fully expanded over the keyword
+#          alphabet so scanning never has to walk failure links
+#   out: per-state keywords that end at that state
+#   bounded: single-word keywords that need regex-style \b on both ends
+#   categories: keyword -> sorted categories it belongs to
+def _build_keyword_automaton(keyword_map):
+    goto = [{}]
+    out = [[]]
+    categories = {}
+    for category, keywords in keyword_map.items():
+        for keyword in keywords:
+            categories.setdefault(keyword, []).append(category)
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            if keyword not in out[state]:
+                out[state].append(keyword)
+
+    alphabet = {ch for transitions in goto for ch in transitions}
+    fail = [0] * len(goto)
+    delta = [None] * len(goto)
+    delta[0] = {ch: goto[0].get(ch, 0) for ch in alphabet}
+    queue = list(goto[0].values())
+    head = 0
+    while head < len(queue):
+        state = queue[head]
+        head += 1
+        out[state] = out[state] + [kw for kw in out[fail[state]] if kw not in out[state]]
+        delta[state] = dict(delta[fail[state]])
+        for ch, nxt in goto[state].items():
+            # fail[nxt] is where the root-side transition from fail[state] leads
+            fail[nxt] = delta[fail[state]][ch] if state else 0
+            delta[state][ch] = nxt
+            queue.append(nxt)
+
     return {
-        keyword: re.compile(rf"\b{re.escape(keyword)}\b")
-        for keywords in keyword_map.values()
-        for keyword in keywords
-        if " " not in keyword and "-" not in keyword and "/" not in keyword
+        "delta": delta,
+        "out": [tuple(kws) for kws in out],
+        "bounded": {kw for kw in categories if _is_single_word(kw)},
+        "categories": {kw: sorted(cats) for kw, cats in categories.items()},
     }
 
 
-BASE_SINGLE_WORD_PATTERNS = _build_single_word_patterns(BENEFIT_KEYWORDS)
+# Single left-to-right pass; returns the set of keywords present in text.
+# Single-word keywords only count when they sit on word boundaries, same as
+# the old \bkeyword\b regex check.
+def _scan_keywords(text, automaton):
+    delta = automaton["delta"]
+    out = automaton["out"]
+    bounded = automaton["bounded"]
+    found = set()
+    state = 0
+    text_len = len(text)
+    for end, ch in enumerate(text):
+        state = delta[state].get(ch, 0)
+        if not out[state]:
+            continue
+        for keyword in out[state]:
+            if keyword in found:
+                continue
+            if keyword in bounded:
+                start = end - len(keyword) + 1
+                before = text[start - 1] if start > 0 else ""
+                after = text[end + 1] if end + 1 < text_len else ""
+                if before and _is_word_char(before) == _is_word_char(keyword[0]):
+                    continue
+                if not before and not _is_word_char(keyword[0]):
+                    continue
+                if after and _is_word_char(after) == _is_word_char(keyword[-1]):
+                    continue
+                if not after and not _is_word_char(keyword[-1]):
+                    continue
+            found.add(keyword)
+    return found
+
+
+BASE_KEYWORD_AUTOMATON = _build_keyword_automaton(BENEFIT_KEYWORDS)
 
 
 def _normalize_text(text):
@@ -120,12 +212,6 @@ def _merge_keyword_maps(extra_keywords=None):
     return merged
 
 
-def _keyword_present(normalized_text, keyword, single_word_patterns):
-    if keyword in single_word_patterns:
-        return single_word_patterns[keyword].search(normalized_text) is not None
-    return keyword in normalized_text
-
-
 # Custom (non-.edu/.gov) pages are user-curated and bypass keyword gating.
 def _is_custom_domain(url):
     host = urlparse(url).netloc.lower()
@@ -138,24 +224,31 @@ def _is_custom_domain(url):
 
 
 # Returns {category: [matched_keywords]}.
-def detect_benefit_keywords(page_text, keyword_map=None, single_word_patterns=None):
+# Pass a prebuilt automaton (see _build_keyword_automaton) when scanning many
+# pages with the same keyword_map; single_word_patterns is still accepted for
+# older callers but no longer used.
+def detect_benefit_keywords(page_text, keyword_map=None, single_word_patterns=None, automaton=None):
     normalized = _normalize_text(page_text)
     if not normalized:
         return {}
 
     keyword_map = keyword_map or BENEFIT_KEYWORDS
-    single_word_patterns = single_word_patterns or BASE_SINGLE_WORD_PATTERNS
+    if automaton is None:
+        if keyword_map is BENEFIT_KEYWORDS:
+            automaton = BASE_KEYWORD_AUTOMATON
+        else:
+            automaton = _build_keyword_automaton(keyword_map)
 
     matched = {}
-    for category, keywords in keyword_map.items():
-        hits = [
-            kw
-            for kw in sorted(keywords)
-            if _keyword_present(normalized, kw, single_word_patterns)
-        ]
-        if hits:
-            matched[category] = hits
-    return matched
+    for keyword in _scan_keywords(normalized, automaton):
+        for category in automaton["categories"][keyword]:
+            matched.setdefault(category, []).append(keyword)
+
+    return {
+        category: sorted(matched[category])
+        for category in keyword_map
+        if category in matched
+    }
 
 
 # Main entry point for keyword pre-filtering.
@@ -167,7 +260,7 @@ def filter_pages(scraped_lookup, extra_keywords=None):
         return [], []
 
     keyword_map = _merge_keyword_maps(extra_keywords=extra_keywords)
-    single_word_patterns = _build_single_word_patterns(keyword_map)
+    automaton = _build_keyword_automaton(keyword_map)
 
     relevant = []
     not_relevant = []
@@ -177,7 +270,7 @@ def filter_pages(scraped_lookup, extra_keywords=None):
         matches = detect_benefit_keywords(
             text,
             keyword_map=keyword_map,
-            single_word_patterns=single_word_patterns,
+            automaton=automaton,
         )
         categories = sorted(matches.keys())
         keyword_hits = sorted({kw for kws in matches.values() for kw in kws})
@@ -228,3 +321,89 @@ def filter_pages(scraped_lookup, extra_keywords=None):
             print(f"  Top keyword categories: {top_text}")
 
     return relevant, not_relevant
+
+
+# -- semantic stage -------------------------------------------------------
+
+# Cosine similarity cut for nomic-embed-text. Benefit pages for a matching
+# profile usually land well above this; navigation and news pages below it.
+DEFAULT_SEMANTIC_THRESHOLD = 0.45
+
+
+# Turns profile signals into a short natural-language query to embed.
+# Only normalized facts are used -- no names, addresses, or IDs.
+def build_profile_query(profile_signals):
+    signals = profile_signals if isinstance(profile_signals, dict) else {}
+    parts = ["Student benefits, financial aid, scholarships, and support services"]
+
+    classification = str(signals.get("classification") or "").strip()
+    if classification:
+        parts.append(f"for a {classification} student")
+    institution = str(signals.get("institution") or "").strip()
+    if institution:
+        parts.append(f"at {institution}")
+    majors = [str(t).strip() for t in signals.get("major_terms") or [] if str(t).strip()]
+    if majors:
+        parts.append(f"studying {', '.join(majors)}")
+
+    query = " ".join(parts) + "."
+    positive = [str(t).strip() for t in signals.get("positive_terms") or [] if str(t).strip()]
+    if positive:
+        query += f" Relevant topics: {', '.join(positive)}."
+    return query
+
+
+# Scores keyword-relevant pages against the profile vector in one matrix
+# multiply and cuts the ones that fall below threshold or outside top_k.
+# index_urls / matrix come from embedder.load_vector_index (row i is the
+# embedding of index_urls[i]; matrix may be a read-only memmap). Custom-domain pages and pages without an
+# embedding are always kept, since there's nothing to judge them on.
+# Returns (kept, cut); kept is re-ranked by semantic score.
+def semantic_filter(relevant, index_urls, matrix, profile_vector, top_k=None,
+                    threshold=DEFAULT_SEMANTIC_THRESHOLD):
+    if not _HAS_NUMPY:
+        print("  Semantic filter requested, but numpy is not installed. Skipping.")
+        return list(relevant), []
+    if not relevant or matrix is None or not len(index_urls):
+        return list(relevant), []
+
+    row_of = {url: i for i, url in enumerate(index_urls) if url}
+    scored = [
+        entry for entry in relevant
+        if entry.get("filter_reason") != "custom-domain-bypass" and entry["url"] in row_of
+    ]
+    if not scored:
+        return list(relevant), []
+
+    query = np.array(profile_vector, dtype=np.float32)
+    query /= (np.linalg.norm(query) or 1.0)
+    rows = matrix[[row_of[entry["url"]] for entry in scored]]
+    norms = np.linalg.norm(rows, axis=1)
+    norms[norms == 0] = 1.0
+    scores = (rows @ query) / norms
+
+    order = np.argsort(-scores, kind="stable")
+    rank_of = {int(idx): rank for rank, idx in enumerate(order)}
+
+    cut_ids = set()
+    for idx, entry in enumerate(scored):
+        score = float(scores[idx])
+        entry["semantic_score"] = round(score, 4)
+        if threshold is not None and score < threshold:
+            entry["filter_reason"] = "semantic-below-threshold"
+            cut_ids.add(id(entry))
+        elif top_k is not None and rank_of[idx] >= top_k:
+            entry["filter_reason"] = "semantic-outside-top-k"
+            cut_ids.add(id(entry))
+
+    kept = [entry for entry in relevant if id(entry) not in cut_ids]
+    cut = [entry for entry in relevant if id(entry) in cut_ids]
+    kept.sort(key=lambda x: (-x.get("semantic_score", -1.0), -x["keyword_hit_count"], x["url"]))
+    cut.sort(key=lambda x: x["url"])
+
+    unscored = len(relevant) - len(scored)
+    print(
+        f"  Semantic filter: {len(kept)} kept, {len(cut)} cut "
+        f"({len(scored)} scored, {unscored} without embedding or bypassed)."
+    )
+    return kept, cut
@@ -4,16 +4,18 @@
 # content. The LLM returns JSON matching the MatchResult schema.
 
 import json
+import os
 import re
 import sys
-import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import ollama_client
+import scraped_store
 
 from matching.models import MatchResult, CrossReference
 from matching.profile_signals import build_profile_signals
@@ -513,7 +515,15 @@ def to_match_result(raw, url, title, source_type, pipeline_run_id, profile_text=
 
 # Loads all scraped pages from the output directory into a dict keyed
 # by URL for fast lookup. Returns {url: (title, text)}.
+# When scrape_all.py has written the corpus store (scraped_pages.db), this
+# returns a read-only mapping over it instead: only the url index is loaded
+# and each page's text is read when it is looked up. Directories with only
+# scraped_*.txt files are parsed as before.
 def load_scraped_lookup(scraped_dir):
+    stored = scraped_store.load_lookup(scraped_dir)
+    if stored is not None:
+        return stored
+
     lookup = {}
     for filepath in sorted(scraped_dir.glob("scraped_*.txt")):
         content = filepath.read_text(encoding="utf-8")
@@ -539,55 +549,108 @@ def load_scraped_lookup(scraped_dir):
     return lookup
 
 
+# Sends one chunk of a page to the LLM and converts the JSON reply into
+# MatchResults. Raises on transport errors so callers can decide how to report.
+def _match_chunk(url, title, chunk, profile_text, profile_signals_text, hints_text, user_institution,
+                 source_type, pipeline_run_id, model, options):
+    prompt = build_user_prompt(
+        profile_text,
+        profile_signals_text,
+        hints_text,
+        user_institution,
+        url,
+        title,
+        chunk,
+    )
+    response = ollama_client.generate(
+        prompt, system=SYSTEM_PROMPT, model=model, options=options,
+        keep_alive="10m"
+    )
+
+    results = []
+    for raw in parse_response_json(response):
+        if not isinstance(raw, dict):
+            continue
+        result = to_match_result(
+            raw, url, title, source_type, pipeline_run_id,
+            profile_text=profile_text,
+            profile_signals_text=profile_signals_text,
+        )
+        if result.action != "not-relevant":
+            results.append(result)
+    return results
+
+
+def _chunk_options(llm_options):
+    options = dict(llm_options or {})
+    options["temperature"] = 0.1
+    return options
+
+
 # Matches a single page against the user's profile. Chunks the page text
 # if needed and calls phi3 for each chunk. Returns a list of MatchResults.
 def match_page(url, title, page_text, profile_text, profile_signals_text, hints_text, user_institution,
                source_type, pipeline_run_id, model=MATCH_MODEL, llm_options=None):
-    chunks = chunk_text(page_text)
     results = []
-    options = dict(llm_options or {})
-    options["temperature"] = 0.1
-
-    for chunk in chunks:
-        prompt = build_user_prompt(
-            profile_text,
-            profile_signals_text,
-            hints_text,
-            user_institution,
-            url,
-            title,
-            chunk,
-        )
+    options = _chunk_options(llm_options)
 
+    for chunk in chunk_text(page_text):
         try:
-            response = ollama_client.generate(
-                prompt, system=SYSTEM_PROMPT, model=model, options=options,
-                keep_alive="10m"
-            )
-            raw_benefits = parse_response_json(response)
-
-            for raw in raw_benefits:
-                if not isinstance(raw, dict):
-                    continue
-                result = to_match_result(
-                    raw, url, title, source_type, pipeline_run_id,
-                    profile_text=profile_text,
-                    profile_signals_text=profile_signals_text,
-                )
-                if result.action != "not-relevant":
-                    results.append(result)
-
+            results.extend(_match_chunk(
+                url, title, chunk, profile_text, profile_signals_text, hints_text,
+                user_institution, source_type, pipeline_run_id, model, options,
+            ))
         except Exception as exc:
             print(f"    Error: {exc}")
 
     return results
 
 
+# How many chunk requests stay in flight at once. Should match the Ollama
+# server's OLLAMA_NUM_PARALLEL so extra requests wait here instead of piling
+# up in Ollama's queue and hitting the request timeout.
+def resolve_parallel(parallel=None):
+    if isinstance(parallel, int) and parallel > 0:
+        return parallel
+    try:
+        return max(1, int(os.getenv("OLLAMA_NUM_PARALLEL", "1")))
+    except ValueError:
+        return 1
+
+
+# Prints the per-page log block once all of a page's chunks are back.
+def _report_page(i, total, url, page, chunk_count, results, errors):
+    gate_reason = page.get("filter_reason", "")
+    categories = page.get("keyword_categories", [])
+    category_text = f" categories={','.join(categories)}" if categories else ""
+    reason_text = f" gate={gate_reason}" if gate_reason else ""
+    chunk_label = f" ({chunk_count} chunks)" if chunk_count > 1 else ""
+    print(
+        f"  [{i}/{total}] Matching {url}"
+        f"{reason_text}{category_text}{chunk_label}..."
+    )
+    for exc in errors:
+        print(f"    Error: {exc}")
+
+    if results:
+        for r in results:
+            print(f"    -> {r.action}: {r.summary[:80]}... "
+                  f"(score: {r.relevance_score})")
+    else:
+        print(f"    No matches")
+
+
 # Main entry point for the matching stage.
 # Takes keyword-filtered pages (from filter.py) and runs the LLM matcher.
 # scraped_lookup format: {url: (title, text)}.
+# Chunks from all pages share one bounded pool of `parallel` in-flight
+# requests; a new chunk is only submitted when a slot frees up, so Ollama
+# sets the pace. Pages are reported and returned in filtered_pages order
+# no matter which chunk finishes first. delay is accepted for backward
+# compatibility and no longer used.
 def match_pages(answers, filtered_pages, scraped_dir=None, scraped_lookup=None,
-                pipeline_run_id="", model=MATCH_MODEL, delay=5, llm_options=None):
+                pipeline_run_id="", model=MATCH_MODEL, delay=None, llm_options=None,
+                parallel=None):
     ok, err = ollama_client.check_ollama(model)
     if not ok:
         raise ConnectionError(err)
@@ -597,6 +660,8 @@ def match_pages(answers, filtered_pages, scraped_dir=None, scraped_lookup=None,
     profile_signals_text = format_profile_signals_for_prompt(profile_signals)
     hints_text = format_hints_for_prompt(answers)
     user_institution = extract_user_institution(answers)
+    options = _chunk_options(llm_options)
+    parallel = resolve_parallel(parallel)
 
     if scraped_lookup is not None:
         scraped = scraped_lookup
@@ -604,49 +669,90 @@ def match_pages(answers, filtered_pages, scraped_dir=None, scraped_lookup=None,
         scraped = load_scraped_lookup(scraped_dir)
     else:
         raise ValueError("match_pages requires either scraped_lookup or scraped_dir")
+
+    total = len(filtered_pages)
+    print(f"  Parallel requests: {parallel}")
     all_results = []
     matched_count = 0
 
-    for i, page in enumerate(filtered_pages, 1):
-        url = page["url"]
-        entry = scraped.get(url)
-        if not entry:
-            print(f"  [{i}/{len(filtered_pages)}] {url} -- no scraped text, skipping")
-            continue
+    # slot per page: chunk results in chunk order, errors, chunks still pending
+    slots = [None] * total
+    next_to_report = 0
 
-        title, text = entry
-        source_type = detect_source_type(url)
-        gate_reason = page.get("filter_reason", "")
-        categories = page.get("keyword_categories", [])
-        category_text = f" categories={','.join(categories)}" if categories else ""
-        reason_text = f" gate={gate_reason}" if gate_reason else ""
-
-        chunks = chunk_text(text)
-        chunk_label = f" ({len(chunks)} chunks)" if len(chunks) > 1 else ""
-        print(
-            f"  [{i}/{len(filtered_pages)}] Matching {url}"
-            f"{reason_text}{category_text}{chunk_label}..."
-        )
+    def _jobs():
+        for pos, page in enumerate(filtered_pages):
+            url = page["url"]
+            entry = scraped.get(url)
+            if not entry:
+                slots[pos] = {"skipped": True}
+                continue
+            title, text = entry
+            chunks = chunk_text(text)
+            slots[pos] = {
+                "skipped": False,
+                "chunk_results": [None] * len(chunks),
+                "errors": [],
+                "pending": len(chunks),
+            }
+            source_type = detect_source_type(url)
+            for chunk_pos, chunk in enumerate(chunks):
+                yield pos, chunk_pos, url, title, chunk, source_type
+
+    # Flushes every leading page whose chunks have all come back.
+    def _flush_ready():
+        nonlocal next_to_report, matched_count
+        while next_to_report < total:
+            slot = slots[next_to_report]
+            if slot is None:
+                return
+            page = filtered_pages[next_to_report]
+            i = next_to_report + 1
+            if slot["skipped"]:
+                print(f"  [{i}/{total}] {page['url']} -- no scraped text, skipping")
+            else:
+                if slot["pending"]:
+                    return
+                results = [r for chunk in slot["chunk_results"] for r in (chunk or [])]
+                _report_page(
+                    i, total, page["url"], page, len(slot["chunk_results"]),
+                    results, slot["errors"],
+                )
+                matched_count += len(results)
+                all_results.extend(results)
+            slots[next_to_report] = None
+            next_to_report += 1
+
+    jobs = _jobs()
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        while True:
+            while len(in_flight) < parallel:
+                job = next(jobs, None)
+                if job is None:
+                    break
+                pos, chunk_pos, url, title, chunk, source_type = job
+                future = executor.submit(
+                    _match_chunk, url, title, chunk, profile_text, profile_signals_text,
+                    hints_text, user_institution, source_type, pipeline_run_id, model, options,
+                )
+                in_flight[future] = (pos, chunk_pos)
 
-        results = match_page(
-            url, title, text, profile_text, profile_signals_text, hints_text, user_institution,
-            source_type, pipeline_run_id, model, llm_options
-        )
+            _flush_ready()
+            if not in_flight:
+                break
 
-        if results:
-            matched_count += len(results)
-            all_results.extend(results)
-            for r in results:
-                print(f"    -> {r.action}: {r.summary[:80]}... "
-                      f"(score: {r.relevance_score})")
-        else:
-            print(f"    No matches")
+            done, _pending = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pos, chunk_pos = in_flight.pop(future)
+                slot = slots[pos]
+                try:
+                    slot["chunk_results"][chunk_pos] = future.result()
+                except Exception as exc:
+                    slot["errors"].append(exc)
+                slot["pending"] -= 1
 
-        # Delay between pages so phi3 isn't overwhelmed
-        if i < len(filtered_pages):
-            time.sleep(delay)
+    _flush_ready()
 
     print(f"  {matched_count} benefit(s) found across "
-          f"{len(filtered_pages)} page(s).")
+          f"{total} page(s).")
     return all_results
-
@@ -12,7 +12,10 @@ from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
 
+import requests
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import llm_cache
 import ollama_client
 
 try:
@@ -29,7 +32,8 @@ from matching.models import (
     PipelineProgress,
     MatchResultsEnvelope,
 )
-from matching.filter import filter_pages
+from matching.embedder import embed_scraped_pages, embed_text, load_vector_index
+from matching.filter import filter_pages, semantic_filter, build_profile_query, DEFAULT_SEMANTIC_THRESHOLD
 from matching.matcher import match_pages, load_scraped_lookup, format_profile, extract_user_institution
 from matching.profile_keywords import build_profile_keyword_map
 from matching.profile_signals import build_profile_signals
@@ -306,6 +310,35 @@ def _set_low_priority(verbose=False):
         print(f"  Failed to lower process priority: {exc}")
 
 
+# Ranks/trims the keyword-relevant pages by embedding similarity to the profile.
+# Refreshes page embeddings first when running from scraped_dir (unchanged
+# pages are skipped by text_hash). The semantic stage is optional: when
+# embeddings or the embed model aren't available (Ollama down, model not
+# pulled, a vector store built with another model or dimension) it falls back
+# to the keyword result instead of failing the run.
+def _apply_semantic_filter(relevant, answers, embeddings_path, scraped_dir=None,
+                           top_k=None, threshold=DEFAULT_SEMANTIC_THRESHOLD):
+    try:
+        if scraped_dir is not None:
+            embedded, _skipped = embed_scraped_pages(scraped_dir, embeddings_path)
+            if embedded:
+                print(f"  Embedded {embedded} new/changed page(s).")
+        urls, matrix = load_vector_index(embeddings_path)
+        if matrix is None:
+            print("  No page embeddings available. Keeping keyword result.")
+            return relevant, []
+        query = build_profile_query(build_profile_signals(answers))
+        profile_vector = embed_text(query)
+        return semantic_filter(
+            relevant, urls, matrix, profile_vector, top_k=top_k, threshold=threshold,
+        )
+    except (ConnectionError, TimeoutError, requests.RequestException, ValueError) as exc:
+        print(f"  Semantic filter skipped: {exc}")
+        return relevant, []
+    finally:
+        ollama_client.unload_model(ollama_client.EMBED_MODEL)
+
+
 # Stable hash of the answers dict so we can detect profile changes between runs.
 def _hash_answers(answers):
     raw = json.dumps(answers, sort_keys=True)
@@ -514,6 +547,11 @@ def run_pipeline(
     low_priority=False,
     num_threads=None,
     use_profile_keywords=True,
+    parallel=None,
+    semantic=False,
+    semantic_top_k=None,
+    semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD,
+    embeddings_path=None,
 ):
     if model is None:
         model = ollama_client.DEFAULT_MODEL
@@ -582,6 +620,7 @@ def run_pipeline(
         print(f"Starting pipeline run {run_id}")
 
     pipeline_start = time.time()
+    llm_cache.reset_stats()
     timings = {}
     peak_ram_mb = 0
 
@@ -666,8 +705,33 @@ def run_pipeline(
     _track_ram()
     log_resources("filter end", verbose)
 
+    semantic_cut = []
+    if semantic and relevant:
+        print("\n--- Semantic Filter ---")
+        t0 = time.time()
+        relevant, semantic_cut = _apply_semantic_filter(
+            relevant,
+            answers,
+            embeddings_path or Path(scraped_dir).parent / "embeddings",
+            scraped_dir=scraped_dir if scraped_lookup is None else None,
+            top_k=semantic_top_k,
+            threshold=semantic_threshold,
+        )
+        not_relevant = sorted(not_relevant + semantic_cut, key=lambda x: x["url"])
+        timings["semantic"] = time.time() - t0
+        _track_ram()
+
     if not relevant:
-        print("\nNo pages passed the keyword filter. Pipeline complete with no matches.")
+        if semantic_cut:
+            limits = [f"threshold {semantic_threshold:g}"]
+            if semantic_top_k:
+                limits.append(f"top-k {semantic_top_k}")
+            print(
+                f"\nThe semantic filter ({', '.join(limits)}) removed all {len(semantic_cut)} "
+                "keyword match(es). Pipeline complete with no matches."
+            )
+        else:
+            print("\nNo pages passed the keyword filter. Pipeline complete with no matches.")
         state.current_stage = "complete"
         _mark_stage_completed(state, "matching")
         save_state(state, state_path)
@@ -721,6 +785,7 @@ def run_pipeline(
             model=model,
             delay=delay,
             llm_options=llm_options,
+            parallel=parallel,
         )
 
         if new_results:
@@ -855,6 +920,8 @@ def run_pipeline(
         "pages_total": len(scraped),
         "pages_relevant": len(relevant),
         "pages_filtered": len(not_relevant),
+        "pages_semantic_cut": len(semantic_cut),
+        "llm_cache": llm_cache.get_stats(),
     }
 
     # ---- post-processing: dedup + upsert + cross-references ----
@@ -903,6 +970,7 @@ def run_pipeline(
 
     print("\n=== Pipeline Complete ===")
     print(f"Results: {len(all_results)}")
+    print(f"LLM cache: {llm_cache.format_stats(stats['llm_cache'])}")
     print(f"Output: {results_path}")
 
     return envelope, stats
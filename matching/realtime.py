@@ -28,21 +28,25 @@ from matching.profile_signals import build_profile_signals
 from matching.rules import format_hints_for_prompt
 from matching.validator import validate_matches, detect_missed_benefits
 from matching.pipeline import load_results, save_results, compute_cross_references
-from worker_service.worker import _content_quality_check, _normalize_text, _page_title, _sha256
+from worker_service.host_scheduler import shared_scheduler
+from worker_service.worker import _extract_page, _sha256
 
 
+# Fetches one user-added page through the shared host scheduler, so it is
+# paced (and backs off) together with any scrape running against the same
+# host. robots.txt is not consulted: the user asked for this exact page.
 def fetch_single_page_lookup(url, timeout_s=30):
     use_env_proxy = os.getenv("LPBD_USE_ENV_PROXY", "").strip().lower() in {"1", "true", "yes"}
     session = requests.Session()
     session.trust_env = use_env_proxy
     try:
         print(f"  Fetching {url}...")
-        response = session.get(url, timeout=timeout_s)
+        response = shared_scheduler().get(session, url, timeout=timeout_s)
         response.raise_for_status()
 
-        title = _page_title(response.text)
-        normalized_text = _normalize_text(response.text)
-        reject_reason = _content_quality_check(url, title, normalized_text)
+        title, normalized_text, reject_reason = _extract_page(
+            url, response.content, response.headers.get("Content-Type"),
+        )
         if reject_reason:
             raise ValueError(f"Page rejected by scraper quality check: {reject_reason}")
 
@@ -80,28 +84,27 @@ def fetch_page(url):
     return title, text
 
 
-# Embeds the page text and stores the vector in embeddings.json so it's
-# cached for future pipeline runs. Uses the embedder module directly.
+# Embeds the page text and appends the vector to the embeddings store so
+# it's cached for future pipeline runs. Uses the embedder module directly.
 def embed_single_page(url, title, text, embeddings_path):
     ensure_embed_model()
 
     text_hash = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
 
-    embeddings = load_embeddings(embeddings_path)
-    existing = embeddings["pages"].get(url)
+    existing = load_embeddings(embeddings_path).get(url)
     if existing and existing.get("text_hash") == text_hash:
         print(f"  Embedding cached (unchanged).")
         return
 
     print(f"  Embedding page with nomic-embed-text...")
     vector = embed_text(text)
-    embeddings["pages"][url] = {
+    save_embeddings(embeddings_path, [{
+        "url": url,
         "title": title,
         "text_hash": text_hash,
         "embedding": vector,
         "embedded_at": datetime.now().isoformat(),
-    }
-    save_embeddings(embeddings_path, embeddings)
+    }])
 
 
 # Matches a single URL immediately against the user's profile.
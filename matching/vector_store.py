@@ -0,0 +1,270 @@
+# vector_store.py -- Append-only binary store for page embeddings.
+# Replaces the old embeddings.json, which was re-serialized in full after
+# every page. Layout of a store directory:
+#   meta.json     {"model", "dim", "updated_at"}
+#   vectors.f32   raw float32 rows, one per embedded page version (append-only)
+#   index.jsonl   one line per append: {"url", "title", "text_hash", "row", "embedded_at"}
+#                 (the last line for a url wins)
+# Appending a page writes one row and one index line, so saving progress is
+# O(1) per page. Readers memory-map vectors.f32 with numpy, so the filter and
+# realtime paths see the whole matrix without copying it into Python floats.
+# Rows superseded by a newer embedding of the same url stay on disk until
+# compact() rewrites the store.
+# Writers (the pipeline, embedder runs and the realtime path can all append
+# at once) take an exclusive lock on LOCK_FILE, so row numbers never overlap.
+
+import json
+import os
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
+
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = "store.lock"
+ROW_ITEMSIZE = 4
+
+
+def _read_meta(store_dir):
+    path = Path(store_dir) / META_FILE
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {"model": None, "dim": None, "updated_at": None}
+
+
+# Replaces meta.json in one step, so readers outside the lock never see it
+# half written.
+def _write_meta(store_dir, meta):
+    meta["updated_at"] = datetime.now().isoformat()
+    tmp_path = Path(store_dir) / (META_FILE + ".tmp")
+    tmp_path.write_text(json.dumps(meta), encoding="utf-8")
+    tmp_path.replace(Path(store_dir) / META_FILE)
+
+
+# Holds the store's writer lock across processes and threads (each holder
+# opens its own handle, so threads of one process exclude each other too).
+@contextmanager
+def _locked(store_dir):
+    fd = os.open(Path(store_dir) / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 s; keep waiting.
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+# Number of complete rows on disk. A row cut short by a crash mid-write is
+# ignored, along with any index line pointing at it.
+def _row_count(store_dir, dim):
+    path = Path(store_dir) / VECTORS_FILE
+    if not dim or not path.exists():
+        return 0
+    return path.stat().st_size // (dim * ROW_ITEMSIZE)
+
+
+# Returns (meta, {url: {"row", "title", "text_hash", "embedded_at"}}) with
+# only the latest entry per url.
+def load_index(store_dir):
+    store_dir = Path(store_dir)
+    meta = _read_meta(store_dir)
+    rows = _row_count(store_dir, meta.get("dim"))
+    index = {}
+    path = store_dir / INDEX_FILE
+    if path.exists():
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(entry, dict) or entry.get("row", rows) >= rows:
+                    continue
+                index[entry["url"]] = entry
+    return meta, index
+
+
+# Appends embeddings to the store. entries is a list of dicts with
+# url, title, text_hash and embedding (list of floats). Vectors are written
+# before their index lines so a crash never leaves an index entry pointing
+# at a missing row, and the whole append runs under the store lock so the
+# start row and both writes belong to one writer.
+def append(store_dir, entries, model):
+    if not entries:
+        return
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with _locked(store_dir):
+        meta = _read_meta(store_dir)
+        dim = meta.get("dim") or len(entries[0]["embedding"])
+        if meta.get("model") and meta["model"] != model:
+            raise ValueError(
+                f"Embedding store {store_dir} was built with '{meta['model']}', not '{model}'. "
+                "Delete it to re-embed with the new model."
+            )
+
+        start_row = _row_count(store_dir, dim)
+        vectors_path = store_dir / VECTORS_FILE
+        if vectors_path.exists() and vectors_path.stat().st_size != start_row * dim * ROW_ITEMSIZE:
+            # Drop a partial row left behind by an interrupted write.
+            with vectors_path.open("r+b") as fh:
+                fh.truncate(start_row * dim * ROW_ITEMSIZE)
+
+        now = datetime.now().isoformat()
+        lines = []
+        with vectors_path.open("ab") as fh:
+            for offset, entry in enumerate(entries):
+                vector = entry["embedding"]
+                if len(vector) != dim:
+                    raise ValueError(
+                        f"Embedding for {entry['url']} has {len(vector)} dims, expected {dim}"
+                    )
+                fh.write(array("f", vector).tobytes())
+                lines.append(json.dumps({
+                    "url": entry["url"],
+                    "title": entry.get("title", ""),
+                    "text_hash": entry.get("text_hash", ""),
+                    "row": start_row + offset,
+                    "embedded_at": entry.get("embedded_at") or now,
+                }))
+
+        index_path = store_dir / INDEX_FILE
+        prefix = ""
+        if index_path.exists() and index_path.stat().st_size:
+            with index_path.open("rb") as fh:
+                fh.seek(-1, 2)
+                if fh.read(1) != b"\n":
+                    # Terminate a line cut short by an interrupted write.
+                    prefix = "\n"
+        with index_path.open("a", encoding="utf-8") as fh:
+            fh.write(prefix + "\n".join(lines) + "\n")
+
+        if meta.get("dim") != dim or meta.get("model") != model:
+            meta["dim"] = dim
+            meta["model"] = model
+        _write_meta(store_dir, meta)
+
+
+# Opens the store for vectorized scoring without copying it into memory.
+# Returns (urls_by_row, matrix) where matrix is a read-only float32 memmap and
+# urls_by_row[i] is the url whose latest embedding is row i (None for rows that
+# were superseded). Returns ([], None) if the store is empty or numpy is missing.
+def open_matrix(store_dir):
+    if not _HAS_NUMPY:
+        return [], None
+    meta, index = load_index(store_dir)
+    dim = meta.get("dim")
+    rows = _row_count(store_dir, dim)
+    if not rows or not index:
+        return [], None
+
+    matrix = np.memmap(
+        Path(store_dir) / VECTORS_FILE, dtype=np.float32, mode="r", shape=(rows, dim),
+    )
+    urls_by_row = [None] * rows
+    for url, entry in index.items():
+        urls_by_row[entry["row"]] = url
+    return urls_by_row, matrix
+
+
+# Reads the latest embedding for one url as a list of floats, or None.
+def get_vector(store_dir, url):
+    meta, index = load_index(store_dir)
+    entry = index.get(url)
+    if not entry:
+        return None
+    dim = meta["dim"]
+    with (Path(store_dir) / VECTORS_FILE).open("rb") as fh:
+        fh.seek(entry["row"] * dim * ROW_ITEMSIZE)
+        vector = array("f")
+        vector.frombytes(fh.read(dim * ROW_ITEMSIZE))
+    return vector.tolist()
+
+
+# Rewrites the store keeping only the latest row per url.
+# Returns the number of superseded rows dropped.
+def compact(store_dir):
+    store_dir = Path(store_dir)
+    if not (store_dir / INDEX_FILE).exists():
+        return 0
+    with _locked(store_dir):
+        return _compact(store_dir)
+
+
+def _compact(store_dir):
+    meta, index = load_index(store_dir)
+    dim = meta.get("dim")
+    total = _row_count(store_dir, dim)
+    if not index or total == len(index):
+        return 0
+
+    tmp_vectors = store_dir / (VECTORS_FILE + ".tmp")
+    tmp_index = store_dir / (INDEX_FILE + ".tmp")
+    row_bytes = dim * ROW_ITEMSIZE
+    with (store_dir / VECTORS_FILE).open("rb") as src, tmp_vectors.open("wb") as dst, \
+            tmp_index.open("w", encoding="utf-8") as idx:
+        for new_row, (url, entry) in enumerate(sorted(index.items(), key=lambda kv: kv[1]["row"])):
+            src.seek(entry["row"] * row_bytes)
+            dst.write(src.read(row_bytes))
+            idx.write(json.dumps({**entry, "row": new_row}) + "\n")
+
+    tmp_vectors.replace(store_dir / VECTORS_FILE)
+    tmp_index.replace(store_dir / INDEX_FILE)
+    _write_meta(store_dir, meta)
+    return total - len(index)
+
+
+# Compacts only when superseded rows make up more than max_stale_ratio of the file.
+def maybe_compact(store_dir, max_stale_ratio=0.5):
+    meta, index = load_index(store_dir)
+    total = _row_count(store_dir, meta.get("dim"))
+    if not total or (total - len(index)) / total <= max_stale_ratio:
+        return 0
+    return compact(store_dir)
+
+
+# One-time import of a legacy embeddings.json into an empty store.
+# Returns the number of pages imported.
+def import_legacy_json(json_path, store_dir):
+    json_path = Path(json_path)
+    if not json_path.exists() or (Path(store_dir) / INDEX_FILE).exists():
+        return 0
+    data = json.loads(json_path.read_text(encoding="utf-8"))
+    entries = [
+        {"url": url, **entry}
+        for url, entry in (data.get("pages") or {}).items()
+        if entry.get("embedding")
+    ]
+    append(store_dir, entries, data.get("model"))
+    return len(entries)
@@ -8,6 +8,8 @@ import time
 
 import requests
 
+import llm_cache
+
 OLLAMA_BASE = "http://localhost:11434"
 DEFAULT_MODEL = "llama3:8b"
 # DEFAULT_MODEL = "phi3:mini"
@@ -79,8 +81,17 @@ def start_server(timeout=20):
 # Good for matching where there's no conversation history.
 # options is passed through to Ollama's generation options (for example num_thread).
 # format is passed through to Ollama's response formatter, e.g. "json".
+# Responses are cached on disk by (model, system, prompt, options, format);
+# pass cache=False to always hit the server. See llm_cache.py.
 def generate(prompt, system=None, model=DEFAULT_MODEL, options=None, timeout=None, format=None,
-             keep_alive="10m"):
+             keep_alive="10m", cache=True):
+    cache_key = None
+    if cache:
+        cache_key = llm_cache.make_key(model, system, prompt, options, format)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     payload = {
         "model": model,
         "prompt": prompt,
@@ -98,7 +109,7 @@ def generate(prompt, system=None, model=DEFAULT_MODEL, options=None, timeout=Non
     try:
         r = requests.post(f"{OLLAMA_BASE}/api/generate", json=payload, timeout=req_timeout)
         r.raise_for_status()
-        return r.json()["response"]
+        response = r.json()["response"]
     except requests.ConnectionError:
         raise ConnectionError("Ollama is not running. Start it with: ollama serve")
     except requests.Timeout:
@@ -106,6 +117,10 @@ def generate(prompt, system=None, model=DEFAULT_MODEL, options=None, timeout=Non
             f"Ollama took too long to respond (>{req_timeout}s)."
         )
 
+    if cache_key:
+        llm_cache.put(cache_key, model, response)
+    return response
+
 
 # Sends a multi-turn chat request to Ollama and returns the assistant's reply.
 # messages is a list of {"role": "system"/"user"/"assistant", "content": "..."}.
@@ -150,6 +165,33 @@ def embed(text, model=EMBED_MODEL, timeout=None):
         )
 
 
+# Embeds a list of texts in one request and returns the vectors in the same
+# order. /api/embed accepts a list for "input" and returns one vector per item.
+def embed_batch(texts, model=EMBED_MODEL, timeout=None):
+    if not texts:
+        return []
+    payload = {
+        "model": model,
+        "input": list(texts),
+    }
+    req_timeout = timeout if timeout is not None else REQUEST_TIMEOUT_SECONDS
+
+    try:
+        r = requests.post(f"{OLLAMA_BASE}/api/embed", json=payload, timeout=req_timeout)
+        r.raise_for_status()
+        vectors = r.json()["embeddings"]
+    except requests.ConnectionError:
+        raise ConnectionError("Ollama is not running. Start it with: ollama serve")
+    except requests.Timeout:
+        raise TimeoutError(
+            f"Ollama took too long to respond (>{req_timeout}s)."
+        )
+
+    if len(vectors) != len(texts):
+        raise ValueError(f"Ollama returned {len(vectors)} embedding(s) for {len(texts)} input(s).")
+    return vectors
+
+
 # Pulls a model from Ollama's registry. Blocks until the download finishes.
 def pull_model(model):
     try:
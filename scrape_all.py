@@ -1,15 +1,28 @@
-# scrape_all.py — Auto-starts the uvicorn worker, reads mapped URLs from
-# mapped_pages.json, scrapes each domain's pages via the local API, then
-# scrapes custom pages individually with force_refresh, and shuts down.
+# scrape_all.py — Reads mapped URLs from the mapper's store (mapped_pages.db,
+# or mapped_pages.json), scrapes each domain's pages with the scrape worker
+# running in this process, then scrapes custom pages with force_refresh.
+# Pages go into the corpus store (scraped_output/scraped_pages.db, see
+# scraped_store.py) and, unless --no-text, a scraped_*.txt view per domain.
+# With --server it starts the uvicorn worker and goes through its HTTP API
+# instead, and shuts it down at the end.
 # Usage: python scrape_all.py
 #        python scrape_all.py --max-pages 5
+#        python scrape_all.py --reuse-within-hours 6    (after map.py --fused)
+#        python scrape_all.py --parallel-domains 8 --max-fetches 24
+#        python scrape_all.py --server --port 8001
+#        python scrape_all.py --incremental             (keep unchanged pages from the last run)
+#        python scrape_all.py --no-text                 (corpus store only, no scraped_*.txt)
 
 import argparse
 import json
+import os
 import subprocess
 import sys
 import textwrap
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
@@ -17,6 +30,16 @@ from urllib.parse import urlparse
 import requests
 
 from custom_pages import load_custom_pages, update_page_status
+from scraped_store import ScrapedStore, corpus_path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+# The mapper uses relative imports, so its directory goes on sys.path.
+sys.path.insert(0, str(PROJECT_ROOT / "mapper"))
+
+from mapped_store import MappedStore, store_path_for  # noqa: E402
+from worker_service.host_scheduler import MAX_FETCHES_ENV  # noqa: E402
+from worker_service.worker import get_or_build_pack  # noqa: E402
 
 
 # Duplicates writes to both a terminal stream and a log file.
@@ -34,18 +57,38 @@ class _Tee:
         self.log_file.flush()
 
 
-PROJECT_ROOT = Path(__file__).resolve().parent
 DEFAULT_INPUT = PROJECT_ROOT / "mapped_pages.json"
 DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "scraped_output"
 
+_print_lock = threading.Lock()
+
+
+# Returns a print function that is safe to call from several threads at once.
+# With a tag (the domain's host when domains are scraped side by side), every
+# line is prefixed with it so interleaved output stays readable.
+def _logger(tag=None):
+    prefix = f"[{tag}] " if tag else ""
+
+    def log(message=""):
+        with _print_lock:
+            print(f"{prefix}{message}")
+
+    return log
+
 
 # Spins up uvicorn as a subprocess and polls until it's responding.
-def start_server(port):
+# max_fetches caps the worker's requests in flight across all domains
+# (LPBD_MAX_FETCHES; 0 = no cap). One process serves every domain, so its
+# host scheduler paces each host across all concurrent batches.
+def start_server(port, max_fetches=0):
+    env = dict(os.environ)
+    env[MAX_FETCHES_ENV] = str(max_fetches)
     proc = subprocess.Popen(
         [sys.executable, "-m", "uvicorn",
          "worker_service.scrape:app",
          "--host", "127.0.0.1", "--port", str(port)],
         cwd=str(PROJECT_ROOT),
+        env=env,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
@@ -72,9 +115,22 @@ def stop_server(proc):
             proc.kill()
 
 
-# Reads mapped_pages.json and returns {domain: [url_list]} for every
-# successfully mapped domain. Handles both schema v1 and v2.
+# Returns {domain: [url_list]} for every successfully mapped domain. Reads the
+# mapper's SQLite store next to `path` when there is one (indexed, no need to
+# parse the whole JSON export); otherwise reads mapped_pages.json itself,
+# schema v1 or v2.
 def load_mapped_pages(path):
+    store_path = store_path_for(path)
+    if store_path.exists():
+        store = MappedStore(store_path)
+        try:
+            if store.domain_count():
+                return store.successful_domain_urls()
+        finally:
+            store.close()
+    if not Path(path).exists():
+        return {}
+
     with open(path) as f:
         data = json.load(f)
 
@@ -92,83 +148,239 @@ def load_mapped_pages(path):
 
 
 BATCH_SIZE = 100
+# Store key for custom pages, which aren't tied to a mapped domain.
+CUSTOM_STORE_DOMAIN = "custom_pages"
+
+
+# Scrapes one batch of URLs and returns the /scrape response shape
+# (changed_pages, unchanged_urls, errors). With an api_url the batch is
+# POSTed to a scrape worker; with api_url=None it runs in this process
+# through get_or_build_pack, with no server, JSON or request timeout in
+# between. Pages the worker stored less than reuse_within_s seconds ago
+# (e.g. by a fused mapper run) come back from its page store instead of the
+# network.
+# With known_hashes ({url: text_hash} of pages this client already holds),
+# the batch is sent as client_has_pack: the worker revalidates each page
+# with its stored ETag/Last-Modified and only returns pages whose content
+# came back, so a 304 costs no download and no re-normalizing.
+def _scrape_batch(domain_url, url_list, api_url, timeout_s=30, reuse_within_s=0, known_hashes=None):
+    # force_refresh=True bypasses the pack_store cache read so each
+    # batch gets its own URLs processed.
+    # Without known_hashes, client_has_pack=False asks for full page content
+    # for every URL. With them, client_has_pack=True plus each page's
+    # last_text_hash asks only for pages whose text changed; the rest come
+    # back as unchanged_urls.
+    # Politeness is left to the worker's host scheduler (robots.txt
+    # Crawl-delay, adaptive per-host spacing), so no rate_limit_ms.
+    options = {
+        "force_refresh": True,
+        "client_has_pack": known_hashes is not None,
+        "timeout_s": timeout_s,
+        "reuse_within_s": reuse_within_s,
+    }
+    pages = [{"url": u} for u in url_list]
+    if known_hashes is not None:
+        for page in pages:
+            page["last_text_hash"] = known_hashes[page["url"]]
+    if api_url is None:
+        cache_hit, pack_pages, unchanged_urls, errors = get_or_build_pack(
+            domain_url, pages, **options,
+        )
+        return {
+            "domain": domain_url,
+            "checked_at": time.time(),
+            "cache_hit": cache_hit,
+            "unchanged_urls": unchanged_urls,
+            "changed_pages": pack_pages,
+            "errors": errors,
+        }
 
-
-# Sends one batch of URLs to the scrape API and returns the JSON response.
-def _scrape_batch(domain_url, url_list, api_url, timeout_s=30):
     payload = {
         "domain": domain_url,
-        "pages": [{"url": u} for u in url_list],
+        "pages": pages,
         "mode": "fetch_if_changed",
-        # force_refresh=True bypasses the pack_store cache read so each
-        # batch gets its own URLs processed.
-        # client_has_pack=False tells the worker we want full page content
-        # returned for every URL, not just a changed/unchanged summary.
-        # scrape_all.py writes fresh output files on every run and doesn't
-        # retain prior pack state.
-        "options": {
-            "force_refresh": True,
-            "client_has_pack": False,
-            "timeout_s": timeout_s,
-            "rate_limit_ms": 300,
-        },
+        "options": options,
     }
     resp = requests.post(api_url, json=payload, timeout=600)
     resp.raise_for_status()
     return resp.json()
 
 
-# Scrapes a domain in batches of BATCH_SIZE URLs. Accumulates all changed
-# pages across batches, then writes one output file per domain. Old files for
-# the same domain are removed first so stale data doesn't pile up.
-def scrape_domain(domain_url, url_list, api_url, output_dir, timeout_s=30):
+# Writes a domain's pages from the corpus store to its text view,
+# scraped_{host}_{stamp}.txt (the format load_scraped_lookup's text fallback
+# and older tools read). Pages are streamed from the store into a .tmp file
+# that replaces the domain's older files only once it is complete. Returns
+# the file written, or None if the domain has no pages.
+def _export_domain_text(domain_url, store, output_dir, scraped, unchanged, errors):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    filepath = _output_path(domain_url, output_dir)
+    tmp_path = filepath.with_name(f"{filepath.name}.tmp")
+    pages = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write(_format_header(domain_url, datetime.now().isoformat(), False,
+                                 scraped, unchanged, errors))
+        for page in store.iter_domain(domain_url):
+            out.write(_format_page(page))
+            pages += 1
+    if not pages:
+        os.remove(tmp_path)
+        return None
+    _remove_old_domain_files(domain_url, output_dir)
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
+# Scrapes one incremental batch. Pages already in the corpus store go out as
+# client_has_pack with their text_hash; new pages are fetched in full, or
+# taken from the worker's page store if it holds them from less than
+# reuse_within_s seconds ago.
+# Returns (changed pages by url, unchanged urls, errors).
+def _scrape_incremental_batch(domain_url, batch_urls, api_url, known_hashes, timeout_s=30,
+                              reuse_within_s=0):
+    known = [url for url in batch_urls if url in known_hashes]
+    new = [url for url in batch_urls if url not in known_hashes]
+    changed = {}
+    keep = set()
+    errors = []
+    if known:
+        result = _scrape_batch(domain_url, known, api_url, timeout_s=timeout_s,
+                               known_hashes={url: known_hashes[url] for url in known})
+        changed.update((page["url"], page) for page in result["changed_pages"])
+        # Unchanged pages come back either as a bare 304 or, when the origin
+        # sent the page again with the same text, as an unchanged page too.
+        keep.update(result["unchanged_urls"])
+        errors.extend(result["errors"])
+    if new:
+        result = _scrape_batch(domain_url, new, api_url, timeout_s=timeout_s,
+                               reuse_within_s=reuse_within_s)
+        changed.update((page["url"], page) for page in result["changed_pages"])
+        errors.extend(result["errors"])
+    return changed, keep, errors
+
+
+# Scrapes a domain in batches of BATCH_SIZE URLs into the corpus store
+# (scraped_output/scraped_pages.db), saving each batch's pages as it comes
+# back so a large domain is never held in memory whole. Once every batch is
+# in, pages the run didn't find are dropped from the store and, with
+# text_export, the domain's scraped_*.txt view is rewritten from it. If a
+# batch fails the store keeps the domain's previous pages.
+# api_url=None scrapes in this process (see _scrape_batch). Progress goes
+# through `log`, so domains scraped side by side can tag their lines.
+# With incremental=True, pages the store already holds for the domain are
+# only revalidated: unchanged ones are marked seen without being rewritten,
+# and only changed or new pages are saved. URLs no longer in url_list (e.g.
+# the mapper's removed_urls) drop out; pages that fail to fetch keep their
+# stored text.
+def scrape_domain(domain_url, url_list, api_url, output_dir, timeout_s=30, reuse_within_s=0,
+                  log=print, incremental=False, text_export=True):
     batches = [url_list[i:i + BATCH_SIZE]
                for i in range(0, len(url_list), BATCH_SIZE)]
     num_batches = len(batches)
     total_scraped = 0
     total_unchanged = 0
     total_errors = 0
-    all_changed_pages = []
-
-    print(f"  Processing {len(url_list)} URLs in {num_batches} batch(es)...")
+    run_at = datetime.now().isoformat()
+    store = ScrapedStore(corpus_path(output_dir))
 
-    for batch_num, batch_urls in enumerate(batches, 1):
-        if num_batches > 1:
-            print(f"  Batch {batch_num}/{num_batches}: {len(batch_urls)} pages...")
-
-        result = _scrape_batch(domain_url, batch_urls, api_url,
-                               timeout_s=timeout_s)
+    try:
+        known_hashes = store.text_hashes(domain_url) if incremental else {}
+
+        log(f"  Processing {len(url_list)} URLs in {num_batches} batch(es)...")
+        if known_hashes:
+            log(f"  Revalidating {sum(url in known_hashes for url in url_list)} stored page(s)")
+
+        for batch_num, batch_urls in enumerate(batches, 1):
+            if num_batches > 1:
+                log(f"  Batch {batch_num}/{num_batches}: {len(batch_urls)} pages...")
+
+            if known_hashes:
+                changed, keep, batch_errors = _scrape_incremental_batch(
+                    domain_url, batch_urls, api_url, known_hashes, timeout_s=timeout_s,
+                    reuse_within_s=reuse_within_s,
+                )
+                store.touch(domain_url, keep, run_at)
+                store.save_pages(domain_url, [page for url, page in changed.items() if url not in keep],
+                                 run_at)
+                unchanged = len(keep)
+                scraped = len(changed.keys() - keep)
+            else:
+                result = _scrape_batch(domain_url, batch_urls, api_url,
+                                       timeout_s=timeout_s, reuse_within_s=reuse_within_s)
+                batch_errors = result["errors"]
+                store.touch(domain_url, result["unchanged_urls"], run_at)
+                store.save_pages(domain_url, result["changed_pages"], run_at)
+                scraped = len(result["changed_pages"])
+                unchanged = len(result["unchanged_urls"])
+
+            # A stored page that failed to fetch this run keeps its previous
+            # text instead of being dropped by finish_domain.
+            store.touch(domain_url, [err["url"] for err in batch_errors], run_at)
+
+            errors = len(batch_errors)
+            total_scraped += scraped
+            total_unchanged += unchanged
+            total_errors += errors
+
+            if num_batches > 1:
+                log(f"    Scraped: {scraped} | Unchanged: {unchanged} | Errors: {errors}")
+
+            for err in batch_errors:
+                log(f"    - {err['url']}: {err['error']}")
+
+        removed = store.finish_domain(domain_url, run_at)
+        if removed:
+            log(f"  Removed {removed} page(s) no longer found")
+        if text_export:
+            filepath = _export_domain_text(domain_url, store, output_dir,
+                                           total_scraped, total_unchanged, total_errors)
+            if filepath:
+                log(f"  Saved to: {filepath}")
+    finally:
+        store.close()
 
-        scraped = len(result["changed_pages"])
-        unchanged = len(result["unchanged_urls"])
-        errors = len(result["errors"])
-        total_scraped += scraped
-        total_unchanged += unchanged
-        total_errors += errors
-        all_changed_pages.extend(result["changed_pages"])
+    return total_scraped, total_unchanged, total_errors
 
-        if num_batches > 1:
-            print(f"    Scraped: {scraped} | Unchanged: {unchanged} | Errors: {errors}")
 
-        if result["errors"]:
-            for err in result["errors"]:
-                print(f"    - {err['url']}: {err['error']}")
+# Scrapes every mapped domain, `parallel` at a time, and returns (pages
+# scraped, errors). The worker paces each host and caps requests in flight
+# globally, so running domains side by side makes the total time follow the
+# slowest domain rather than the sum of all of them. Largest domains start
+# first so a big one doesn't begin last and set the finish time. With more
+# than one domain at a time, each line of progress is tagged with its host.
+def scrape_mapped_domains(mapped, api_url, output_dir, max_pages=None, reuse_within_s=0, parallel=1,
+                          incremental=False, text_export=True):
+    parallel = max(1, min(parallel, len(mapped)))
+    jobs = [
+        (i, domain, urls[:max_pages] if max_pages else urls)
+        for i, (domain, urls) in enumerate(mapped.items(), 1)
+    ]
+    if parallel > 1:
+        jobs.sort(key=lambda job: -len(job[2]))
 
-    # Write one consolidated file per domain and remove old ones.
-    if all_changed_pages:
-        _remove_old_domain_files(domain_url, output_dir)
-        merged_result = {
-            "domain": domain_url,
-            "checked_at": datetime.now().isoformat(),
-            "cache_hit": False,
-            "changed_pages": all_changed_pages,
-            "unchanged_urls": [],
-            "errors": [],
-        }
-        filepath = save_results(domain_url, merged_result, output_dir)
-        print(f"  Saved to: {filepath}")
+    def run(job):
+        i, domain, urls = job
+        log = _logger(urlparse(domain).netloc if parallel > 1 else None)
+        log(f"[{i}/{len(mapped)}] Scraping {domain} ({len(urls)} pages)...")
+        try:
+            scraped, unchanged, errors = scrape_domain(
+                domain, urls, api_url, output_dir,
+                reuse_within_s=reuse_within_s, log=log, incremental=incremental,
+                text_export=text_export,
+            )
+        except Exception as exc:
+            log(f"  Failed: {exc}\n")
+            return 0, 1
+        log(f"  Total: Scraped {scraped} | Unchanged: {unchanged} | Errors: {errors}\n")
+        return scraped, errors
 
-    return total_scraped, total_unchanged, total_errors
+    total_scraped = 0
+    total_errors = 0
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        for scraped, errors in executor.map(run, jobs):
+            total_scraped += scraped
+            total_errors += errors
+    return total_scraped, total_errors
 
 
 # Removes previous scraped output files for a domain so we don't accumulate stale data.
@@ -184,92 +396,116 @@ def _remove_old_domain_files(domain_url, output_dir):
 
 
 
-# Writes one consolidated text file per domain with all the scraped page content.
-def save_results(domain_url, result, output_dir):
-    output_dir.mkdir(parents=True, exist_ok=True)
-
+# Output file for a domain scraped now: scraped_{host}_{stamp}.txt.
+def _output_path(domain_url, output_dir):
     host = urlparse(domain_url).netloc.replace(".", "_")
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = output_dir / f"scraped_{host}_{stamp}.txt"
-
-    lines = [
-        f"Domain: {result['domain']}",
-        f"Checked at: {result['checked_at']}",
-        f"Cache hit: {result['cache_hit']}",
-        f"Pages scraped: {len(result['changed_pages'])}",
-        f"Unchanged: {len(result['unchanged_urls'])}",
-        f"Errors: {len(result['errors'])}",
+    return Path(output_dir) / f"scraped_{host}_{stamp}.txt"
+
+
+def _format_header(domain, checked_at, cache_hit, scraped, unchanged, errors):
+    return "\n".join([
+        f"Domain: {domain}",
+        f"Checked at: {checked_at}",
+        f"Cache hit: {cache_hit}",
+        f"Pages scraped: {scraped}",
+        f"Unchanged: {unchanged}",
+        f"Errors: {errors}",
         "=" * 60,
-    ]
+    ])
+
 
-    for page in result["changed_pages"]:
-        lines.append(f"\n--- {page['url']} ---")
-        lines.append(f"Title: {page['title']}")
-        lines.append(f"Hash: {page['text_hash']}")
-        lines.append("")
-        wrapped = textwrap.fill(page["normalized_text"], width=80)
-        lines.append(wrapped)
-        lines.append("")
+# One page's block, in the "--- url ---" layout the matching loaders split on.
+def _format_page(page):
+    return "\n" + "\n".join([
+        f"\n--- {page['url']} ---",
+        f"Title: {page['title']}",
+        f"Hash: {page['text_hash']}",
+        "",
+        textwrap.fill(page["normalized_text"], width=80),
+        "",
+    ])
 
-    filepath.write_text("\n".join(lines), encoding="utf-8")
+
+# Writes one consolidated text file per domain with all the scraped page content.
+def save_results(domain_url, result, output_dir):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    filepath = _output_path(domain_url, output_dir)
+    header = _format_header(
+        result["domain"], result["checked_at"], result["cache_hit"],
+        len(result["changed_pages"]), len(result["unchanged_urls"]), len(result["errors"]),
+    )
+    filepath.write_text(
+        header + "".join(_format_page(page) for page in result["changed_pages"]),
+        encoding="utf-8",
+    )
     return filepath
 
 
-# Scrapes each custom page one at a time with force_refresh so they always
-# get re-fetched regardless of the worker's weekly cache. The worker's
-# change detection still prevents re-saving if the content is identical.
-def scrape_custom_pages(custom_pages, api_url, output_dir, timeout_s=30):
+# Sends one request per domain holding all of that domain's custom pages,
+# with force_refresh so they are always re-fetched regardless of the
+# worker's weekly cache. The worker's change detection still prevents
+# re-saving if the content is identical. Domains run `workers` at a time;
+# pages go into the corpus store under CUSTOM_STORE_DOMAIN (and, with
+# text_export, one file per domain), and custom_pages.json statuses are
+# updated here on the calling thread. Pages removed from custom_pages.json
+# leave the store once a run gets through every domain.
+def scrape_custom_pages(custom_pages, api_url, output_dir, timeout_s=30, workers=1, text_export=True):
     scraped = 0
     errors = 0
+    failed_domains = 0
+    run_at = datetime.now().isoformat()
 
+    by_domain = defaultdict(list)
     for entry in custom_pages:
-        url = entry["url"]
-        parsed = urlparse(url)
-        domain = f"{parsed.scheme}://{parsed.netloc}"
-
-        print(f"  Custom: {url}...")
-
-        payload = {
-            "domain": domain,
-            "pages": [{"url": url}],
-            "mode": "fetch_if_changed",
-            "options": {
-                "force_refresh": True,
-                "client_has_pack": False,
-                "timeout_s": timeout_s,
-                "rate_limit_ms": 300,
-            },
-        }
+        parsed = urlparse(entry["url"])
+        by_domain[f"{parsed.scheme}://{parsed.netloc}"].append(entry["url"])
 
+    def fetch_safely(job):
+        domain, urls = job
         try:
-            resp = requests.post(api_url, json=payload, timeout=600)
-            resp.raise_for_status()
-            result = resp.json()
-
-            has_errors = bool(result.get("errors"))
-            has_content = bool(result.get("changed_pages"))
-
-            if has_content:
-                filepath = save_results(domain, result, output_dir)
-                print(f"    Saved to: {filepath}")
-                scraped += 1
-            elif has_errors:
-                for err in result["errors"]:
-                    print(f"    Error: {err.get('error', err)}")
-                errors += 1
-            else:
-                print(f"    Unchanged (no new content).")
-
-            if has_errors:
-                update_page_status(url, "error")
-            else:
-                update_page_status(url, "scraped",
-                                   scraped_at=datetime.now().isoformat())
-
+            return domain, urls, _scrape_batch(domain, urls, api_url, timeout_s=timeout_s), None
         except Exception as exc:
-            print(f"    Failed: {exc}")
-            update_page_status(url, "error")
-            errors += 1
+            return domain, urls, None, exc
+
+    store = ScrapedStore(corpus_path(output_dir))
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for domain, urls, result, failure in executor.map(fetch_safely, by_domain.items()):
+                print(f"  Custom: {domain} ({len(urls)} page(s))...")
+                if failure is not None:
+                    print(f"    Failed: {failure}")
+                    for url in urls:
+                        update_page_status(url, "error")
+                    errors += len(urls)
+                    failed_domains += 1
+                    continue
+
+                failed = {err["url"]: err.get("error", err) for err in result.get("errors") or []}
+                saved = {page["url"] for page in result.get("changed_pages") or []}
+                # Unchanged and failed pages keep their stored text.
+                store.touch(CUSTOM_STORE_DOMAIN, urls, run_at)
+                store.save_pages(CUSTOM_STORE_DOMAIN, result.get("changed_pages") or [], run_at)
+                if saved and text_export:
+                    filepath = save_results(domain, result, output_dir)
+                    print(f"    Saved to: {filepath}")
+
+                for url in urls:
+                    if url in failed:
+                        print(f"    Error: {url}: {failed[url]}")
+                        update_page_status(url, "error")
+                        errors += 1
+                        continue
+                    if url in saved:
+                        scraped += 1
+                    else:
+                        print(f"    Unchanged (no new content): {url}")
+                    update_page_status(url, "scraped", scraped_at=datetime.now().isoformat())
+
+            if not failed_domains:
+                store.finish_domain(CUSTOM_STORE_DOMAIN, run_at)
+    finally:
+        store.close()
 
     return scraped, errors
 
@@ -301,15 +537,29 @@ def _main_inner():
                         help="Limit pages to scrape per domain (default: all)")
     parser.add_argument("--all", action="store_true",
                         help="(Deprecated, now the default) Scrape all mapped pages")
+    parser.add_argument("--server", action="store_true",
+                        help="Scrape through a uvicorn worker's HTTP API instead of in this process")
     parser.add_argument("--port", type=int, default=8000,
-                        help="Port for the scrape worker")
+                        help="Port for the scrape worker (with --server)")
+    parser.add_argument("--reuse-within-hours", type=float, default=0,
+                        help="Use pages the worker fetched less than this many hours ago "
+                             "(e.g. captured by map.py --fused) instead of downloading them again")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Revalidate the pages already in scraped_output/scraped_pages.db and only "
+                             "download and write the ones that changed")
+    parser.add_argument("--no-text", action="store_true",
+                        help="Only write the corpus store (scraped_pages.db), not the scraped_*.txt files")
+    parser.add_argument("--parallel-domains", type=int, default=4,
+                        help="Domains scraped at the same time (default: 4)")
+    parser.add_argument("--max-fetches", type=int, default=16,
+                        help="Page requests in flight across all domains (default: 16)")
     args = parser.parse_args()
 
     print("=== LPBD Scraper ===\n")
 
     # Load mapped domains (may not exist if user only has custom pages)
     mapped = {}
-    if args.input.exists():
+    if args.input.exists() or store_path_for(args.input).exists():
         mapped = load_mapped_pages(args.input)
 
     # Load custom pages from custom_pages.json
@@ -332,41 +582,40 @@ def _main_inner():
     else:
         print("Scraping ALL mapped pages.\n")
 
-    print(f"Starting scrape worker on 127.0.0.1:{args.port}...")
-    server = start_server(args.port)
-    print("Server ready.\n")
+    server = None
+    api_url = None
+    if args.server:
+        print(f"Starting scrape worker on 127.0.0.1:{args.port}...")
+        server = start_server(args.port, max_fetches=args.max_fetches)
+        print("Server ready.\n")
+        api_url = f"http://127.0.0.1:{args.port}/scrape"
+    else:
+        # Read by the worker's host scheduler when it is first used.
+        os.environ[MAX_FETCHES_ENV] = str(args.max_fetches)
 
-    api_url = f"http://127.0.0.1:{args.port}/scrape"
     total_scraped = 0
     total_errors = 0
 
     try:
-        # Phase 1: scrape mapped domains in batches
+        # Phase 1: scrape mapped domains in batches, several domains at once
         if mapped:
-            for i, (domain, urls) in enumerate(mapped.items(), 1):
-                if args.max_pages:
-                    urls = urls[:args.max_pages]
-
-                print(f"[{i}/{len(mapped)}] Scraping {domain} ({len(urls)} pages)...")
-
-                try:
-                    scraped, unchanged, errors = scrape_domain(
-                        domain, urls, api_url, args.output_dir,
-                    )
-                    total_scraped += scraped
-                    total_errors += errors
-
-                    print(f"  Total: Scraped {scraped} | Unchanged: {unchanged} | Errors: {errors}\n")
-
-                except Exception as exc:
-                    print(f"  Failed: {exc}\n")
-                    total_errors += 1
+            scraped, errors = scrape_mapped_domains(
+                mapped, api_url, args.output_dir,
+                max_pages=args.max_pages,
+                reuse_within_s=args.reuse_within_hours * 3600,
+                parallel=args.parallel_domains,
+                incremental=args.incremental,
+                text_export=not args.no_text,
+            )
+            total_scraped += scraped
+            total_errors += errors
 
-        # Phase 2: scrape custom pages individually with force_refresh
+        # Phase 2: scrape custom pages with force_refresh, one request per domain
         if custom:
             print(f"\n--- Custom Pages ({len(custom)}) ---\n")
             cp_scraped, cp_errors = scrape_custom_pages(
-                custom, api_url, args.output_dir,
+                custom, api_url, args.output_dir, workers=args.parallel_domains,
+                text_export=not args.no_text,
             )
             total_scraped += cp_scraped
             total_errors += cp_errors
@@ -382,9 +631,10 @@ def _main_inner():
         print(f"Output directory: {args.output_dir}")
 
     finally:
-        print("\nShutting down scrape worker...", end=" ")
-        stop_server(server)
-        print("done.")
+        if server:
+            print("\nShutting down scrape worker...", end=" ")
+            stop_server(server)
+            print("done.")
 
 
 if __name__ == "__main__":
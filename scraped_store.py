@@ -0,0 +1,246 @@
+# scraped_store.py -- Indexed store for scraped page text
+# (scraped_output/scraped_pages.db). scrape_all.py writes each domain's pages
+# here as batches come back, and the matching stage reads it without parsing
+# the scraped_*.txt dumps: pages are keyed by (domain, url) (with an index on
+# text_hash), and load_lookup() hands out a {url: (title, text)} mapping that
+# reads each page's text only when it is asked for. The text files are an
+# optional view exported from this store.
+
+import sqlite3
+import threading
+from collections.abc import ItemsView, Mapping
+from datetime import datetime
+from pathlib import Path
+
+CORPUS_DB_NAME = "scraped_pages.db"
+# Lets SQLite memory-map this much of the file for reads instead of copying
+# pages through its own cache.
+MMAP_BYTES = 256 * 1024 * 1024
+# Rows fetched per query when walking the whole corpus.
+_READ_CHUNK = 200
+
+
+# The store lives inside the scraped output directory it indexes.
+def corpus_path(scraped_dir):
+    return Path(scraped_dir) / CORPUS_DB_NAME
+
+
+def has_corpus(scraped_dir):
+    return corpus_path(scraped_dir).exists()
+
+
+def _timestamp():
+    return datetime.now().isoformat()
+
+
+# Opens the store and makes sure the table exists. One row per domain and
+# page url: its title and normalized text, the text_hash the worker
+# computed, when that text was written (scraped_at) and the last scrape run
+# that saw the page, changed or not (seen_at). Each domain's scrape only
+# ever reads, refreshes or removes its own rows.
+def _connect(path, check_same_thread=True):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    # Stores written before pages were keyed per domain used url alone as the
+    # primary key, so a page scraped under two domains flipped between them.
+    # Rebuild those with the (domain, url) key, keeping their rows.
+    primary_key = [row[1] for row in sorted(
+        (row for row in conn.execute("PRAGMA table_info(scraped_page)") if row[5]),
+        key=lambda row: row[5],
+    )]
+    if primary_key == ["url"]:
+        conn.execute("DROP INDEX IF EXISTS scraped_page_domain")
+        conn.execute("DROP INDEX IF EXISTS scraped_page_hash")
+        conn.execute("ALTER TABLE scraped_page RENAME TO scraped_page_old")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scraped_page (
+            domain TEXT NOT NULL,
+            url TEXT NOT NULL,
+            title TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            text TEXT NOT NULL,
+            fetched_at REAL,
+            scraped_at TEXT NOT NULL,
+            seen_at TEXT NOT NULL,
+            PRIMARY KEY (domain, url)
+        )
+        """
+    )
+    if primary_key == ["url"]:
+        conn.execute(
+            """
+            INSERT INTO scraped_page (domain, url, title, text_hash, text, fetched_at, scraped_at, seen_at)
+            SELECT domain, url, title, text_hash, text, fetched_at, scraped_at, seen_at FROM scraped_page_old
+            """
+        )
+        conn.execute("DROP TABLE scraped_page_old")
+    conn.execute("CREATE INDEX IF NOT EXISTS scraped_page_domain ON scraped_page (domain, seen_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS scraped_page_hash ON scraped_page (text_hash)")
+    conn.commit()
+    return conn
+
+
+# Scraped pages for every domain. A scrape run saves pages as they arrive
+# and marks unchanged ones as seen; finish_domain() then drops the pages
+# that run no longer found, so an interrupted run never empties a domain.
+# One instance per thread (sqlite3 connections stay on their thread).
+class ScrapedStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = _connect(self.path)
+
+    # Saves worker pages (url, title, normalized_text, text_hash,
+    # fetched_at) under domain, as seen by the run started at run_at.
+    def save_pages(self, domain, pages, run_at):
+        if not pages:
+            return
+        now = _timestamp()
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO scraped_page (url, domain, title, text_hash, text, fetched_at, scraped_at, seen_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(domain, url) DO UPDATE SET
+                    title = excluded.title,
+                    text_hash = excluded.text_hash,
+                    text = excluded.text,
+                    fetched_at = excluded.fetched_at,
+                    scraped_at = excluded.scraped_at,
+                    seen_at = excluded.seen_at
+                """,
+                [
+                    (page["url"], domain, page.get("title") or "", page["text_hash"],
+                     page["normalized_text"], page.get("fetched_at"), now, run_at)
+                    for page in pages
+                ],
+            )
+
+    # Marks pages as seen by the run without touching their text: the ones it
+    # found unchanged, and the ones it failed to fetch this time, which keep
+    # their previous text. URLs the store doesn't hold are ignored.
+    def touch(self, domain, urls, run_at):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE scraped_page SET seen_at = ? WHERE domain = ? AND url = ?",
+                [(run_at, domain, url) for url in urls],
+            )
+
+    # Removes the domain's pages the run started at run_at didn't see.
+    # Returns how many were removed.
+    def finish_domain(self, domain, run_at):
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM scraped_page WHERE domain = ? AND seen_at != ?", (domain, run_at)
+            )
+        return cursor.rowcount
+
+    # {url: text_hash} for the domain's pages.
+    def text_hashes(self, domain):
+        return dict(self.conn.execute(
+            "SELECT url, text_hash FROM scraped_page WHERE domain = ?", (domain,)
+        ))
+
+    # Yields the domain's pages as worker-shaped dicts, in url order.
+    def iter_domain(self, domain):
+        cursor = self.conn.execute(
+            "SELECT url, title, text_hash, text FROM scraped_page WHERE domain = ? ORDER BY url",
+            (domain,),
+        )
+        for url, title, text_hash, text in cursor:
+            yield {"url": url, "title": title, "text_hash": text_hash, "normalized_text": text}
+
+    def close(self):
+        self.conn.close()
+
+
+# Items view that walks the corpus in chunks instead of one query per page.
+class _LookupItems(ItemsView):
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+# Read-only {url: (title, text)} over the store, the shape
+# matcher.load_scraped_lookup returns. Only the url index (url -> rowid and
+# text_hash) is loaded up front, taking the most recently scraped row when a
+# url is stored under more than one domain; a page's title and text are read
+# from the memory-mapped database each time it is looked up, so a run that
+# only touches the filtered pages never holds the rest of the corpus. Safe
+# to share across the matcher's threads.
+class ScrapedLookup(Mapping):
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = _connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._hashes = {}
+        for rowid, url, text_hash in self._conn.execute(
+            "SELECT rowid, url, text_hash FROM scraped_page ORDER BY url, scraped_at"
+        ):
+            self._rows[url] = rowid
+            self._hashes[url] = text_hash
+
+    def __getitem__(self, url):
+        rowid = self._rows[url]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, text FROM scraped_page WHERE rowid = ?", (rowid,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(url)
+        return row[0], row[1]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, url):
+        return url in self._rows
+
+    def items(self):
+        return _LookupItems(self)
+
+    def text_hash(self, url):
+        return self._hashes.get(url)
+
+    # Yields (url, (title, text)) for every page, _READ_CHUNK rows per query.
+    def _iter_items(self):
+        urls = list(self._rows)
+        for start in range(0, len(urls), _READ_CHUNK):
+            chunk = urls[start:start + _READ_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT url, title, text FROM scraped_page WHERE rowid IN ({placeholders})",
+                    [self._rows[url] for url in chunk],
+                ).fetchall()
+            found = {url: (title, text) for url, title, text in rows}
+            for url in chunk:
+                if url in found:
+                    yield url, found[url]
+
+    # Yields (url, title, text, text_hash) for every page, the tuples
+    # embedder.load_scraped_pages produces.
+    def iter_pages(self):
+        for url, (title, text) in self._iter_items():
+            yield url, title, text, self._hashes[url]
+
+    def close(self):
+        self._conn.close()
+
+
+# Opens the lookup for scraped_dir's store, or returns None when there is no
+# store (or it is empty) and callers should fall back to the text files.
+def load_lookup(scraped_dir):
+    if not has_corpus(scraped_dir):
+        return None
+    lookup = ScrapedLookup(corpus_path(scraped_dir))
+    if not lookup:
+        lookup.close()
+        return None
+    return lookup
@@ -1,6 +1,7 @@
 """Parsers for LPBD pipeline outputs."""
 from __future__ import annotations
 import re
+from urllib.parse import urlparse
 
 
 def parse_map_log(lines: list[str]) -> dict:
@@ -20,20 +21,26 @@ def parse_map_log(lines: list[str]) -> dict:
             example_count = 0
             continue
 
-        # Domain start: "Mapping https://utrgv.edu..."
-        m = re.match(r"Mapping (https?://(.+?))\.\.\.", stripped)
+        # Domain start: "Mapping https://utrgv.edu..." or, for an incremental
+        # remap, "Remapping https://utrgv.edu (incremental)..."
+        m = re.match(r"(Re)?[Mm]apping (https?://(.+?))( \(incremental\))?\.\.\.", stripped)
         if m:
             current_domain = {
-                "name": m.group(2),
-                "url": m.group(1),
+                "name": m.group(3),
+                "url": m.group(2),
+                "incremental": bool(m.group(1)),
                 "completed": False,
                 "no_sitemap": False,
                 "sitemap_count": 0,
                 "bfs_fetched": 0,
                 "bfs_discovered": 0,
                 "total_urls": 0,
+                "not_modified": 0,
+                "added": 0,
+                "removed": 0,
                 "progress": [],
                 "examples": [],
+                "traps": [],
             }
             domains.append(current_domain)
             in_examples = False
@@ -87,6 +94,50 @@ def parse_map_log(lines: list[str]) -> dict:
             })
             continue
 
+        # Incremental sitemap line: "Sitemap: N URLs, N new or changed. Revalidating ..."
+        m = re.match(r"Sitemap: (\d+) URLs, \d+ new or changed\.", stripped)
+        if m:
+            current_domain["sitemap_count"] = int(m.group(1))
+            continue
+
+        # Incremental completion: "Fetched N pages (N not modified). +N / -N URLs."
+        m = re.match(r"Fetched (\d+) pages \((\d+) not modified\)\. \+(\d+) / -(\d+) URLs", stripped)
+        if m:
+            current_domain["bfs_fetched"] = int(m.group(1))
+            current_domain["not_modified"] = int(m.group(2))
+            current_domain["added"] = int(m.group(3))
+            current_domain["removed"] = int(m.group(4))
+            continue
+
+        # Trap flagged mid-crawl: "[label] Crawler trap: host/path/{date} (pruned N queued URL(s))"
+        m = re.match(r"\[(.+?)\] Crawler trap: (\S+) \(pruned (\d+) queued URL", stripped)
+        if m:
+            # The tag is the crawled host without "www.", which tells
+            # interleaved domains apart.
+            domain = next(
+                (d for d in reversed(domains)
+                 if urlparse(d["url"]).netloc.replace("www.", "") == m.group(1)),
+                current_domain,
+            )
+            _add_trap(domain, {"template": m.group(2), "urls_pruned": int(m.group(3))})
+            continue
+
+        # Trap summary after the Success line:
+        # "Crawler trap (reason): template | N fetched, N pruned, N links dropped"
+        m = re.match(
+            r"Crawler trap \((.+?)\): (\S+) \| (\d+) fetched, (\d+) pruned, (\d+) links dropped",
+            stripped,
+        )
+        if m:
+            _add_trap(current_domain, {
+                "template": m.group(2),
+                "reason": m.group(1),
+                "pages_fetched": int(m.group(3)),
+                "urls_pruned": int(m.group(4)),
+                "links_dropped": int(m.group(5)),
+            })
+            continue
+
         # BFS completion: "BFS fetched N pages, discovered N additional URLs."
         m = re.match(r"BFS fetched (\d+) pages, discovered (\d+) additional URLs", stripped)
         if m:
@@ -96,14 +147,19 @@ def parse_map_log(lines: list[str]) -> dict:
 
         # Success line: "Success (url). Sitemap: N | BFS: N new from N fetched | Total: N URLs."
         m = re.match(
-            r"Success \(.+?\)\. Sitemap: (\d+) \| BFS: (\d+) new from (\d+) fetched \| Total: (\d+)",
+            r"Success \((.+?)\)\. Sitemap: (\d+) \| BFS: (\d+) new from (\d+) fetched \| Total: (\d+)",
             stripped,
         )
         if m:
-            current_domain["sitemap_count"] = int(m.group(1))
-            current_domain["bfs_discovered"] = int(m.group(2))
-            current_domain["bfs_fetched"] = int(m.group(3))
-            current_domain["total_urls"] = int(m.group(4))
+            # With several workers the summary can follow another domain's
+            # start line, so go back to the domain it names.
+            current_domain = next(
+                (d for d in reversed(domains) if d["url"] == m.group(1)), current_domain
+            )
+            current_domain["sitemap_count"] = int(m.group(2))
+            current_domain["bfs_discovered"] = int(m.group(3))
+            current_domain["bfs_fetched"] = int(m.group(4))
+            current_domain["total_urls"] = int(m.group(5))
             current_domain["completed"] = True
             continue
 
@@ -138,11 +194,27 @@ def parse_map_log(lines: list[str]) -> dict:
         "domains": len(domains),
         "urls": sum(d["total_urls"] for d in domains),
         "completed_domains": completed,
+        "traps": sum(len(d["traps"]) for d in domains),
     }
 
     return {"type": "map", "domains": domains, "totals": totals}
 
 
+def _add_trap(domain: dict, trap: dict) -> None:
+    # Merges a crawler trap line into the domain's traps, one entry per template
+    for existing in domain["traps"]:
+        if existing["template"] == trap["template"]:
+            existing.update(trap)
+            return
+    domain["traps"].append({
+        "reason": "self-generating",
+        "pages_fetched": None,
+        "urls_pruned": 0,
+        "links_dropped": None,
+        **trap,
+    })
+
+
 def parse_scrape_log(lines: list[str]) -> dict:
     # Parses scrape_all.log into the DATA shape expected by scrape_report.html
     domains: list[dict] = []
@@ -1,6 +1,6 @@
 """HTML templates for LPBD reports."""
 
-MAP_HTML = '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n<title>LPBD Mapper Report</title>\n<link rel="preconnect" href="https://fonts.googleapis.com">\n<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n<link href="https://fonts.googleapis.com/css2?family=Fraunces:opsz,wght@9..144,400;9..144,500;9..144,700;9..144,900&family=JetBrains+Mono:wght@400;500;700&family=Inter:wght@400;500;600&display=swap" rel="stylesheet">\n<style>\n:root {\n  --bg: #f4f1ea;\n  --paper: #fbf9f4;\n  --ink: #1a1814;\n  --ink-soft: #4a463e;\n  --muted: #8a8478;\n  --rule: #d8d2c4;\n  --accent: #b54a2c;\n  --accent-soft: #e8d5cc;\n  --green: #4a6b3a;\n  --green-soft: #d4dcc8;\n  --amber: #a87a1f;\n  --amber-soft: #f0e3c4;\n  --red: #8a2c2c;\n  --red-soft: #ecd0d0;\n}\n* { box-sizing: border-box; }\nhtml, body { margin: 0; padding: 0; }\nbody {\n  background: var(--bg);\n  color: var(--ink);\n  font-family: \'Inter\', sans-serif;\n  font-size: 14px;\n  line-height: 1.55;\n  background-image: repeating-linear-gradient(0deg, transparent 0, transparent 31px, rgba(26,24,20,0.025) 31px, rgba(26,24,20,0.025) 32px);\n}\n.wrap { max-width: 1180px; margin: 0 auto; padding: 48px 32px 80px; }\nheader {\n  border-bottom: 2px solid var(--ink);\n  padding-bottom: 24px;\n  margin-bottom: 32px;\n  display: grid;\n  grid-template-columns: 1fr auto;\n  align-items: end;\n  gap: 24px;\n}\nh1 {\n  font-family: \'Fraunces\', serif;\n  font-weight: 900;\n  font-size: clamp(40px, 6vw, 68px);\n  line-height: 0.95;\n  letter-spacing: -0.02em;\n  margin: 0;\n  font-variation-settings: \'opsz\' 144;\n}\n.subtitle {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n  color: var(--muted);\n  margin-top: 12px;\n}\n.kpi-grid {\n  display: grid;\n  grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));\n  gap: 1px;\n  background: var(--rule);\n  border: 1px solid var(--rule);\n  margin-bottom: 32px;\n}\n.kpi {\n  background: var(--paper);\n  padding: 20px 24px;\n}\n.kpi-label {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n  color: var(--muted);\n  margin-bottom: 6px;\n}\n.kpi-value {\n  font-family: \'Fraunces\', serif;\n  font-size: 40px;\n  font-weight: 700;\n  letter-spacing: -0.02em;\n  line-height: 1;\n  color: var(--ink);\n}\n.kpi-value.warn { color: var(--amber); }\n.kpi-value.bad { color: var(--red); }\n.kpi-value.good { color: var(--green); }\n.kpi-sub {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--muted);\n  margin-top: 6px;\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\nh2 {\n  font-family: \'Fraunces\', serif;\n  font-size: 28px;\n  font-weight: 700;\n  letter-spacing: -0.01em;\n  margin: 48px 0 16px;\n  border-bottom: 1px solid var(--rule);\n  padding-bottom: 8px;\n}\nh2 .small {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  font-weight: 400;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  margin-left: 12px;\n}\n.bar-row {\n  display: grid;\n  grid-template-columns: 220px 1fr 80px;\n  gap: 16px;\n  align-items: center;\n  padding: 8px 0;\n  font-size: 13px;\n}\n.bar-label {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  text-transform: uppercase;\n  letter-spacing: 0.05em;\n  color: var(--ink-soft);\n  overflow: hidden;\n  text-overflow: ellipsis;\n  white-space: nowrap;\n}\n.bar-track {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  height: 22px;\n  position: relative;\n  overflow: hidden;\n}\n.bar-fill {\n  height: 100%;\n  background: var(--ink);\n}\n.bar-fill.error { background: var(--red); }\n.bar-fill.warn { background: var(--amber); }\n.bar-fill.ok { background: var(--green); }\n.bar-count {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 12px;\n  font-weight: 700;\n  text-align: right;\n}\n.domain-card {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  padding: 20px 24px;\n  margin-bottom: 16px;\n}\n.domain-head {\n  display: flex;\n  justify-content: space-between;\n  align-items: baseline;\n  flex-wrap: wrap;\n  gap: 12px;\n  margin-bottom: 12px;\n}\n.domain-name {\n  font-family: \'Fraunces\', serif;\n  font-size: 22px;\n  font-weight: 500;\n  letter-spacing: -0.01em;\n}\n.domain-stats {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  color: var(--ink-soft);\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\n.domain-stats span { margin-right: 14px; }\n.domain-stats .num { color: var(--ink); font-weight: 700; }\n.domain-stats .num.bad { color: var(--red); }\n.domain-stats .num.warn { color: var(--amber); }\n.domain-stats .num.good { color: var(--green); }\n.detail-toggle {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--accent);\n  cursor: pointer;\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  background: none;\n  border: none;\n  padding: 4px 0;\n  margin-top: 8px;\n}\n.detail-body {\n  margin-top: 12px;\n  padding-top: 12px;\n  border-top: 1px solid var(--rule);\n  display: none;\n}\n.detail-body.open { display: block; }\n.examples-list {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  color: var(--ink-soft);\n  list-style: none;\n  padding: 0;\n  margin: 8px 0;\n}\n.examples-list li {\n  padding: 3px 0;\n  border-bottom: 1px dotted var(--rule);\n  word-break: break-all;\n}\n.examples-list a { color: var(--accent); text-decoration: none; }\n.error-table {\n  width: 100%;\n  border-collapse: collapse;\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  margin-top: 12px;\n}\n.error-table th {\n  text-align: left;\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  font-size: 10px;\n  font-weight: 700;\n  color: var(--muted);\n  border-bottom: 1px solid var(--rule);\n  padding: 6px 8px;\n}\n.error-table td {\n  padding: 4px 8px;\n  border-bottom: 1px dotted var(--rule);\n  vertical-align: top;\n  word-break: break-all;\n}\n.error-table .cat-cell {\n  white-space: nowrap;\n  width: 130px;\n}\n.cat-pill {\n  display: inline-block;\n  font-size: 9px;\n  padding: 2px 6px;\n  border: 1px solid;\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n  font-weight: 700;\n}\n.cat-junk_title { background: var(--amber-soft); color: var(--amber); border-color: var(--amber); }\n.cat-duplicate { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-empty_text { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-auth_utility { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-network { background: var(--red-soft); color: var(--red); border-color: var(--red); }\n.cat-other { background: var(--paper); color: var(--muted); border-color: var(--rule); }\n.cat-http_404, .cat-http_403, .cat-http_401, .cat-http_500, .cat-http_503 {\n  background: var(--red-soft); color: var(--red); border-color: var(--red);\n}\n.search-section {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  padding: 20px 24px;\n  margin-top: 24px;\n}\n.search {\n  width: 100%;\n  font-family: \'Fraunces\', serif;\n  font-size: 18px;\n  background: transparent;\n  border: none;\n  border-bottom: 1px solid var(--rule);\n  padding: 6px 0 10px;\n  outline: none;\n  color: var(--ink);\n}\n.search:focus { border-bottom-color: var(--accent); }\n.search-results {\n  margin-top: 16px;\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  max-height: 400px;\n  overflow-y: auto;\n}\n.search-results .hit {\n  padding: 6px 0;\n  border-bottom: 1px dotted var(--rule);\n  word-break: break-all;\n}\n.search-results .hit-cat {\n  display: inline-block;\n  font-size: 9px;\n  margin-right: 8px;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\n.search-results .hit a { color: var(--accent); text-decoration: none; }\n.note {\n  font-family: \'Inter\', sans-serif;\n  font-size: 13px;\n  color: var(--ink-soft);\n  font-style: italic;\n  margin: 12px 0;\n  padding: 10px 14px;\n  background: var(--amber-soft);\n  border-left: 3px solid var(--amber);\n}\nfooter {\n  margin-top: 64px;\n  padding-top: 24px;\n  border-top: 1px solid var(--rule);\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n}\n@media (max-width: 720px) {\n  .wrap { padding: 32px 20px 60px; }\n  header { grid-template-columns: 1fr; }\n  .bar-row { grid-template-columns: 1fr; gap: 4px; }\n  .domain-head { flex-direction: column; align-items: flex-start; }\n}\n</style>\n</head>\n<body>\n<div class="wrap">\n  <header>\n    <div>\n      <h1>Mapper<br>Report</h1>\n      <div class="subtitle">LPBD Pipeline Log &middot; <span id="run-date"></span></div>\n    </div>\n  </header>\n\n  <div id="content"></div>\n\n  <footer>Local Privacy-Based Discovery / Generated <span id="gen-date"></span></footer>\n</div>\n\n<script>\nconst VIEW_TYPE = "map";\n\nfunction fmt(n) { return n == null ? "0" : n.toLocaleString(); }\nconst DATA = __DATA__;\nfunction escapeHTML(s) {\n  if (s == null) return "";\n  return String(s).replace(/[&<>"\']/g, c => ({\'&\':\'&amp;\',\'<\':\'&lt;\',\'>\':\'&gt;\',\'"\':\'&quot;\',"\'":\'&#39;\'}[c]));\n}\n\nfunction renderKPIs(items) {\n  return `<div class="kpi-grid">${items.map(i => `\n    <div class="kpi">\n      <div class="kpi-label">${escapeHTML(i.label)}</div>\n      <div class="kpi-value ${i.tone || \'\'}">${escapeHTML(i.value)}</div>\n      ${i.sub ? `<div class="kpi-sub">${escapeHTML(i.sub)}</div>` : \'\'}\n    </div>`).join(\'\')}</div>`;\n}\n\nfunction renderBars(rows, max, getClass) {\n  return rows.map(r => {\n    const pct = max > 0 ? (r.value / max * 100) : 0;\n    const cls = getClass ? getClass(r) : \'\';\n    return `<div class="bar-row">\n      <div class="bar-label">${escapeHTML(r.label)}</div>\n      <div class="bar-track"><div class="bar-fill ${cls}" style="width:${pct}%"></div></div>\n      <div class="bar-count">${fmt(r.value)}</div>\n    </div>`;\n  }).join(\'\');\n}\n\n// ---------- MAP VIEW ----------\nfunction renderMap(data) {\n  const t = data.totals;\n  const completePct = t.domains > 0 ? Math.round(t.completed_domains / t.domains * 100) : 0;\n  let html = renderKPIs([\n    { label: "Domains", value: fmt(t.domains), sub: `${t.completed_domains} completed (${completePct}%)`, tone: completePct === 100 ? \'good\' : \'warn\' },\n    { label: "Total URLs", value: fmt(t.urls), sub: "discovered across all domains" },\n    { label: "Avg per domain", value: fmt(Math.round(t.urls / Math.max(t.domains, 1))), sub: "URLs per mapped site" },\n  ]);\n\n  // Per-domain bars\n  html += `<h2>URLs per Domain <span class="small">${data.domains.length} domains</span></h2>`;\n  const sorted = [...data.domains].sort((a, b) => b.total_urls - a.total_urls);\n  const max = Math.max(...sorted.map(d => d.total_urls), 1);\n  html += renderBars(\n    sorted.map(d => ({ label: d.name, value: d.total_urls })),\n    max,\n    () => \'\'\n  );\n\n  // Per-domain detail cards\n  html += `<h2>Domain Details</h2>`;\n  data.domains.forEach((d, idx) => {\n    const exclPct = d.progress.length > 0 ? Math.round(d.exclusion_ratio * 100) : 0;\n    html += `<div class="domain-card">\n      <div class="domain-head">\n        <div class="domain-name">${escapeHTML(d.name)}</div>\n        <div class="domain-stats">\n          <span><span class="num ${d.completed ? \'good\' : \'bad\'}">${d.completed ? \'OK\' : \'INCOMPLETE\'}</span></span>\n          <span>URLs: <span class="num">${fmt(d.total_urls)}</span></span>\n          ${d.bfs_fetched != null ? `<span>BFS fetched: <span class="num">${fmt(d.bfs_fetched)}</span></span>` : \'\'}\n          <span>Excluded: <span class="num ${exclPct > 60 ? \'warn\' : \'\'}">${exclPct}%</span></span>\n          ${d.no_sitemap ? `<span class="num warn">no sitemap</span>` : \'\'}\n        </div>\n      </div>\n      <button class="detail-toggle" onclick="document.getElementById(\'det-${idx}\').classList.toggle(\'open\')">Toggle examples and crawl progress</button>\n      <div id="det-${idx}" class="detail-body">\n        ${d.examples.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin-bottom:6px;">Top 5 example URLs</div>\n          <ul class="examples-list">${d.examples.map(u => `<li><a href="${escapeHTML(u)}" target="_blank" rel="noopener">${escapeHTML(u)}</a></li>`).join(\'\')}</ul>` : \'\'}\n        ${d.progress.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin:12px 0 6px;">Crawl progression (every 25 fetches)</div>\n          <table class="error-table"><thead><tr><th>Crawled</th><th>Found</th><th>Queue</th><th>Excluded</th><th>Dupes</th><th>Current</th></tr></thead>\n          <tbody>${d.progress.slice(-15).map(p => `<tr><td>${p.crawled}</td><td>${p.found}</td><td>${p.queue}</td><td>${p.excluded}</td><td>${p.dupes}</td><td>${escapeHTML(p.current)}</td></tr>`).join(\'\')}</tbody></table>\n          ${d.progress.length > 15 ? `<div style="font-size:10px;color:var(--muted);margin-top:4px;">Showing last 15 of ${d.progress.length} progress checkpoints.</div>` : \'\'}` : \'\'}\n      </div>\n    </div>`;\n  });\n\n  return html;\n}\n\n// ---------- SCRAPE VIEW ----------\nconst CAT_LABELS = {\n  junk_title: "Junk title (silent 404s)",\n  duplicate: "Duplicate content",\n  empty_text: "Empty page text",\n  auth_utility: "Auth or utility page",\n  http_404: "HTTP 404",\n  http_403: "HTTP 403",\n  http_401: "HTTP 401",\n  http_503: "HTTP 503",\n  network: "Network error (DNS / timeout)",\n  other: "Other",\n};\n\n// Categories that represent the filter doing its job vs real fetch failures\nconst FILTER_CATS = new Set([\'junk_title\', \'duplicate\', \'empty_text\', \'auth_utility\']);\nconst FAILURE_CATS = new Set([\'http_404\', \'http_403\', \'http_401\', \'http_400\', \'http_500\', \'http_503\', \'network\']);\n\nfunction classifyOutcome(category) {\n  if (FILTER_CATS.has(category)) return \'filtered\';\n  if (FAILURE_CATS.has(category)) return \'failed\';\n  return \'other\';\n}\n\nfunction bucketDomain(d) {\n  let filtered = 0, failed = 0, other = 0;\n  d.error_samples.forEach(s => {\n    const o = classifyOutcome(s.category);\n    if (o === \'filtered\') filtered++;\n    else if (o === \'failed\') failed++;\n    else other++;\n  });\n  return { filtered, failed, other };\n}\n\nfunction renderScrape(data) {\n  const t = data.totals;\n\n  // Recompute totals using the three-bucket model\n  let totalFiltered = 0, totalFailed = 0, totalOther = 0;\n  data.domains.forEach(d => {\n    const b = bucketDomain(d);\n    totalFiltered += b.filtered;\n    totalFailed += b.failed;\n    totalOther += b.other;\n  });\n  // Effective success rate: of pages we actually wanted to read, how many gave us text?\n  const fetchable = t.pages_scraped + totalFailed;\n  const effective = fetchable > 0 ? Math.round(t.pages_scraped / fetchable * 100) : 0;\n\n  let html = renderKPIs([\n    { label: "Pages scraped", value: fmt(t.pages_scraped), sub: "usable text extracted", tone: \'good\' },\n    { label: "Filtered out", value: fmt(totalFiltered), sub: "scraper correctly skipped", tone: \'\' },\n    { label: "Fetch failures", value: fmt(totalFailed), sub: "HTTP errors and network", tone: totalFailed > 500 ? \'bad\' : \'warn\' },\n    { label: "Effective rate", value: effective + "%", sub: "scraped / fetchable", tone: effective > 70 ? \'good\' : effective > 40 ? \'warn\' : \'bad\' },\n  ]);\n\n  // Filter outcomes (good catches)\n  const cats = data.error_categories || {};\n  const filterEntries = Object.entries(cats).filter(([c]) => FILTER_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n  const failureEntries = Object.entries(cats).filter(([c]) => FAILURE_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n  const otherEntries = Object.entries(cats).filter(([c]) => !FILTER_CATS.has(c) && !FAILURE_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n\n  if (filterEntries.length > 0) {\n    const max = Math.max(...filterEntries.map(e => e[1]), 1);\n    html += `<h2>Filter activity <span class="small">${fmt(totalFiltered)} pages correctly skipped</span></h2>`;\n    html += renderBars(\n      filterEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'ok\'\n    );\n  }\n\n  if (failureEntries.length > 0) {\n    const max = Math.max(...failureEntries.map(e => e[1]), 1);\n    html += `<h2>Fetch failures <span class="small">${fmt(totalFailed)} pages the scraper could not read</span></h2>`;\n    html += renderBars(\n      failureEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'error\'\n    );\n  }\n\n  if (otherEntries.length > 0) {\n    const max = Math.max(...otherEntries.map(e => e[1]), 1);\n    html += `<h2>Other <span class="small">uncategorized</span></h2>`;\n    html += renderBars(\n      otherEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'\'\n    );\n  }\n\n  // Per-domain\n  html += `<h2>By Domain</h2>`;\n  data.domains.forEach((d, idx) => {\n    const b = bucketDomain(d);\n    const fetchableD = d.scraped + b.failed;\n    const effPct = fetchableD > 0 ? Math.round(d.scraped / fetchableD * 100) : 0;\n    html += `<div class="domain-card">\n      <div class="domain-head">\n        <div class="domain-name">${escapeHTML(d.name)}</div>\n        <div class="domain-stats">\n          <span>Pages: <span class="num">${fmt(d.page_count)}</span></span>\n          <span>Scraped: <span class="num good">${fmt(d.scraped)}</span></span>\n          <span>Filtered: <span class="num">${fmt(b.filtered)}</span></span>\n          <span>Failed: <span class="num ${b.failed > 0 ? \'bad\' : \'\'}">${fmt(b.failed)}</span></span>\n          ${fetchableD > 0 ? `<span>Effective: <span class="num ${effPct > 70 ? \'good\' : effPct > 40 ? \'warn\' : \'bad\'}">${effPct}%</span></span>` : \'\'}\n        </div>\n      </div>\n      ${d.error_samples.length > 0 ? `<button class="detail-toggle" onclick="document.getElementById(\'det-${idx}\').classList.toggle(\'open\')">Toggle ${d.error_samples.length} error sample${d.error_samples.length === 1 ? \'\' : \'s\'}</button>\n      <div id="det-${idx}" class="detail-body">\n        <table class="error-table">\n          <thead><tr><th class="cat-cell">Category</th><th>URL</th><th>Reason</th></tr></thead>\n          <tbody>${d.error_samples.map(s => `<tr>\n            <td class="cat-cell"><span class="cat-pill cat-${escapeHTML(s.category)}">${escapeHTML(s.category)}</span></td>\n            <td><a href="${escapeHTML(s.url)}" target="_blank" rel="noopener" style="color:var(--accent);text-decoration:none;">${escapeHTML(s.url)}</a></td>\n            <td>${escapeHTML(s.reason.length > 100 ? s.reason.slice(0, 100) + \'...\' : s.reason)}</td>\n          </tr>`).join(\'\')}</tbody>\n        </table>\n      </div>` : \'\'}\n    </div>`;\n  });\n\n  // Search panel\n  html += `<h2>Search Errors <span class="small">across all domains</span></h2>\n    <div class="search-section">\n      <input type="text" class="search" id="search" placeholder="Search by URL or reason...">\n      <div class="search-results" id="search-results"></div>\n    </div>`;\n  return html;\n}\n\n// ---------- INIT ----------\ndocument.getElementById(\'content\').innerHTML = VIEW_TYPE === \'map\' ? renderMap(DATA) : renderScrape(DATA);\ndocument.getElementById(\'run-date\').textContent = new Date().toLocaleDateString(\'en-US\', { year: \'numeric\', month: \'long\', day: \'numeric\' });\ndocument.getElementById(\'gen-date\').textContent = new Date().toLocaleString();\n\n// Wire up search if present\nconst searchEl = document.getElementById(\'search\');\nif (searchEl && VIEW_TYPE === \'scrape\') {\n  const allErrors = [];\n  DATA.domains.forEach(d => {\n    d.error_samples.forEach(s => allErrors.push({ ...s, domain: d.name }));\n  });\n  const resultsEl = document.getElementById(\'search-results\');\n  function updateSearch() {\n    const q = searchEl.value.trim().toLowerCase();\n    if (!q) { resultsEl.innerHTML = `<div style="color:var(--muted);font-style:italic;">Type to search ${allErrors.length.toLocaleString()} error entries...</div>`; return; }\n    const hits = allErrors.filter(e =>\n      e.url.toLowerCase().includes(q) || e.reason.toLowerCase().includes(q) || e.category.includes(q) || e.domain.toLowerCase().includes(q)\n    ).slice(0, 200);\n    resultsEl.innerHTML = hits.length === 0\n      ? `<div style="color:var(--muted);font-style:italic;">No matches.</div>`\n      : `<div style="color:var(--muted);margin-bottom:8px;">${hits.length}${hits.length === 200 ? \'+\' : \'\'} matches</div>` +\n        hits.map(h => `<div class="hit">\n          <span class="hit-cat">[${escapeHTML(h.category)}]</span>\n          <a href="${escapeHTML(h.url)}" target="_blank" rel="noopener">${escapeHTML(h.url)}</a>\n          <div style="color:var(--ink-soft);margin-top:2px;font-size:10px;">${escapeHTML(h.reason.length > 150 ? h.reason.slice(0, 150) + \'...\' : h.reason)}</div>\n        </div>`).join(\'\');\n  }\n  searchEl.addEventListener(\'input\', updateSearch);\n  updateSearch();\n}\n</script>\n</body>\n</html>\n'
+MAP_HTML = '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n<title>LPBD Mapper Report</title>\n<link rel="preconnect" href="https://fonts.googleapis.com">\n<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n<link href="https://fonts.googleapis.com/css2?family=Fraunces:opsz,wght@9..144,400;9..144,500;9..144,700;9..144,900&family=JetBrains+Mono:wght@400;500;700&family=Inter:wght@400;500;600&display=swap" rel="stylesheet">\n<style>\n:root {\n  --bg: #f4f1ea;\n  --paper: #fbf9f4;\n  --ink: #1a1814;\n  --ink-soft: #4a463e;\n  --muted: #8a8478;\n  --rule: #d8d2c4;\n  --accent: #b54a2c;\n  --accent-soft: #e8d5cc;\n  --green: #4a6b3a;\n  --green-soft: #d4dcc8;\n  --amber: #a87a1f;\n  --amber-soft: #f0e3c4;\n  --red: #8a2c2c;\n  --red-soft: #ecd0d0;\n}\n* { box-sizing: border-box; }\nhtml, body { margin: 0; padding: 0; }\nbody {\n  background: var(--bg);\n  color: var(--ink);\n  font-family: \'Inter\', sans-serif;\n  font-size: 14px;\n  line-height: 1.55;\n  background-image: repeating-linear-gradient(0deg, transparent 0, transparent 31px, rgba(26,24,20,0.025) 31px, rgba(26,24,20,0.025) 32px);\n}\n.wrap { max-width: 1180px; margin: 0 auto; padding: 48px 32px 80px; }\nheader {\n  border-bottom: 2px solid var(--ink);\n  padding-bottom: 24px;\n  margin-bottom: 32px;\n  display: grid;\n  grid-template-columns: 1fr auto;\n  align-items: end;\n  gap: 24px;\n}\nh1 {\n  font-family: \'Fraunces\', serif;\n  font-weight: 900;\n  font-size: clamp(40px, 6vw, 68px);\n  line-height: 0.95;\n  letter-spacing: -0.02em;\n  margin: 0;\n  font-variation-settings: \'opsz\' 144;\n}\n.subtitle {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n  color: var(--muted);\n  margin-top: 12px;\n}\n.kpi-grid {\n  display: grid;\n  grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));\n  gap: 1px;\n  background: var(--rule);\n  border: 1px solid var(--rule);\n  margin-bottom: 32px;\n}\n.kpi {\n  background: var(--paper);\n  padding: 20px 24px;\n}\n.kpi-label {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n  color: var(--muted);\n  margin-bottom: 6px;\n}\n.kpi-value {\n  font-family: \'Fraunces\', serif;\n  font-size: 40px;\n  font-weight: 700;\n  letter-spacing: -0.02em;\n  line-height: 1;\n  color: var(--ink);\n}\n.kpi-value.warn { color: var(--amber); }\n.kpi-value.bad { color: var(--red); }\n.kpi-value.good { color: var(--green); }\n.kpi-sub {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--muted);\n  margin-top: 6px;\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\nh2 {\n  font-family: \'Fraunces\', serif;\n  font-size: 28px;\n  font-weight: 700;\n  letter-spacing: -0.01em;\n  margin: 48px 0 16px;\n  border-bottom: 1px solid var(--rule);\n  padding-bottom: 8px;\n}\nh2 .small {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  font-weight: 400;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  margin-left: 12px;\n}\n.bar-row {\n  display: grid;\n  grid-template-columns: 220px 1fr 80px;\n  gap: 16px;\n  align-items: center;\n  padding: 8px 0;\n  font-size: 13px;\n}\n.bar-label {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  text-transform: uppercase;\n  letter-spacing: 0.05em;\n  color: var(--ink-soft);\n  overflow: hidden;\n  text-overflow: ellipsis;\n  white-space: nowrap;\n}\n.bar-track {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  height: 22px;\n  position: relative;\n  overflow: hidden;\n}\n.bar-fill {\n  height: 100%;\n  background: var(--ink);\n}\n.bar-fill.error { background: var(--red); }\n.bar-fill.warn { background: var(--amber); }\n.bar-fill.ok { background: var(--green); }\n.bar-count {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 12px;\n  font-weight: 700;\n  text-align: right;\n}\n.domain-card {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  padding: 20px 24px;\n  margin-bottom: 16px;\n}\n.domain-head {\n  display: flex;\n  justify-content: space-between;\n  align-items: baseline;\n  flex-wrap: wrap;\n  gap: 12px;\n  margin-bottom: 12px;\n}\n.domain-name {\n  font-family: \'Fraunces\', serif;\n  font-size: 22px;\n  font-weight: 500;\n  letter-spacing: -0.01em;\n}\n.domain-stats {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  color: var(--ink-soft);\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\n.domain-stats span { margin-right: 14px; }\n.domain-stats .num { color: var(--ink); font-weight: 700; }\n.domain-stats .num.bad { color: var(--red); }\n.domain-stats .num.warn { color: var(--amber); }\n.domain-stats .num.good { color: var(--green); }\n.detail-toggle {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--accent);\n  cursor: pointer;\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  background: none;\n  border: none;\n  padding: 4px 0;\n  margin-top: 8px;\n}\n.detail-body {\n  margin-top: 12px;\n  padding-top: 12px;\n  border-top: 1px solid var(--rule);\n  display: none;\n}\n.detail-body.open { display: block; }\n.examples-list {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  color: var(--ink-soft);\n  list-style: none;\n  padding: 0;\n  margin: 8px 0;\n}\n.examples-list li {\n  padding: 3px 0;\n  border-bottom: 1px dotted var(--rule);\n  word-break: break-all;\n}\n.examples-list a { color: var(--accent); text-decoration: none; }\n.error-table {\n  width: 100%;\n  border-collapse: collapse;\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  margin-top: 12px;\n}\n.error-table th {\n  text-align: left;\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  font-size: 10px;\n  font-weight: 700;\n  color: var(--muted);\n  border-bottom: 1px solid var(--rule);\n  padding: 6px 8px;\n}\n.error-table td {\n  padding: 4px 8px;\n  border-bottom: 1px dotted var(--rule);\n  vertical-align: top;\n  word-break: break-all;\n}\n.error-table .cat-cell {\n  white-space: nowrap;\n  width: 130px;\n}\n.cat-pill {\n  display: inline-block;\n  font-size: 9px;\n  padding: 2px 6px;\n  border: 1px solid;\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n  font-weight: 700;\n}\n.cat-junk_title { background: var(--amber-soft); color: var(--amber); border-color: var(--amber); }\n.cat-duplicate { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-empty_text { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-auth_utility { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-network { background: var(--red-soft); color: var(--red); border-color: var(--red); }\n.cat-other { background: var(--paper); color: var(--muted); border-color: var(--rule); }\n.cat-http_404, .cat-http_403, .cat-http_401, .cat-http_500, .cat-http_503 {\n  background: var(--red-soft); color: var(--red); border-color: var(--red);\n}\n.search-section {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  padding: 20px 24px;\n  margin-top: 24px;\n}\n.search {\n  width: 100%;\n  font-family: \'Fraunces\', serif;\n  font-size: 18px;\n  background: transparent;\n  border: none;\n  border-bottom: 1px solid var(--rule);\n  padding: 6px 0 10px;\n  outline: none;\n  color: var(--ink);\n}\n.search:focus { border-bottom-color: var(--accent); }\n.search-results {\n  margin-top: 16px;\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  max-height: 400px;\n  overflow-y: auto;\n}\n.search-results .hit {\n  padding: 6px 0;\n  border-bottom: 1px dotted var(--rule);\n  word-break: break-all;\n}\n.search-results .hit-cat {\n  display: inline-block;\n  font-size: 9px;\n  margin-right: 8px;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\n.search-results .hit a { color: var(--accent); text-decoration: none; }\n.note {\n  font-family: \'Inter\', sans-serif;\n  font-size: 13px;\n  color: var(--ink-soft);\n  font-style: italic;\n  margin: 12px 0;\n  padding: 10px 14px;\n  background: var(--amber-soft);\n  border-left: 3px solid var(--amber);\n}\nfooter {\n  margin-top: 64px;\n  padding-top: 24px;\n  border-top: 1px solid var(--rule);\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n}\n@media (max-width: 720px) {\n  .wrap { padding: 32px 20px 60px; }\n  header { grid-template-columns: 1fr; }\n  .bar-row { grid-template-columns: 1fr; gap: 4px; }\n  .domain-head { flex-direction: column; align-items: flex-start; }\n}\n</style>\n</head>\n<body>\n<div class="wrap">\n  <header>\n    <div>\n      <h1>Mapper<br>Report</h1>\n      <div class="subtitle">LPBD Pipeline Log &middot; <span id="run-date"></span></div>\n    </div>\n  </header>\n\n  <div id="content"></div>\n\n  <footer>Local Privacy-Based Discovery / Generated <span id="gen-date"></span></footer>\n</div>\n\n<script>\nconst VIEW_TYPE = "map";\n\nfunction fmt(n) { return n == null ? "0" : n.toLocaleString(); }\nconst DATA = __DATA__;\nfunction escapeHTML(s) {\n  if (s == null) return "";\n  return String(s).replace(/[&<>"\']/g, c => ({\'&\':\'&amp;\',\'<\':\'&lt;\',\'>\':\'&gt;\',\'"\':\'&quot;\',"\'":\'&#39;\'}[c]));\n}\n\nfunction renderKPIs(items) {\n  return `<div class="kpi-grid">${items.map(i => `\n    <div class="kpi">\n      <div class="kpi-label">${escapeHTML(i.label)}</div>\n      <div class="kpi-value ${i.tone || \'\'}">${escapeHTML(i.value)}</div>\n      ${i.sub ? `<div class="kpi-sub">${escapeHTML(i.sub)}</div>` : \'\'}\n    </div>`).join(\'\')}</div>`;\n}\n\nfunction renderBars(rows, max, getClass) {\n  return rows.map(r => {\n    const pct = max > 0 ? (r.value / max * 100) : 0;\n    const cls = getClass ? getClass(r) : \'\';\n    return `<div class="bar-row">\n      <div class="bar-label">${escapeHTML(r.label)}</div>\n      <div class="bar-track"><div class="bar-fill ${cls}" style="width:${pct}%"></div></div>\n      <div class="bar-count">${fmt(r.value)}</div>\n    </div>`;\n  }).join(\'\');\n}\n\n// ---------- MAP VIEW ----------\nfunction renderMap(data) {\n  const t = data.totals;\n  const completePct = t.domains > 0 ? Math.round(t.completed_domains / t.domains * 100) : 0;\n  let html = renderKPIs([\n    { label: "Domains", value: fmt(t.domains), sub: `${t.completed_domains} completed (${completePct}%)`, tone: completePct === 100 ? \'good\' : \'warn\' },\n    { label: "Total URLs", value: fmt(t.urls), sub: "discovered across all domains" },\n    { label: "Avg per domain", value: fmt(Math.round(t.urls / Math.max(t.domains, 1))), sub: "URLs per mapped site" },\n    { label: "Crawler traps", value: fmt(t.traps || 0), sub: "URL templates pruned from the crawl", tone: t.traps ? \'warn\' : \'\' },\n  ]);\n\n  // Per-domain bars\n  html += `<h2>URLs per Domain <span class="small">${data.domains.length} domains</span></h2>`;\n  const sorted = [...data.domains].sort((a, b) => b.total_urls - a.total_urls);\n  const max = Math.max(...sorted.map(d => d.total_urls), 1);\n  html += renderBars(\n    sorted.map(d => ({ label: d.name, value: d.total_urls })),\n    max,\n    () => \'\'\n  );\n\n  // Per-domain detail cards\n  html += `<h2>Domain Details</h2>`;\n  data.domains.forEach((d, idx) => {\n    const exclPct = d.progress.length > 0 ? Math.round(d.exclusion_ratio * 100) : 0;\n    html += `<div class="domain-card">\n      <div class="domain-head">\n        <div class="domain-name">${escapeHTML(d.name)}</div>\n        <div class="domain-stats">\n          <span><span class="num ${d.completed ? \'good\' : \'bad\'}">${d.completed ? \'OK\' : \'INCOMPLETE\'}</span></span>\n          <span>URLs: <span class="num">${fmt(d.total_urls)}</span></span>\n          ${d.bfs_fetched != null ? `<span>BFS fetched: <span class="num">${fmt(d.bfs_fetched)}</span></span>` : \'\'}\n          <span>Excluded: <span class="num ${exclPct > 60 ? \'warn\' : \'\'}">${exclPct}%</span></span>\n          ${d.no_sitemap ? `<span class="num warn">no sitemap</span>` : \'\'}\n          ${d.incremental ? `<span>Incremental: <span class="num">+${fmt(d.added)} / -${fmt(d.removed)}</span>, <span class="num">${fmt(d.not_modified)}</span> not modified</span>` : \'\'}\n          ${d.traps && d.traps.length > 0 ? `<span>Traps: <span class="num warn">${d.traps.length}</span></span>` : \'\'}\n        </div>\n      </div>\n      <button class="detail-toggle" onclick="document.getElementById(\'det-${idx}\').classList.toggle(\'open\')">Toggle examples${d.traps && d.traps.length > 0 ? \', crawler traps\' : \'\'} and crawl progress</button>\n      <div id="det-${idx}" class="detail-body">\n        ${d.examples.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin-bottom:6px;">Top 5 example URLs</div>\n          <ul class="examples-list">${d.examples.map(u => `<li><a href="${escapeHTML(u)}" target="_blank" rel="noopener">${escapeHTML(u)}</a></li>`).join(\'\')}</ul>` : \'\'}\n        ${d.traps && d.traps.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin:12px 0 6px;">Crawler traps</div>\n          <table class="error-table"><thead><tr><th>Template</th><th>Reason</th><th>Fetched</th><th>Pruned</th><th>Links dropped</th></tr></thead>\n          <tbody>${d.traps.map(tr => `<tr><td>${escapeHTML(tr.template)}</td><td>${escapeHTML(tr.reason)}</td><td>${tr.pages_fetched == null ? \'-\' : fmt(tr.pages_fetched)}</td><td>${fmt(tr.urls_pruned)}</td><td>${tr.links_dropped == null ? \'-\' : fmt(tr.links_dropped)}</td></tr>`).join(\'\')}</tbody></table>` : \'\'}\n        ${d.progress.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin:12px 0 6px;">Crawl progression (every 25 fetches)</div>\n          <table class="error-table"><thead><tr><th>Crawled</th><th>Found</th><th>Queue</th><th>Excluded</th><th>Dupes</th><th>Current</th></tr></thead>\n          <tbody>${d.progress.slice(-15).map(p => `<tr><td>${p.crawled}</td><td>${p.found}</td><td>${p.queue}</td><td>${p.excluded}</td><td>${p.dupes}</td><td>${escapeHTML(p.current)}</td></tr>`).join(\'\')}</tbody></table>\n          ${d.progress.length > 15 ? `<div style="font-size:10px;color:var(--muted);margin-top:4px;">Showing last 15 of ${d.progress.length} progress checkpoints.</div>` : \'\'}` : \'\'}\n      </div>\n    </div>`;\n  });\n\n  return html;\n}\n\n// ---------- SCRAPE VIEW ----------\nconst CAT_LABELS = {\n  junk_title: "Junk title (silent 404s)",\n  duplicate: "Duplicate content",\n  empty_text: "Empty page text",\n  auth_utility: "Auth or utility page",\n  http_404: "HTTP 404",\n  http_403: "HTTP 403",\n  http_401: "HTTP 401",\n  http_503: "HTTP 503",\n  network: "Network error (DNS / timeout)",\n  other: "Other",\n};\n\n// Categories that represent the filter doing its job vs real fetch failures\nconst FILTER_CATS = new Set([\'junk_title\', \'duplicate\', \'empty_text\', \'auth_utility\']);\nconst FAILURE_CATS = new Set([\'http_404\', \'http_403\', \'http_401\', \'http_400\', \'http_500\', \'http_503\', \'network\']);\n\nfunction classifyOutcome(category) {\n  if (FILTER_CATS.has(category)) return \'filtered\';\n  if (FAILURE_CATS.has(category)) return \'failed\';\n  return \'other\';\n}\n\nfunction bucketDomain(d) {\n  let filtered = 0, failed = 0, other = 0;\n  d.error_samples.forEach(s => {\n    const o = classifyOutcome(s.category);\n    if (o === \'filtered\') filtered++;\n    else if (o === \'failed\') failed++;\n    else other++;\n  });\n  return { filtered, failed, other };\n}\n\nfunction renderScrape(data) {\n  const t = data.totals;\n\n  // Recompute totals using the three-bucket model\n  let totalFiltered = 0, totalFailed = 0, totalOther = 0;\n  data.domains.forEach(d => {\n    const b = bucketDomain(d);\n    totalFiltered += b.filtered;\n    totalFailed += b.failed;\n    totalOther += b.other;\n  });\n  // Effective success rate: of pages we actually wanted to read, how many gave us text?\n  const fetchable = t.pages_scraped + totalFailed;\n  const effective = fetchable > 0 ? Math.round(t.pages_scraped / fetchable * 100) : 0;\n\n  let html = renderKPIs([\n    { label: "Pages scraped", value: fmt(t.pages_scraped), sub: "usable text extracted", tone: \'good\' },\n    { label: "Filtered out", value: fmt(totalFiltered), sub: "scraper correctly skipped", tone: \'\' },\n    { label: "Fetch failures", value: fmt(totalFailed), sub: "HTTP errors and network", tone: totalFailed > 500 ? \'bad\' : \'warn\' },\n    { label: "Effective rate", value: effective + "%", sub: "scraped / fetchable", tone: effective > 70 ? \'good\' : effective > 40 ? \'warn\' : \'bad\' },\n  ]);\n\n  // Filter outcomes (good catches)\n  const cats = data.error_categories || {};\n  const filterEntries = Object.entries(cats).filter(([c]) => FILTER_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n  const failureEntries = Object.entries(cats).filter(([c]) => FAILURE_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n  const otherEntries = Object.entries(cats).filter(([c]) => !FILTER_CATS.has(c) && !FAILURE_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n\n  if (filterEntries.length > 0) {\n    const max = Math.max(...filterEntries.map(e => e[1]), 1);\n    html += `<h2>Filter activity <span class="small">${fmt(totalFiltered)} pages correctly skipped</span></h2>`;\n    html += renderBars(\n      filterEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'ok\'\n    );\n  }\n\n  if (failureEntries.length > 0) {\n    const max = Math.max(...failureEntries.map(e => e[1]), 1);\n    html += `<h2>Fetch failures <span class="small">${fmt(totalFailed)} pages the scraper could not read</span></h2>`;\n    html += renderBars(\n      failureEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'error\'\n    );\n  }\n\n  if (otherEntries.length > 0) {\n    const max = Math.max(...otherEntries.map(e => e[1]), 1);\n    html += `<h2>Other <span class="small">uncategorized</span></h2>`;\n    html += renderBars(\n      otherEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'\'\n    );\n  }\n\n  // Per-domain\n  html += `<h2>By Domain</h2>`;\n  data.domains.forEach((d, idx) => {\n    const b = bucketDomain(d);\n    const fetchableD = d.scraped + b.failed;\n    const effPct = fetchableD > 0 ? Math.round(d.scraped / fetchableD * 100) : 0;\n    html += `<div class="domain-card">\n      <div class="domain-head">\n        <div class="domain-name">${escapeHTML(d.name)}</div>\n        <div class="domain-stats">\n          <span>Pages: <span class="num">${fmt(d.page_count)}</span></span>\n          <span>Scraped: <span class="num good">${fmt(d.scraped)}</span></span>\n          <span>Filtered: <span class="num">${fmt(b.filtered)}</span></span>\n          <span>Failed: <span class="num ${b.failed > 0 ? \'bad\' : \'\'}">${fmt(b.failed)}</span></span>\n          ${fetchableD > 0 ? `<span>Effective: <span class="num ${effPct > 70 ? \'good\' : effPct > 40 ? \'warn\' : \'bad\'}">${effPct}%</span></span>` : \'\'}\n        </div>\n      </div>\n      ${d.error_samples.length > 0 ? `<button class="detail-toggle" onclick="document.getElementById(\'det-${idx}\').classList.toggle(\'open\')">Toggle ${d.error_samples.length} error sample${d.error_samples.length === 1 ? \'\' : \'s\'}</button>\n      <div id="det-${idx}" class="detail-body">\n        <table class="error-table">\n          <thead><tr><th class="cat-cell">Category</th><th>URL</th><th>Reason</th></tr></thead>\n          <tbody>${d.error_samples.map(s => `<tr>\n            <td class="cat-cell"><span class="cat-pill cat-${escapeHTML(s.category)}">${escapeHTML(s.category)}</span></td>\n            <td><a href="${escapeHTML(s.url)}" target="_blank" rel="noopener" style="color:var(--accent);text-decoration:none;">${escapeHTML(s.url)}</a></td>\n            <td>${escapeHTML(s.reason.length > 100 ? s.reason.slice(0, 100) + \'...\' : s.reason)}</td>\n          </tr>`).join(\'\')}</tbody>\n        </table>\n      </div>` : \'\'}\n    </div>`;\n  });\n\n  // Search panel\n  html += `<h2>Search Errors <span class="small">across all domains</span></h2>\n    <div class="search-section">\n      <input type="text" class="search" id="search" placeholder="Search by URL or reason...">\n      <div class="search-results" id="search-results"></div>\n    </div>`;\n  return html;\n}\n\n// ---------- INIT ----------\ndocument.getElementById(\'content\').innerHTML = VIEW_TYPE === \'map\' ? renderMap(DATA) : renderScrape(DATA);\ndocument.getElementById(\'run-date\').textContent = new Date().toLocaleDateString(\'en-US\', { year: \'numeric\', month: \'long\', day: \'numeric\' });\ndocument.getElementById(\'gen-date\').textContent = new Date().toLocaleString();\n\n// Wire up search if present\nconst searchEl = document.getElementById(\'search\');\nif (searchEl && VIEW_TYPE === \'scrape\') {\n  const allErrors = [];\n  DATA.domains.forEach(d => {\n    d.error_samples.forEach(s => allErrors.push({ ...s, domain: d.name }));\n  });\n  const resultsEl = document.getElementById(\'search-results\');\n  function updateSearch() {\n    const q = searchEl.value.trim().toLowerCase();\n    if (!q) { resultsEl.innerHTML = `<div style="color:var(--muted);font-style:italic;">Type to search ${allErrors.length.toLocaleString()} error entries...</div>`; return; }\n    const hits = allErrors.filter(e =>\n      e.url.toLowerCase().includes(q) || e.reason.toLowerCase().includes(q) || e.category.includes(q) || e.domain.toLowerCase().includes(q)\n    ).slice(0, 200);\n    resultsEl.innerHTML = hits.length === 0\n      ? `<div style="color:var(--muted);font-style:italic;">No matches.</div>`\n      : `<div style="color:var(--muted);margin-bottom:8px;">${hits.length}${hits.length === 200 ? \'+\' : \'\'} matches</div>` +\n        hits.map(h => `<div class="hit">\n          <span class="hit-cat">[${escapeHTML(h.category)}]</span>\n          <a href="${escapeHTML(h.url)}" target="_blank" rel="noopener">${escapeHTML(h.url)}</a>\n          <div style="color:var(--ink-soft);margin-top:2px;font-size:10px;">${escapeHTML(h.reason.length > 150 ? h.reason.slice(0, 150) + \'...\' : h.reason)}</div>\n        </div>`).join(\'\');\n  }\n  searchEl.addEventListener(\'input\', updateSearch);\n  updateSearch();\n}\n</script>\n</body>\n</html>\n'
 
 SCRAPE_HTML = '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n<title>LPBD Scraper Report</title>\n<link rel="preconnect" href="https://fonts.googleapis.com">\n<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n<link href="https://fonts.googleapis.com/css2?family=Fraunces:opsz,wght@9..144,400;9..144,500;9..144,700;9..144,900&family=JetBrains+Mono:wght@400;500;700&family=Inter:wght@400;500;600&display=swap" rel="stylesheet">\n<style>\n:root {\n  --bg: #f4f1ea;\n  --paper: #fbf9f4;\n  --ink: #1a1814;\n  --ink-soft: #4a463e;\n  --muted: #8a8478;\n  --rule: #d8d2c4;\n  --accent: #b54a2c;\n  --accent-soft: #e8d5cc;\n  --green: #4a6b3a;\n  --green-soft: #d4dcc8;\n  --amber: #a87a1f;\n  --amber-soft: #f0e3c4;\n  --red: #8a2c2c;\n  --red-soft: #ecd0d0;\n}\n* { box-sizing: border-box; }\nhtml, body { margin: 0; padding: 0; }\nbody {\n  background: var(--bg);\n  color: var(--ink);\n  font-family: \'Inter\', sans-serif;\n  font-size: 14px;\n  line-height: 1.55;\n  background-image: repeating-linear-gradient(0deg, transparent 0, transparent 31px, rgba(26,24,20,0.025) 31px, rgba(26,24,20,0.025) 32px);\n}\n.wrap { max-width: 1180px; margin: 0 auto; padding: 48px 32px 80px; }\nheader {\n  border-bottom: 2px solid var(--ink);\n  padding-bottom: 24px;\n  margin-bottom: 32px;\n  display: grid;\n  grid-template-columns: 1fr auto;\n  align-items: end;\n  gap: 24px;\n}\nh1 {\n  font-family: \'Fraunces\', serif;\n  font-weight: 900;\n  font-size: clamp(40px, 6vw, 68px);\n  line-height: 0.95;\n  letter-spacing: -0.02em;\n  margin: 0;\n  font-variation-settings: \'opsz\' 144;\n}\n.subtitle {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n  color: var(--muted);\n  margin-top: 12px;\n}\n.kpi-grid {\n  display: grid;\n  grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));\n  gap: 1px;\n  background: var(--rule);\n  border: 1px solid var(--rule);\n  margin-bottom: 32px;\n}\n.kpi {\n  background: var(--paper);\n  padding: 20px 24px;\n}\n.kpi-label {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n  color: var(--muted);\n  margin-bottom: 6px;\n}\n.kpi-value {\n  font-family: \'Fraunces\', serif;\n  font-size: 40px;\n  font-weight: 700;\n  letter-spacing: -0.02em;\n  line-height: 1;\n  color: var(--ink);\n}\n.kpi-value.warn { color: var(--amber); }\n.kpi-value.bad { color: var(--red); }\n.kpi-value.good { color: var(--green); }\n.kpi-sub {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--muted);\n  margin-top: 6px;\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\nh2 {\n  font-family: \'Fraunces\', serif;\n  font-size: 28px;\n  font-weight: 700;\n  letter-spacing: -0.01em;\n  margin: 48px 0 16px;\n  border-bottom: 1px solid var(--rule);\n  padding-bottom: 8px;\n}\nh2 .small {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  font-weight: 400;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  margin-left: 12px;\n}\n.bar-row {\n  display: grid;\n  grid-template-columns: 220px 1fr 80px;\n  gap: 16px;\n  align-items: center;\n  padding: 8px 0;\n  font-size: 13px;\n}\n.bar-label {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  text-transform: uppercase;\n  letter-spacing: 0.05em;\n  color: var(--ink-soft);\n  overflow: hidden;\n  text-overflow: ellipsis;\n  white-space: nowrap;\n}\n.bar-track {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  height: 22px;\n  position: relative;\n  overflow: hidden;\n}\n.bar-fill {\n  height: 100%;\n  background: var(--ink);\n}\n.bar-fill.error { background: var(--red); }\n.bar-fill.warn { background: var(--amber); }\n.bar-fill.ok { background: var(--green); }\n.bar-count {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 12px;\n  font-weight: 700;\n  text-align: right;\n}\n.domain-card {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  padding: 20px 24px;\n  margin-bottom: 16px;\n}\n.domain-head {\n  display: flex;\n  justify-content: space-between;\n  align-items: baseline;\n  flex-wrap: wrap;\n  gap: 12px;\n  margin-bottom: 12px;\n}\n.domain-name {\n  font-family: \'Fraunces\', serif;\n  font-size: 22px;\n  font-weight: 500;\n  letter-spacing: -0.01em;\n}\n.domain-stats {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  color: var(--ink-soft);\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\n.domain-stats span { margin-right: 14px; }\n.domain-stats .num { color: var(--ink); font-weight: 700; }\n.domain-stats .num.bad { color: var(--red); }\n.domain-stats .num.warn { color: var(--amber); }\n.domain-stats .num.good { color: var(--green); }\n.detail-toggle {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--accent);\n  cursor: pointer;\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  background: none;\n  border: none;\n  padding: 4px 0;\n  margin-top: 8px;\n}\n.detail-body {\n  margin-top: 12px;\n  padding-top: 12px;\n  border-top: 1px solid var(--rule);\n  display: none;\n}\n.detail-body.open { display: block; }\n.examples-list {\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  color: var(--ink-soft);\n  list-style: none;\n  padding: 0;\n  margin: 8px 0;\n}\n.examples-list li {\n  padding: 3px 0;\n  border-bottom: 1px dotted var(--rule);\n  word-break: break-all;\n}\n.examples-list a { color: var(--accent); text-decoration: none; }\n.error-table {\n  width: 100%;\n  border-collapse: collapse;\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  margin-top: 12px;\n}\n.error-table th {\n  text-align: left;\n  text-transform: uppercase;\n  letter-spacing: 0.1em;\n  font-size: 10px;\n  font-weight: 700;\n  color: var(--muted);\n  border-bottom: 1px solid var(--rule);\n  padding: 6px 8px;\n}\n.error-table td {\n  padding: 4px 8px;\n  border-bottom: 1px dotted var(--rule);\n  vertical-align: top;\n  word-break: break-all;\n}\n.error-table .cat-cell {\n  white-space: nowrap;\n  width: 130px;\n}\n.cat-pill {\n  display: inline-block;\n  font-size: 9px;\n  padding: 2px 6px;\n  border: 1px solid;\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n  font-weight: 700;\n}\n.cat-junk_title { background: var(--amber-soft); color: var(--amber); border-color: var(--amber); }\n.cat-duplicate { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-empty_text { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-auth_utility { background: var(--gray-soft, #e2ddd0); color: var(--ink-soft); border-color: var(--rule); }\n.cat-network { background: var(--red-soft); color: var(--red); border-color: var(--red); }\n.cat-other { background: var(--paper); color: var(--muted); border-color: var(--rule); }\n.cat-http_404, .cat-http_403, .cat-http_401, .cat-http_500, .cat-http_503 {\n  background: var(--red-soft); color: var(--red); border-color: var(--red);\n}\n.search-section {\n  background: var(--paper);\n  border: 1px solid var(--rule);\n  padding: 20px 24px;\n  margin-top: 24px;\n}\n.search {\n  width: 100%;\n  font-family: \'Fraunces\', serif;\n  font-size: 18px;\n  background: transparent;\n  border: none;\n  border-bottom: 1px solid var(--rule);\n  padding: 6px 0 10px;\n  outline: none;\n  color: var(--ink);\n}\n.search:focus { border-bottom-color: var(--accent); }\n.search-results {\n  margin-top: 16px;\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 11px;\n  max-height: 400px;\n  overflow-y: auto;\n}\n.search-results .hit {\n  padding: 6px 0;\n  border-bottom: 1px dotted var(--rule);\n  word-break: break-all;\n}\n.search-results .hit-cat {\n  display: inline-block;\n  font-size: 9px;\n  margin-right: 8px;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.08em;\n}\n.search-results .hit a { color: var(--accent); text-decoration: none; }\n.note {\n  font-family: \'Inter\', sans-serif;\n  font-size: 13px;\n  color: var(--ink-soft);\n  font-style: italic;\n  margin: 12px 0;\n  padding: 10px 14px;\n  background: var(--amber-soft);\n  border-left: 3px solid var(--amber);\n}\nfooter {\n  margin-top: 64px;\n  padding-top: 24px;\n  border-top: 1px solid var(--rule);\n  font-family: \'JetBrains Mono\', monospace;\n  font-size: 10px;\n  color: var(--muted);\n  text-transform: uppercase;\n  letter-spacing: 0.15em;\n}\n@media (max-width: 720px) {\n  .wrap { padding: 32px 20px 60px; }\n  header { grid-template-columns: 1fr; }\n  .bar-row { grid-template-columns: 1fr; gap: 4px; }\n  .domain-head { flex-direction: column; align-items: flex-start; }\n}\n</style>\n</head>\n<body>\n<div class="wrap">\n  <header>\n    <div>\n      <h1>Scraper<br>Report</h1>\n      <div class="subtitle">LPBD Pipeline Log &middot; <span id="run-date"></span></div>\n    </div>\n  </header>\n\n  <div id="content"></div>\n\n  <footer>Local Privacy-Based Discovery / Generated <span id="gen-date"></span></footer>\n</div>\n\n<script>\nconst DATA = __DATA__;\nconst VIEW_TYPE = "scrape";\n\nfunction fmt(n) { return n == null ? "0" : n.toLocaleString(); }\nfunction escapeHTML(s) {\n  if (s == null) return "";\n  return String(s).replace(/[&<>"\']/g, c => ({\'&\':\'&amp;\',\'<\':\'&lt;\',\'>\':\'&gt;\',\'"\':\'&quot;\',"\'":\'&#39;\'}[c]));\n}\n\nfunction renderKPIs(items) {\n  return `<div class="kpi-grid">${items.map(i => `\n    <div class="kpi">\n      <div class="kpi-label">${escapeHTML(i.label)}</div>\n      <div class="kpi-value ${i.tone || \'\'}">${escapeHTML(i.value)}</div>\n      ${i.sub ? `<div class="kpi-sub">${escapeHTML(i.sub)}</div>` : \'\'}\n    </div>`).join(\'\')}</div>`;\n}\n\nfunction renderBars(rows, max, getClass) {\n  return rows.map(r => {\n    const pct = max > 0 ? (r.value / max * 100) : 0;\n    const cls = getClass ? getClass(r) : \'\';\n    return `<div class="bar-row">\n      <div class="bar-label">${escapeHTML(r.label)}</div>\n      <div class="bar-track"><div class="bar-fill ${cls}" style="width:${pct}%"></div></div>\n      <div class="bar-count">${fmt(r.value)}</div>\n    </div>`;\n  }).join(\'\');\n}\n\n// ---------- MAP VIEW ----------\nfunction renderMap(data) {\n  const t = data.totals;\n  const completePct = t.domains > 0 ? Math.round(t.completed_domains / t.domains * 100) : 0;\n  let html = renderKPIs([\n    { label: "Domains", value: fmt(t.domains), sub: `${t.completed_domains} completed (${completePct}%)`, tone: completePct === 100 ? \'good\' : \'warn\' },\n    { label: "Total URLs", value: fmt(t.urls), sub: "discovered across all domains" },\n    { label: "Avg per domain", value: fmt(Math.round(t.urls / Math.max(t.domains, 1))), sub: "URLs per mapped site" },\n  ]);\n\n  // Per-domain bars\n  html += `<h2>URLs per Domain <span class="small">${data.domains.length} domains</span></h2>`;\n  const sorted = [...data.domains].sort((a, b) => b.total_urls - a.total_urls);\n  const max = Math.max(...sorted.map(d => d.total_urls), 1);\n  html += renderBars(\n    sorted.map(d => ({ label: d.name, value: d.total_urls })),\n    max,\n    () => \'\'\n  );\n\n  // Per-domain detail cards\n  html += `<h2>Domain Details</h2>`;\n  data.domains.forEach((d, idx) => {\n    const exclPct = d.progress.length > 0 ? Math.round(d.exclusion_ratio * 100) : 0;\n    html += `<div class="domain-card">\n      <div class="domain-head">\n        <div class="domain-name">${escapeHTML(d.name)}</div>\n        <div class="domain-stats">\n          <span><span class="num ${d.completed ? \'good\' : \'bad\'}">${d.completed ? \'OK\' : \'INCOMPLETE\'}</span></span>\n          <span>URLs: <span class="num">${fmt(d.total_urls)}</span></span>\n          ${d.bfs_fetched != null ? `<span>BFS fetched: <span class="num">${fmt(d.bfs_fetched)}</span></span>` : \'\'}\n          <span>Excluded: <span class="num ${exclPct > 60 ? \'warn\' : \'\'}">${exclPct}%</span></span>\n          ${d.no_sitemap ? `<span class="num warn">no sitemap</span>` : \'\'}\n        </div>\n      </div>\n      <button class="detail-toggle" onclick="document.getElementById(\'det-${idx}\').classList.toggle(\'open\')">Toggle examples and crawl progress</button>\n      <div id="det-${idx}" class="detail-body">\n        ${d.examples.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin-bottom:6px;">Top 5 example URLs</div>\n          <ul class="examples-list">${d.examples.map(u => `<li><a href="${escapeHTML(u)}" target="_blank" rel="noopener">${escapeHTML(u)}</a></li>`).join(\'\')}</ul>` : \'\'}\n        ${d.progress.length > 0 ? `<div style="font-family:\'JetBrains Mono\',monospace;font-size:10px;color:var(--muted);text-transform:uppercase;letter-spacing:.1em;margin:12px 0 6px;">Crawl progression (every 25 fetches)</div>\n          <table class="error-table"><thead><tr><th>Crawled</th><th>Queue</th><th>Kept</th><th>Excluded</th><th>Current</th></tr></thead>\n          <tbody>${d.progress.slice(-15).map(p => `<tr><td>${p.crawled}</td><td>${p.queue}</td><td>${p.kept}</td><td>${p.excluded}</td><td>${escapeHTML(p.current)}</td></tr>`).join(\'\')}</tbody></table>\n          ${d.progress.length > 15 ? `<div style="font-size:10px;color:var(--muted);margin-top:4px;">Showing last 15 of ${d.progress.length} progress checkpoints.</div>` : \'\'}` : \'\'}\n      </div>\n    </div>`;\n  });\n\n  return html;\n}\n\n// ---------- SCRAPE VIEW ----------\nconst CAT_LABELS = {\n  junk_title: "Junk title (silent 404s)",\n  duplicate: "Duplicate content",\n  empty_text: "Empty page text",\n  auth_utility: "Auth or utility page",\n  http_404: "HTTP 404",\n  http_403: "HTTP 403",\n  http_401: "HTTP 401",\n  http_503: "HTTP 503",\n  network: "Network error (DNS / timeout)",\n  other: "Other",\n};\n\n// Categories that represent the filter doing its job vs real fetch failures\nconst FILTER_CATS = new Set([\'junk_title\', \'duplicate\', \'empty_text\', \'auth_utility\']);\nconst FAILURE_CATS = new Set([\'http_404\', \'http_403\', \'http_401\', \'http_400\', \'http_500\', \'http_503\', \'network\']);\n\nfunction classifyOutcome(category) {\n  if (FILTER_CATS.has(category)) return \'filtered\';\n  if (FAILURE_CATS.has(category)) return \'failed\';\n  return \'other\';\n}\n\nfunction bucketDomain(d) {\n  let filtered = 0, failed = 0, other = 0;\n  d.error_samples.forEach(s => {\n    const o = classifyOutcome(s.category);\n    if (o === \'filtered\') filtered++;\n    else if (o === \'failed\') failed++;\n    else other++;\n  });\n  return { filtered, failed, other };\n}\n\nfunction renderScrape(data) {\n  const t = data.totals;\n\n  // Recompute totals using the three-bucket model\n  let totalFiltered = 0, totalFailed = 0, totalOther = 0;\n  data.domains.forEach(d => {\n    const b = bucketDomain(d);\n    totalFiltered += b.filtered;\n    totalFailed += b.failed;\n    totalOther += b.other;\n  });\n  // Effective success rate: of pages we actually wanted to read, how many gave us text?\n  const fetchable = t.pages_scraped + totalFailed;\n  const effective = fetchable > 0 ? Math.round(t.pages_scraped / fetchable * 100) : 0;\n\n  let html = renderKPIs([\n    { label: "Pages scraped", value: fmt(t.pages_scraped), sub: "usable text extracted", tone: \'good\' },\n    { label: "Filtered out", value: fmt(totalFiltered), sub: "scraper correctly skipped", tone: \'\' },\n    { label: "Fetch failures", value: fmt(totalFailed), sub: "HTTP errors and network", tone: totalFailed > 500 ? \'bad\' : \'warn\' },\n    { label: "Effective rate", value: effective + "%", sub: "scraped / fetchable", tone: effective > 70 ? \'good\' : effective > 40 ? \'warn\' : \'bad\' },\n  ]);\n\n  // Filter outcomes (good catches)\n  const cats = data.error_categories || {};\n  const filterEntries = Object.entries(cats).filter(([c]) => FILTER_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n  const failureEntries = Object.entries(cats).filter(([c]) => FAILURE_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n  const otherEntries = Object.entries(cats).filter(([c]) => !FILTER_CATS.has(c) && !FAILURE_CATS.has(c)).sort((a, b) => b[1] - a[1]);\n\n  if (filterEntries.length > 0) {\n    const max = Math.max(...filterEntries.map(e => e[1]), 1);\n    html += `<h2>Filter activity <span class="small">${fmt(totalFiltered)} pages correctly skipped</span></h2>`;\n    html += renderBars(\n      filterEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'ok\'\n    );\n  }\n\n  if (failureEntries.length > 0) {\n    const max = Math.max(...failureEntries.map(e => e[1]), 1);\n    html += `<h2>Fetch failures <span class="small">${fmt(totalFailed)} pages the scraper could not read</span></h2>`;\n    html += renderBars(\n      failureEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'error\'\n    );\n  }\n\n  if (otherEntries.length > 0) {\n    const max = Math.max(...otherEntries.map(e => e[1]), 1);\n    html += `<h2>Other <span class="small">uncategorized</span></h2>`;\n    html += renderBars(\n      otherEntries.map(([cat, n]) => ({ label: CAT_LABELS[cat] || cat, value: n, cat })),\n      max,\n      () => \'\'\n    );\n  }\n\n  // Per-domain\n  html += `<h2>By Domain</h2>`;\n  data.domains.forEach((d, idx) => {\n    const b = bucketDomain(d);\n    const fetchableD = d.scraped + b.failed;\n    const effPct = fetchableD > 0 ? Math.round(d.scraped / fetchableD * 100) : 0;\n    html += `<div class="domain-card">\n      <div class="domain-head">\n        <div class="domain-name">${escapeHTML(d.name)}</div>\n        <div class="domain-stats">\n          <span>Pages: <span class="num">${fmt(d.page_count)}</span></span>\n          <span>Scraped: <span class="num good">${fmt(d.scraped)}</span></span>\n          <span>Filtered: <span class="num">${fmt(b.filtered)}</span></span>\n          <span>Failed: <span class="num ${b.failed > 0 ? \'bad\' : \'\'}">${fmt(b.failed)}</span></span>\n          ${fetchableD > 0 ? `<span>Effective: <span class="num ${effPct > 70 ? \'good\' : effPct > 40 ? \'warn\' : \'bad\'}">${effPct}%</span></span>` : \'\'}\n        </div>\n      </div>\n      ${d.error_samples.length > 0 ? `<button class="detail-toggle" onclick="document.getElementById(\'det-${idx}\').classList.toggle(\'open\')">Toggle ${d.error_samples.length} error sample${d.error_samples.length === 1 ? \'\' : \'s\'}</button>\n      <div id="det-${idx}" class="detail-body">\n        <table class="error-table">\n          <thead><tr><th class="cat-cell">Category</th><th>URL</th><th>Reason</th></tr></thead>\n          <tbody>${d.error_samples.map(s => `<tr>\n            <td class="cat-cell"><span class="cat-pill cat-${escapeHTML(s.category)}">${escapeHTML(s.category)}</span></td>\n            <td><a href="${escapeHTML(s.url)}" target="_blank" rel="noopener" style="color:var(--accent);text-decoration:none;">${escapeHTML(s.url)}</a></td>\n            <td>${escapeHTML(s.reason.length > 100 ? s.reason.slice(0, 100) + \'...\' : s.reason)}</td>\n          </tr>`).join(\'\')}</tbody>\n        </table>\n      </div>` : \'\'}\n    </div>`;\n  });\n\n  // Search panel\n  html += `<h2>Search Errors <span class="small">across all domains</span></h2>\n    <div class="search-section">\n      <input type="text" class="search" id="search" placeholder="Search by URL or reason...">\n      <div class="search-results" id="search-results"></div>\n    </div>`;\n  return html;\n}\n\n// ---------- INIT ----------\ndocument.getElementById(\'content\').innerHTML = VIEW_TYPE === \'map\' ? renderMap(DATA) : renderScrape(DATA);\ndocument.getElementById(\'run-date\').textContent = new Date().toLocaleDateString(\'en-US\', { year: \'numeric\', month: \'long\', day: \'numeric\' });\ndocument.getElementById(\'gen-date\').textContent = new Date().toLocaleString();\n\n// Wire up search if present\nconst searchEl = document.getElementById(\'search\');\nif (searchEl && VIEW_TYPE === \'scrape\') {\n  const allErrors = [];\n  DATA.domains.forEach(d => {\n    d.error_samples.forEach(s => allErrors.push({ ...s, domain: d.name }));\n  });\n  const resultsEl = document.getElementById(\'search-results\');\n  function updateSearch() {\n    const q = searchEl.value.trim().toLowerCase();\n    if (!q) { resultsEl.innerHTML = `<div style="color:var(--muted);font-style:italic;">Type to search ${allErrors.length.toLocaleString()} error entries...</div>`; return; }\n    const hits = allErrors.filter(e =>\n      e.url.toLowerCase().includes(q) || e.reason.toLowerCase().includes(q) || e.category.includes(q) || e.domain.toLowerCase().includes(q)\n    ).slice(0, 200);\n    resultsEl.innerHTML = hits.length === 0\n      ? `<div style="color:var(--muted);font-style:italic;">No matches.</div>`\n      : `<div style="color:var(--muted);margin-bottom:8px;">${hits.length}${hits.length === 200 ? \'+\' : \'\'} matches</div>` +\n        hits.map(h => `<div class="hit">\n          <span class="hit-cat">[${escapeHTML(h.category)}]</span>\n          <a href="${escapeHTML(h.url)}" target="_blank" rel="noopener">${escapeHTML(h.url)}</a>\n          <div style="color:var(--ink-soft);margin-top:2px;font-size:10px;">${escapeHTML(h.reason.length > 150 ? h.reason.slice(0, 150) + \'...\' : h.reason)}</div>\n        </div>`).join(\'\');\n  }\n  searchEl.addEventListener(\'input\', updateSearch);\n  updateSearch();\n}\n</script>\n</body>\n</html>\n'
 
@@ -0,0 +1,335 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+# Starting spacing between request starts to one host, before the host has
+# shown how fast it is.
+DEFAULT_INTERVAL_S = 0.3
+# Spacing never adapts below this (at most 10 request starts per second to
+# one host, however fast it answers) or above MAX_INTERVAL_S. A robots.txt
+# Crawl-delay raises the floor for its host; a scheduler started with a
+# shorter interval (e.g. delay=0 against a local test site) uses that as its
+# floor instead.
+MIN_INTERVAL_S = 0.1
+MAX_INTERVAL_S = 30.0
+# AIMD on the spacing: every normal response shaves INTERVAL_STEP_S off it,
+# down to the host's smoothed latency / TARGET_CONCURRENCY (and never below
+# MIN_INTERVAL_S), so on average a host has at most that many of our
+# requests open at once;
+# a throttle status, a network error or an unusually slow response multiplies
+# it by BACKOFF_FACTOR (to at least BACKOFF_MIN_S).
+INTERVAL_STEP_S = 0.05
+TARGET_CONCURRENCY = 2.0
+BACKOFF_FACTOR = 2.0
+BACKOFF_MIN_S = 0.25
+# A response is slow when it takes SLOW_FACTOR times the host's smoothed
+# latency and at least SLOW_MIN_S.
+SLOW_FACTOR = 3.0
+SLOW_MIN_S = 1.0
+LATENCY_ALPHA = 0.2
+THROTTLE_STATUSES = {429, 503}
+# Retry-After is honoured up to this many seconds.
+MAX_RETRY_AFTER_S = 120.0
+
+# robots.txt is cached per origin for ROBOTS_TTL_S; when it can't be read
+# (network error or 5xx) the origin is treated as unrestricted and asked
+# again after ROBOTS_RETRY_S.
+ROBOTS_TTL_S = 24 * 3600.0
+ROBOTS_RETRY_S = 300.0
+ROBOTS_TIMEOUT_S = 10
+
+# Caps requests in flight through shared_scheduler() across all hosts
+# (0 = no cap). scrape_all.py sets it for the worker it starts.
+MAX_FETCHES_ENV = "LPBD_MAX_FETCHES"
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+# Seconds to wait from a Retry-After header (delta-seconds or HTTP date).
+def _retry_after_s(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER_S)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if moment is None:
+        return 0.0
+    return max(0.0, min(moment.timestamp() - time.time(), MAX_RETRY_AFTER_S))
+
+
+# One robots.txt: the standard library parser for Allow/Disallow, plus
+# Crawl-delay read here, because RobotFileParser ignores fractional values
+# like "Crawl-delay: 0.5", and the Sitemap: URLs it lists.
+class RobotsRules:
+    def __init__(self, text: str) -> None:
+        lines = text.splitlines()
+        self.parser = RobotFileParser()
+        self.parser.parse(lines)
+        self._delays: List[Tuple[List[str], float]] = []   # (user agents, delay) per group
+        self.sitemaps: List[str] = []
+        agents: List[str] = []
+        in_agents = False
+        for line in lines:
+            field, _, value = line.split("#", 1)[0].partition(":")
+            field = field.strip().lower()
+            value = value.strip()
+            if field == "user-agent":
+                if not in_agents:
+                    agents = []
+                agents.append(value.lower())
+                in_agents = True
+                continue
+            in_agents = False
+            if field == "sitemap" and value:
+                self.sitemaps.append(value)
+                continue
+            if field == "crawl-delay" and agents:
+                try:
+                    self._delays.append((agents, float(value)))
+                except ValueError:
+                    pass
+
+    def can_fetch(self, agent: str, url: str) -> bool:
+        return self.parser.can_fetch(agent, url)
+
+    # Seconds between requests asked of `agent` (its own group, else "*"),
+    # from Crawl-delay or Request-rate; None if neither is given. A group is
+    # ours when its user-agent's product token equals ours, so a short name
+    # like "bot" doesn't claim every crawler with "bot" in its name.
+    def crawl_delay(self, agent: str) -> Optional[float]:
+        token = agent.split("/")[0].strip().lower()
+        fallback = None
+        for agents, delay in self._delays:
+            if any(name != "*" and name.split("/")[0].strip() == token for name in agents):
+                return delay
+            if "*" in agents and fallback is None:
+                fallback = delay
+        if fallback is not None:
+            return fallback
+        rate = self.parser.request_rate(agent)
+        if rate and rate.requests:
+            return rate.seconds / rate.requests
+        return None
+
+
+# Parsed robots.txt per origin. Each origin is fetched once per ROBOTS_TTL_S
+# by whichever thread asks first; other threads asking about the same origin
+# wait for that fetch instead of repeating it. A missing robots.txt (4xx)
+# allows everything, as does one that can't be read right now.
+class RobotsCache:
+    def __init__(self, ttl_s: float = ROBOTS_TTL_S) -> None:
+        self.ttl_s = ttl_s
+        self._entries: Dict[str, Tuple[Optional[RobotsRules], float]] = {}
+        self._origin_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    # The origin's rules, or None when it has no (readable) robots.txt.
+    def rules(self, url: str, session: requests.Session) -> Optional[RobotsRules]:
+        origin = _origin(url)
+        entry = self._entries.get(origin)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        with self._lock:
+            origin_lock = self._origin_locks.setdefault(origin, threading.Lock())
+        with origin_lock:
+            entry = self._entries.get(origin)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            rules, ttl_s = self._fetch(origin, session)
+            self._entries[origin] = (rules, time.monotonic() + ttl_s)
+            return rules
+
+    def _fetch(self, origin: str, session: requests.Session) -> Tuple[Optional[RobotsRules], float]:
+        try:
+            response = session.get(f"{origin}/robots.txt", timeout=ROBOTS_TIMEOUT_S)
+        except requests.RequestException:
+            return None, ROBOTS_RETRY_S
+        if response.status_code >= 500:
+            return None, ROBOTS_RETRY_S
+        if not response.ok:
+            return None, self.ttl_s
+        return RobotsRules(response.text), self.ttl_s
+
+
+# Per-host pacing state; only touched under HostScheduler's lock.
+class _HostPace:
+    __slots__ = ("interval_s", "floor_s", "next_at", "latency_s")
+
+    def __init__(self, interval_s: float, floor_s: float) -> None:
+        self.interval_s = interval_s
+        self.floor_s = floor_s
+        self.next_at = 0.0
+        self.latency_s: Optional[float] = None
+
+
+# Politeness for every fetch path: the mapper's crawl, the scrape worker and
+# realtime single-page lookups. Per host it keeps the spacing between request
+# starts and adapts it AIMD-style from what the host reports back through
+# record(): normal responses shorten it step by step towards the host's
+# latency / TARGET_CONCURRENCY (but no closer than min_interval_s), so a
+# fast host is crawled faster and a slow one gets fewer requests, while 429/503, network
+# errors and latency spikes double it, and Retry-After holds the host off for that long. The
+# spacing never goes below the host's robots.txt Crawl-delay, and allowed()
+# answers from the cached robots rules. Thread-safe.
+# Blocking callers use wait() (or get(), which also records the outcome);
+# the mapper's frontier, which never blocks, uses ready_at() and reserve().
+# With max_in_flight, get() also keeps at most that many requests open at
+# once across every host, e.g. while several domains are scraped side by side.
+class HostScheduler:
+    def __init__(
+        self,
+        interval_s: float = DEFAULT_INTERVAL_S,
+        min_interval_s: float = MIN_INTERVAL_S,
+        max_interval_s: float = MAX_INTERVAL_S,
+        robots: Optional[RobotsCache] = None,
+        max_in_flight: int = 0,
+    ) -> None:
+        self.interval_s = max(0.0, interval_s)
+        self.min_interval_s = min(max(0.0, min_interval_s), self.interval_s)
+        self.max_interval_s = max(self.interval_s, max_interval_s)
+        self.robots = robots or RobotsCache()
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight > 0 else None
+        self._hosts: Dict[str, _HostPace] = {}
+        self._lock = threading.Lock()
+
+    def _pace(self, host: str) -> _HostPace:
+        pace = self._hosts.get(host)
+        if pace is None:
+            pace = _HostPace(self.interval_s, self.min_interval_s)
+            self._hosts[host] = pace
+        return pace
+
+    # True if robots.txt lets `session`'s User-Agent fetch url. Also picks up
+    # the origin's Crawl-delay as the host's minimum spacing.
+    def allowed(self, url: str, session: requests.Session) -> bool:
+        rules = self.robots.rules(url, session)
+        if rules is None:
+            return True
+        agent = session.headers.get("User-Agent") or "*"
+        delay = rules.crawl_delay(agent)
+        if delay:
+            with self._lock:
+                pace = self._pace(_host(url))
+                pace.floor_s = min(max(float(delay), self.min_interval_s), self.max_interval_s)
+                pace.interval_s = max(pace.interval_s, pace.floor_s)
+        return rules.can_fetch(agent, url)
+
+    # Current spacing for url's host, in seconds.
+    def interval(self, url: str) -> float:
+        with self._lock:
+            return self._pace(_host(url)).interval_s
+
+    # Monotonic time at which `host` may receive its next request.
+    def ready_at(self, host: str) -> float:
+        with self._lock:
+            pace = self._hosts.get(host)
+            return pace.next_at if pace else 0.0
+
+    # Books a request start to `host` at `now` (monotonic).
+    def reserve(self, host: str, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            pace = self._pace(host)
+            pace.next_at = max(pace.next_at, now + pace.interval_s)
+
+    # Blocks until url's host may receive another request and books it.
+    # min_interval_s lets a caller ask for wider spacing than the host's own.
+    def wait(self, url: str, min_interval_s: float = 0.0) -> None:
+        with self._lock:
+            pace = self._pace(_host(url))
+            now = time.monotonic()
+            start = max(now, pace.next_at)
+            pace.next_at = start + max(pace.interval_s, min_interval_s)
+        if start > now:
+            time.sleep(start - now)
+
+    # Feeds one request's outcome back: response is None when the request
+    # failed outright (timeout, connection error).
+    def record(self, url: str, response: Optional[requests.Response], latency_s: float) -> None:
+        with self._lock:
+            pace = self._pace(_host(url))
+            failed = response is None or response.status_code in THROTTLE_STATUSES
+            slow = (
+                pace.latency_s is not None
+                and latency_s >= SLOW_MIN_S
+                and latency_s > SLOW_FACTOR * pace.latency_s
+            )
+            if not failed:
+                pace.latency_s = latency_s if pace.latency_s is None else (
+                    LATENCY_ALPHA * latency_s + (1 - LATENCY_ALPHA) * pace.latency_s
+                )
+            if failed or slow:
+                pace.interval_s = min(
+                    self.max_interval_s,
+                    max(pace.interval_s * BACKOFF_FACTOR, BACKOFF_MIN_S, pace.floor_s),
+                )
+                if response is not None:
+                    hold_s = _retry_after_s(response.headers.get("Retry-After"))
+                    if hold_s:
+                        pace.next_at = max(pace.next_at, time.monotonic() + hold_s)
+            else:
+                pace.interval_s = max(
+                    pace.floor_s,
+                    min(pace.latency_s / TARGET_CONCURRENCY, self.max_interval_s),
+                    pace.interval_s - INTERVAL_STEP_S,
+                )
+
+    # session.get() paced by wait() and recorded. A 429/503 is retried up to
+    # `retries` times, after the backoff (and any Retry-After) it caused.
+    # Raises requests.RequestException like session.get().
+    def get(
+        self,
+        session: requests.Session,
+        url: str,
+        min_interval_s: float = 0.0,
+        retries: int = 1,
+        **kwargs,
+    ) -> requests.Response:
+        for attempt in range(retries + 1):
+            self.wait(url, min_interval_s)
+            with self._slots or nullcontext():
+                started = time.monotonic()
+                try:
+                    response = session.get(url, **kwargs)
+                except requests.RequestException:
+                    self.record(url, None, time.monotonic() - started)
+                    raise
+            self.record(url, response, time.monotonic() - started)
+            if response.status_code not in THROTTLE_STATUSES or attempt == retries:
+                return response
+            response.close()
+        return response
+
+
+_shared: Optional[HostScheduler] = None
+_shared_lock = threading.Lock()
+
+
+# The process-wide scheduler, so the worker's /scrape batches and realtime
+# lookups share robots rules, what they've learned about each host and the
+# LPBD_MAX_FETCHES cap.
+def shared_scheduler() -> HostScheduler:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            max_in_flight = int(os.getenv(MAX_FETCHES_ENV, "0") or 0)
+            _shared = HostScheduler(max_in_flight=max_in_flight)
+        return _shared
@@ -1,16 +1,32 @@
 import sqlite3
+import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from .state_db import get_worker_db_path
 
 DB_PATH = get_worker_db_path()
 
+# SQLite's default host-parameter limit is 999 on older builds; stay under it.
+_QUERY_CHUNK = 500
 
-# Open the shared SQLite database and ensure metadata table exists.
+_COLUMNS = "domain, url, pack_hash, etag, last_modified, text_hash, last_checked_at, updated_at"
+
+_local = threading.local()
+
+
+# Return this thread's connection to the shared SQLite database, opening it
+# (WAL mode, metadata table ensured) on first use. sqlite3 connections can't
+# be shared across threads by default, so each thread keeps its own.
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS metadata_store (
@@ -27,25 +43,35 @@ def _connect() -> sqlite3.Connection:
         """
     )
     conn.commit()
+    _local.conn = conn
     return conn
 
 
 # Read stored version metadata for a specific page.
 def get_page_metadata(domain: str, url: str) -> Optional[Dict[str, Any]]:
-    with _connect() as conn:
-        row = conn.execute(
-            """
-            SELECT domain, url, pack_hash, etag, last_modified, text_hash, last_checked_at, updated_at
-            FROM metadata_store
-            WHERE domain = ? AND url = ?
-            """,
-            (domain, url),
-        ).fetchone()
+    return get_pages_metadata(domain, [url]).get(url)
 
-    if not row:
-        return None
 
-    return dict(row)
+# Read stored version metadata for many pages of one domain in as few queries
+# as possible. Returns {url: metadata}; urls with no stored row are absent.
+def get_pages_metadata(domain: str, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    unique_urls = list(dict.fromkeys(urls))
+    conn = _connect()
+    found: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(unique_urls), _QUERY_CHUNK):
+        chunk = unique_urls[start:start + _QUERY_CHUNK]
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"""
+            SELECT {_COLUMNS}
+            FROM metadata_store
+            WHERE domain = ? AND url IN ({placeholders})
+            """,
+            (domain, *chunk),
+        ).fetchall()
+        for row in rows:
+            found[row["url"]] = dict(row)
+    return found
 
 
 # Insert or update the latest validators/hash info for a page.
@@ -59,13 +85,34 @@ def upsert_page_metadata(
     text_hash: Optional[str],
     last_checked_at: float,
 ) -> None:
+    upsert_pages_metadata(
+        domain,
+        [
+            {
+                "url": url,
+                "pack_hash": pack_hash,
+                "etag": etag,
+                "last_modified": last_modified,
+                "text_hash": text_hash,
+                "last_checked_at": last_checked_at,
+            }
+        ],
+    )
+
+
+# Insert or update validators/hash info for many pages in one transaction.
+# Each entry is a dict with url, pack_hash, etag, last_modified, text_hash
+# and last_checked_at.
+def upsert_pages_metadata(domain: str, entries: List[Dict[str, Any]]) -> None:
+    if not entries:
+        return
     now = time.time()
-    with _connect() as conn:
-        conn.execute(
-            """
-            INSERT INTO metadata_store (
-                domain, url, pack_hash, etag, last_modified, text_hash, last_checked_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            f"""
+            INSERT INTO metadata_store ({_COLUMNS})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(domain, url) DO UPDATE SET
                 pack_hash = excluded.pack_hash,
                 etag = excluded.etag,
@@ -74,6 +121,17 @@ def upsert_page_metadata(
                 last_checked_at = excluded.last_checked_at,
                 updated_at = excluded.updated_at
             """,
-            (domain, url, pack_hash, etag, last_modified, text_hash, last_checked_at, now),
+            [
+                (
+                    domain,
+                    entry["url"],
+                    entry.get("pack_hash"),
+                    entry.get("etag"),
+                    entry.get("last_modified"),
+                    entry.get("text_hash"),
+                    entry.get("last_checked_at"),
+                    now,
+                )
+                for entry in entries
+            ],
         )
-        conn.commit()
@@ -1,126 +1,312 @@
 import json
+import os
 import sqlite3
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from .state_db import get_worker_db_path
 
 DB_PATH = get_worker_db_path()
 
+# How long a stored page counts as fresh after it was last fetched or
+# revalidated with a 304. Each page ages on its own clock.
+PAGE_TTL_S = float(os.getenv("LPBD_PAGE_TTL_HOURS", "168")) * 3600
 
-# Open the shared SQLite database and ensure the pack cache table exists.
+# SQLite's default host-parameter limit is 999 on older builds; stay under it.
+_QUERY_CHUNK = 500
+
+_local = threading.local()
+# The schema (and dropping the legacy pack_store table) is a write that takes
+# the database lock, so it runs once per process, not on every new connection.
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+# Return this thread's connection to the shared SQLite database, creating the
+# page store tables the first time this process connects. Page text lives in
+# page_content keyed by text_hash (zlib-compressed, shared by identical
+# pages); page_store maps (domain, url) to its current text_hash, validators
+# and freshness; and pack_manifest records which urls made up a domain's last
+# pack so packs are assembled from page rows only when requested.
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS pack_store (
-            domain TEXT PRIMARY KEY,
-            pack_json TEXT NOT NULL,
-            pack_hash TEXT NOT NULL,
-            fetched_at REAL NOT NULL,
-            expires_at REAL NOT NULL
-        )
-        """
-    )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS domain_lock (
-            domain TEXT PRIMARY KEY,
-            locked_at REAL NOT NULL
-        )
-        """
-    )
-    conn.commit()
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _schema_lock:
+        if not _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # The old whole-domain pack_json blobs were a weekly cache; drop them.
+            conn.execute("DROP TABLE IF EXISTS pack_store")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS page_content (
+                    text_hash TEXT PRIMARY KEY,
+                    content BLOB NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS page_store (
+                    domain TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    checked_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (domain, url)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS page_store_text_hash ON page_store (text_hash)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS page_store_expires_at ON page_store (expires_at)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pack_manifest (
+                    domain TEXT PRIMARY KEY,
+                    urls_json TEXT NOT NULL,
+                    pack_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS domain_lock (
+                    domain TEXT PRIMARY KEY,
+                    locked_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            _schema_ready = True
+    _local.conn = conn
     return conn
 
 
-# Compute the next Sunday 11:59:59 PM timestamp for weekly pack expiration.
-def next_sunday_235959_timestamp(now_ts: float) -> float:
-    now_dt = datetime.fromtimestamp(now_ts)
-    days_until_sunday = 6 - now_dt.weekday()
-    sunday = (now_dt + timedelta(days=days_until_sunday)).replace(
-        hour=23, minute=59, second=59, microsecond=0
-    )
-    if sunday.timestamp() < now_ts:
-        sunday = sunday + timedelta(days=7)
-    return sunday.timestamp()
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
 
+def _decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
 
-# Remove expired weekly packs before handling new requests.
+
+# Remove pages that have been expired for a further PAGE_TTL_S, then any
+# stored text no page refers to any more. Recently expired pages are kept so
+# a 304 on revalidation can still be answered from the local copy. Manifests
+# are left alone: a manifest with an expired page stops producing a cached pack.
 def purge_expired_packs(now_ts: Optional[float] = None) -> None:
     current = now_ts or time.time()
-    with _connect() as conn:
-        conn.execute("DELETE FROM pack_store WHERE expires_at < ?", (current,))
-        conn.commit()
+    conn = _connect()
+    with conn:
+        deleted = conn.execute(
+            "DELETE FROM page_store WHERE expires_at < ?", (current - PAGE_TTL_S,)
+        ).rowcount
+        if deleted:
+            conn.execute(
+                """
+                DELETE FROM page_content
+                WHERE text_hash NOT IN (SELECT text_hash FROM page_store)
+                """
+            )
+
 
+# Read stored pages for the given urls of one domain, text included.
+# Returns {url: page}; urls with no stored copy are absent. Each page has
+# url, title, normalized_text, text_hash, etag, last_modified, fetched_at,
+# checked_at and expires_at.
+def get_pages(domain: str, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    return {page["url"]: page for page in iter_pages(domain, urls)}
 
-# Load a cached domain pack if it is still present in the shared store.
-def get_pack(domain: str) -> Optional[Dict[str, Any]]:
-    with _connect() as conn:
-        row = conn.execute(
-            "SELECT domain, pack_json, pack_hash, fetched_at, expires_at FROM pack_store WHERE domain = ?",
-            (domain,),
-        ).fetchone()
 
+# Yield stored pages one at a time so callers never hold more decompressed
+# text than they need.
+def iter_pages(domain: str, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    unique_urls = list(dict.fromkeys(urls))
+    conn = _connect()
+    for start in range(0, len(unique_urls), _QUERY_CHUNK):
+        chunk = unique_urls[start:start + _QUERY_CHUNK]
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"""
+            SELECT p.url, p.title, p.text_hash, p.etag, p.last_modified,
+                   p.fetched_at, p.checked_at, p.expires_at, c.content
+            FROM page_store p
+            JOIN page_content c ON c.text_hash = p.text_hash
+            WHERE p.domain = ? AND p.url IN ({placeholders})
+            """,
+            (domain, *chunk),
+        ).fetchall()
+        for row in rows:
+            page = dict(row)
+            page["normalized_text"] = _decompress(page.pop("content"))
+            yield page
+
+
+# Store fetched or revalidated pages. Each page dict needs url, title,
+# normalized_text and text_hash, plus etag, last_modified and fetched_at.
+# checked_at restarts the page's freshness window. Text is compressed once
+# per distinct text_hash and shared across urls and domains.
+def save_pages(domain: str, pages: List[Dict[str, Any]], checked_at: float) -> None:
+    if not pages:
+        return
+    conn = _connect()
+    with conn:
+        known = set()
+        new_hashes = list({p["text_hash"] for p in pages})
+        for start in range(0, len(new_hashes), _QUERY_CHUNK):
+            chunk = new_hashes[start:start + _QUERY_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            known.update(
+                row[0]
+                for row in conn.execute(
+                    f"SELECT text_hash FROM page_content WHERE text_hash IN ({placeholders})",
+                    chunk,
+                )
+            )
+
+        contents = {}
+        for page in pages:
+            text_hash = page["text_hash"]
+            if text_hash not in known and text_hash not in contents:
+                blob = _compress(page["normalized_text"])
+                contents[text_hash] = (text_hash, blob, len(blob))
+        conn.executemany(
+            "INSERT OR IGNORE INTO page_content (text_hash, content, size) VALUES (?, ?, ?)",
+            list(contents.values()),
+        )
+
+        conn.executemany(
+            """
+            INSERT INTO page_store (
+                domain, url, title, text_hash, etag, last_modified,
+                fetched_at, checked_at, expires_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(domain, url) DO UPDATE SET
+                title = excluded.title,
+                text_hash = excluded.text_hash,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                fetched_at = excluded.fetched_at,
+                checked_at = excluded.checked_at,
+                expires_at = excluded.expires_at
+            """,
+            [
+                (
+                    domain,
+                    page["url"],
+                    page.get("title") or "",
+                    page["text_hash"],
+                    page.get("etag"),
+                    page.get("last_modified"),
+                    page.get("fetched_at") or checked_at,
+                    checked_at,
+                    checked_at + PAGE_TTL_S,
+                )
+                for page in pages
+            ],
+        )
+
+
+# Load a domain's last pack, assembled from the page store. Returns None
+# when there is no manifest or any of its pages has expired or gone missing,
+# so one stale page triggers a rebuild rather than serving a partial pack.
+def get_pack(domain: str, now_ts: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    current = now_ts or time.time()
+    conn = _connect()
+    row = conn.execute(
+        "SELECT urls_json, pack_hash, fetched_at FROM pack_manifest WHERE domain = ?",
+        (domain,),
+    ).fetchone()
     if not row:
         return None
 
+    urls = json.loads(row["urls_json"])
+    stored = get_pages(domain, urls)
+    if len(stored) != len(urls) or any(p["expires_at"] < current for p in stored.values()):
+        return None
+
+    pack = [
+        {
+            "url": url,
+            "title": stored[url]["title"],
+            "normalized_text": stored[url]["normalized_text"],
+            "text_hash": stored[url]["text_hash"],
+            "etag": stored[url]["etag"],
+            "last_modified": stored[url]["last_modified"],
+            "fetched_at": stored[url]["fetched_at"],
+        }
+        for url in urls
+    ]
     return {
-        "domain": row["domain"],
-        "pack": json.loads(row["pack_json"]),
+        "domain": domain,
+        "pack": pack,
         "pack_hash": row["pack_hash"],
         "fetched_at": row["fetched_at"],
-        "expires_at": row["expires_at"],
+        "expires_at": min((p["expires_at"] for p in stored.values()), default=current),
     }
 
 
-# Upsert the current weekly pack snapshot for a domain.
+# Record which stored pages make up the domain's current pack. The pages
+# themselves must already be saved with save_pages().
 def save_pack(
     domain: str,
     pack_pages: List[Dict[str, Any]],
     pack_hash: str,
     fetched_at: float,
-    expires_at: float,
 ) -> None:
-    payload = json.dumps(pack_pages, ensure_ascii=True)
-    with _connect() as conn:
+    urls = [page["url"] for page in pack_pages]
+    conn = _connect()
+    with conn:
         conn.execute(
             """
-            INSERT INTO pack_store (domain, pack_json, pack_hash, fetched_at, expires_at)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO pack_manifest (domain, urls_json, pack_hash, fetched_at)
+            VALUES (?, ?, ?, ?)
             ON CONFLICT(domain) DO UPDATE SET
-                pack_json = excluded.pack_json,
+                urls_json = excluded.urls_json,
                 pack_hash = excluded.pack_hash,
-                fetched_at = excluded.fetched_at,
-                expires_at = excluded.expires_at
+                fetched_at = excluded.fetched_at
             """,
-            (domain, payload, pack_hash, fetched_at, expires_at),
+            (domain, json.dumps(urls, ensure_ascii=True), pack_hash, fetched_at),
         )
-        conn.commit()
 
 
 # Acquire a short-lived domain rebuild lock to avoid duplicate pack rebuilds.
 def acquire_domain_lock(domain: str, timeout_s: float = 15.0, poll_ms: int = 100) -> bool:
     deadline = time.time() + timeout_s
+    conn = _connect()
     while time.time() < deadline:
-        with _connect() as conn:
-            try:
+        try:
+            with conn:
                 conn.execute(
                     "INSERT INTO domain_lock (domain, locked_at) VALUES (?, ?)",
                     (domain, time.time()),
                 )
-                conn.commit()
-                return True
-            except sqlite3.IntegrityError:
-                pass
+            return True
+        except sqlite3.IntegrityError:
+            pass
         time.sleep(max(1, poll_ms) / 1000.0)
     return False
 
 
 # Release the domain rebuild lock after rebuilding or on failure.
 def release_domain_lock(domain: str) -> None:
-    with _connect() as conn:
+    conn = _connect()
+    with conn:
         conn.execute("DELETE FROM domain_lock WHERE domain = ?", (domain,))
-        conn.commit()
@@ -62,6 +62,8 @@ def scrape(req: ScrapeRequest) -> ScrapeResponse:
     timeout_s = int(req.options.get("timeout_s", 30) or 30)
     force_refresh = bool(req.options.get("force_refresh", False))
     client_has_pack = bool(req.options.get("client_has_pack", False))
+    fetch_workers = int(req.options.get("fetch_workers", 4) or 4)
+    reuse_within_s = float(req.options.get("reuse_within_s", 0) or 0)
 
     cache_hit, pack_pages, unchanged_urls, errors = get_or_build_pack(
         req.domain,
@@ -70,6 +72,8 @@ def scrape(req: ScrapeRequest) -> ScrapeResponse:
         timeout_s=timeout_s,
         force_refresh=force_refresh,
         client_has_pack=client_has_pack,
+        max_workers=fetch_workers,
+        reuse_within_s=reuse_within_s,
     )
 
     return ScrapeResponse(
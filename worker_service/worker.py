@@ -2,21 +2,26 @@ import hashlib
 import json
 import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Tuple
 
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
 
-from .metadata_store import get_page_metadata, upsert_page_metadata
+from .metadata_store import get_pages_metadata, upsert_pages_metadata
 from .pack_store import (
     acquire_domain_lock,
     get_pack,
-    next_sunday_235959_timestamp,
+    get_pages,
     purge_expired_packs,
     release_domain_lock,
     save_pack,
+    save_pages,
 )
+from .host_scheduler import HostScheduler, shared_scheduler
 
 
 # Site-chrome class/id patterns. If any token in a class list or the id
@@ -27,51 +32,114 @@ _SITE_CHROME_PATTERNS = [
     "global-header", "masthead",
 ]
 
+_SITE_CHROME_PATTERN = re.compile("|".join(re.escape(p) for p in _SITE_CHROME_PATTERNS))
 
-# Normalize HTML into stable plain text so hash comparisons are reliable.
-# Strips site chrome (nav, footer, sidebar, etc.) at the DOM level before
-# extracting text so downstream stages get clean content.
-def _normalize_text(html_text: str) -> str:
-    soup = BeautifulSoup(html_text, "html.parser")
+# Tags that never contain useful content.
+_STRIP_TAGS = {"script", "style", "noscript", "nav", "footer", "aside"}
 
-    # Remove tags that never contain useful content
-    for tag in soup(["script", "style", "noscript", "nav", "footer", "aside"]):
-        tag.decompose()
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
 
-    # Remove elements whose class or id matches site-chrome patterns
-    for el in soup.find_all(True):
-        # Skip headings so we never accidentally strip page titles
-        if el.name in ("h1", "h2", "h3", "h4", "h5", "h6"):
-            continue
+_META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_XML_DECLARATION_PATTERN = re.compile(r"^\s*<\?xml[^>]*\?>")
 
-        attrs = getattr(el, "attrs", None)
-        if not isinstance(attrs, dict):
+
+# Decode a response body without requests' charset auto-detection: use the
+# charset from the Content-Type header, then a <meta charset>, then UTF-8,
+# and finally cp1252 with replacement so decoding never fails.
+def _decode_html(content: bytes, content_type: str | None = None) -> str:
+    candidates = []
+    for part in (content_type or "").split(";"):
+        key, _, value = part.strip().partition("=")
+        if key.lower() == "charset" and value:
+            candidates.append(value.strip("\"' "))
+    meta = _META_CHARSET_PATTERN.search(content[:4096])
+    if meta:
+        candidates.append(meta.group(1).decode("ascii", errors="ignore"))
+    candidates.append("utf-8")
+
+    for encoding in candidates:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
             continue
+    return content.decode("cp1252", errors="replace")
+
 
-        cls = attrs.get("class")
-        if cls is not None:
-            if isinstance(cls, str):
-                cls = [cls]
-            cls_lower = " ".join(c.lower() for c in cls)
-            if any(p in cls_lower for p in _SITE_CHROME_PATTERNS):
-                el.decompose()
+# True for elements whose whole subtree is dropped from the page text.
+def _is_site_chrome(el) -> bool:
+    tag = el.tag
+    if tag in _STRIP_TAGS:
+        return True
+    # Skip headings so we never accidentally strip page titles
+    if tag in _HEADING_TAGS:
+        return False
+    cls = el.get("class")
+    if cls and _SITE_CHROME_PATTERN.search(cls.lower()):
+        return True
+    el_id = el.get("id")
+    return bool(el_id and _SITE_CHROME_PATTERN.search(el_id.lower()))
+
+
+# Parse HTML once and return (title, normalized_text).
+# Strips site chrome (nav, footer, sidebar, etc.) at the DOM level before
+# extracting text so downstream stages get clean content, and collapses
+# whitespace so hash comparisons are reliable.
+def _extract_title_and_text(html_text: str) -> Tuple[str, str]:
+    html_text = _XML_DECLARATION_PATTERN.sub("", html_text, count=1)
+    if not html_text.strip():
+        return "", ""
+    try:
+        root = lxml.html.document_fromstring(html_text)
+    except (etree.ParserError, ValueError):
+        return "", ""
+
+    title = ""
+    title_el = root.find(".//title")
+    if title_el is not None and len(title_el) == 0 and title_el.text:
+        title = title_el.text.strip()
+
+    # One walk over the tree: chrome subtrees are skipped as they're entered,
+    # everything else contributes its text and tail.
+    parts = []
+    skipping = None
+    for event, el in etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+        if event in ("comment", "pi"):
+            # Comment/PI text is never page text, but the text after it is.
+            if skipping is None and el.tail:
+                parts.append(el.tail)
+            continue
+        if event == "start":
+            if skipping is not None:
                 continue
+            if _is_site_chrome(el):
+                skipping = el
+            elif el.text:
+                parts.append(el.text)
+            continue
+        if el is skipping:
+            skipping = None
+        if skipping is None and el.tail and el is not root:
+            parts.append(el.tail)
 
-        el_id = attrs.get("id")
-        if el_id is not None:
-            id_lower = el_id.lower()
-            if any(p in id_lower for p in _SITE_CHROME_PATTERNS):
-                el.decompose()
+    return title, " ".join(" ".join(parts).split())
 
-    return " ".join(soup.get_text(" ", strip=True).split())
+
+# One extraction pass for a fetched page: decode, parse, strip chrome,
+# and run the quality check. Returns (title, normalized_text, reject_reason).
+def _extract_page(url: str, content: bytes, content_type: str | None = None) -> Tuple[str, str, str | None]:
+    title, normalized_text = _extract_title_and_text(_decode_html(content, content_type))
+    return title, normalized_text, _content_quality_check(url, title, normalized_text)
+
+
+# Normalize HTML into stable plain text. Kept for callers that only have
+# decoded HTML; fetch paths should use _extract_page on the raw bytes.
+def _normalize_text(html_text: str) -> str:
+    return _extract_title_and_text(html_text)[1]
 
 
 # Pull the page title safely; return empty string when missing.
 def _page_title(html_text: str) -> str:
-    soup = BeautifulSoup(html_text, "html.parser")
-    if soup.title and soup.title.string:
-        return soup.title.string.strip()
-    return ""
+    return _extract_title_and_text(html_text)[0]
 
 
 # Shared SHA-256 helper used for page-level and pack-level fingerprints.
@@ -175,7 +243,88 @@ def _stable_pack_hash(pack_pages: List[Dict[str, Any]]) -> str:
     return _sha256(json.dumps(stable_rows, ensure_ascii=True))
 
 
+# Build an "ok" fetch result from a page held in the local page store.
+def _stored_result(stored: Dict[str, Any], not_modified: bool) -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "not_modified": not_modified,
+        "from_store": True,
+        "title": stored["title"],
+        "normalized_text": stored["normalized_text"],
+        "reject_reason": None,
+        "etag": stored["etag"],
+        "last_modified": stored["last_modified"],
+        "fetched_at": stored["fetched_at"],
+    }
+
+
+# Fetch one page on a worker thread and extract it. Only network and parsing
+# happen here; stores and duplicate checks stay on the calling thread.
+# Requests go through the host scheduler: pages robots.txt disallows are
+# reported as errors, and each host is paced by its own adaptive spacing
+# (never closer than min_interval_s).
+# When the request was conditioned on the stored copy's validators, a 304 is
+# answered from that copy instead of downloading the page again.
+# Returns a dict with status "error", "not_modified" or "ok".
+def _fetch_and_extract(
+    session_for_thread,
+    scheduler: HostScheduler,
+    min_interval_s: float,
+    url: str,
+    headers: Dict[str, str],
+    timeout_s: int,
+    refetch_on_304: bool,
+    stored: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    session = session_for_thread()
+    if not scheduler.allowed(url, session):
+        return {"status": "error", "error": "disallowed by robots.txt"}
+    try:
+        response = scheduler.get(session, url, min_interval_s, headers=headers, timeout=timeout_s)
+    except requests.RequestException as exc:
+        return {"status": "error", "error": str(exc)}
+
+    not_modified = response.status_code == 304
+    if not_modified:
+        if not refetch_on_304:
+            return {"status": "not_modified"}
+        if stored is not None:
+            return _stored_result(stored, not_modified=True)
+        # New clients still need content when no local copy exists.
+        try:
+            response = scheduler.get(session, url, min_interval_s, timeout=timeout_s)
+        except requests.RequestException as exc:
+            return {"status": "error", "not_modified": True, "error": str(exc)}
+
+    if response.status_code >= 400:
+        return {"status": "error", "not_modified": not_modified, "error": f"HTTP {response.status_code}"}
+
+    title, normalized_text, reject_reason = _extract_page(
+        url, response.content, response.headers.get("Content-Type"),
+    )
+    return {
+        "status": "ok",
+        "not_modified": not_modified,
+        "title": title,
+        "normalized_text": normalized_text,
+        "reject_reason": reject_reason,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
 # Return cached pack when valid, otherwise rebuild and refresh stores.
+# Pages are fetched by up to max_workers threads, paced per host by the
+# process-wide host scheduler (robots.txt, Crawl-delay, adaptive backoff);
+# rate_limit_ms, if given, is the closest spacing this request allows. Results are
+# applied in request order, so metadata, duplicate detection and the pack
+# come out the same as a sequential run.
+# Pages already in the local page store are reused per page: a fresh copy is
+# served without touching the network (unless force_refresh), and a stale
+# copy is revalidated with its own validators so a 304 needs no re-download.
+# With force_refresh, reuse_within_s still serves copies fetched or revalidated
+# in the last reuse_within_s seconds from the store, e.g. pages a fused mapper
+# run (map.py --fused) saved moments ago.
 def get_or_build_pack(
     domain: str,
     pages: List[Dict[str, Any]],
@@ -184,131 +333,175 @@ def get_or_build_pack(
     timeout_s: int = 30,
     force_refresh: bool = False,
     client_has_pack: bool = False,
+    max_workers: int = 4,
+    reuse_within_s: float = 0,
 ) -> Tuple[bool, List[Dict[str, Any]], List[str], List[Dict[str, str]]]:
     now = time.time()
     purge_expired_packs(now)
 
-    # Ignore broken global proxy env vars by default (can be re-enabled with LPBD_USE_ENV_PROXY=1).
-    use_env_proxy = os.getenv("LPBD_USE_ENV_PROXY", "").strip().lower() in {"1", "true", "yes"}
-    session = requests.Session()
-    session.trust_env = use_env_proxy
-
     if not force_refresh:
-        cached = get_pack(domain)
+        cached = get_pack(domain, now)
         if cached:
             return True, cached["pack"], [], []
 
     if not acquire_domain_lock(domain):
         return False, [], [], [{"url": domain, "error": "Timed out waiting for domain rebuild lock"}]
 
+    # Ignore broken global proxy env vars by default (can be re-enabled with LPBD_USE_ENV_PROXY=1).
+    use_env_proxy = os.getenv("LPBD_USE_ENV_PROXY", "").strip().lower() in {"1", "true", "yes"}
+    sessions: List[requests.Session] = []
+    sessions_lock = threading.Lock()
+    local = threading.local()
+
+    # requests.Session isn't guaranteed thread-safe, so each fetch thread gets its own.
+    def session_for_thread() -> requests.Session:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.trust_env = use_env_proxy
+            local.session = session
+            with sessions_lock:
+                sessions.append(session)
+        return session
+
+    scheduler = shared_scheduler()
+    min_interval_s = max(0, rate_limit_ms) / 1000.0
     unchanged_urls: List[str] = []
     errors: List[Dict[str, str]] = []
     pack_pages: List[Dict[str, Any]] = []
+    pages_to_store: List[Dict[str, Any]] = []
     seen_hashes_this_run: set = set()
     should_save_pack = not client_has_pack
 
     try:
         # Another request may have rebuilt while we waited for lock.
         if not force_refresh:
-            cached = get_pack(domain)
+            cached = get_pack(domain, now)
             if cached:
                 return True, cached["pack"], [], []
 
-        for idx, page_in in enumerate(pages):
-            url = page_in["url"]
-            if idx > 0 and rate_limit_ms > 0:
-                time.sleep(rate_limit_ms / 1000.0)
-
-            meta = get_page_metadata(domain, url)
-            merged = _merge_validators(meta, page_in)
-            headers = _headers_from_validators(
-                merged.get("etag"),
-                merged.get("last_modified"),
-            )
-
-            try:
-                response = session.get(url, headers=headers, timeout=timeout_s)
-            except requests.RequestException as exc:
-                errors.append({"url": url, "error": str(exc)})
-                continue
-
-            if response.status_code == 304:
-                unchanged_urls.append(url)
-                upsert_page_metadata(
-                    domain,
+        # One query each for the whole batch instead of one connection per url.
+        urls = [page_in["url"] for page_in in pages]
+        stored_meta = get_pages_metadata(domain, urls)
+        stored_pages = get_pages(domain, urls)
+        metadata_updates: List[Dict[str, Any]] = []
+
+        jobs = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for page_in in pages:
+                url = page_in["url"]
+                meta = stored_meta.get(url)
+                merged = _merge_validators(meta, page_in)
+                stored = stored_pages.get(url)
+
+                # Clients without a pack only need content, so the local copy
+                # stands in for the origin while it is fresh.
+                if stored and not client_has_pack:
+                    fresh = stored["expires_at"] >= now and (
+                        not force_refresh or stored["checked_at"] >= now - reuse_within_s
+                    )
+                    if fresh:
+                        jobs.append((url, meta, merged, _stored_result(stored, not_modified=False)))
+                        continue
+                    headers = _headers_from_validators(stored["etag"], stored["last_modified"])
+                else:
+                    stored = None
+                    headers = _headers_from_validators(
+                        merged.get("etag"),
+                        merged.get("last_modified"),
+                    )
+                future = executor.submit(
+                    _fetch_and_extract,
+                    session_for_thread,
+                    scheduler,
+                    min_interval_s,
                     url,
-                    pack_hash=meta.get("pack_hash") if meta else None,
-                    etag=merged.get("etag"),
-                    last_modified=merged.get("last_modified"),
-                    text_hash=merged.get("text_hash"),
-                    last_checked_at=now,
+                    headers,
+                    timeout_s,
+                    not client_has_pack,
+                    stored,
                 )
-                # Existing clients can skip full rebuild when origin confirms unchanged.
-                if client_has_pack:
-                    should_save_pack = False
-                    continue
-                # New clients still need content when shared weekly pack is missing.
-                try:
-                    response = session.get(url, timeout=timeout_s)
-                except requests.RequestException as exc:
-                    errors.append({"url": url, "error": str(exc)})
+                jobs.append((url, meta, merged, future))
+
+            for url, meta, merged, job in jobs:
+                result = job if isinstance(job, dict) else job.result()
+
+                if result.get("not_modified") or result["status"] == "not_modified":
+                    unchanged_urls.append(url)
+                    metadata_updates.append(
+                        {
+                            "url": url,
+                            "pack_hash": meta.get("pack_hash") if meta else None,
+                            "etag": merged.get("etag"),
+                            "last_modified": merged.get("last_modified"),
+                            "text_hash": merged.get("text_hash"),
+                            "last_checked_at": now,
+                        }
+                    )
+                    # Existing clients can skip full rebuild when origin confirms unchanged.
+                    if client_has_pack:
+                        should_save_pack = False
+                        continue
+
+                if result["status"] == "error":
+                    errors.append({"url": url, "error": result["error"]})
                     continue
 
-            if response.status_code >= 400:
-                errors.append({"url": url, "error": f"HTTP {response.status_code}"})
-                continue
-
-            title = _page_title(response.text)
-            normalized_text = _normalize_text(response.text)
-
-            reject_reason = _content_quality_check(url, title, normalized_text)
-            if reject_reason:
-                errors.append({"url": url, "error": reject_reason})
-                continue
+                if result["reject_reason"]:
+                    errors.append({"url": url, "error": result["reject_reason"]})
+                    continue
 
-            text_hash = _sha256(normalized_text)
+                normalized_text = result["normalized_text"]
+                text_hash = _sha256(normalized_text)
 
-            if text_hash in seen_hashes_this_run:
-                errors.append({"url": url, "error": "duplicate content (same hash as earlier page)"})
-                continue
-            seen_hashes_this_run.add(text_hash)
+                if text_hash in seen_hashes_this_run:
+                    errors.append({"url": url, "error": "duplicate content (same hash as earlier page)"})
+                    continue
+                seen_hashes_this_run.add(text_hash)
 
-            fetched_at = time.time()
+                fetched_at = result.get("fetched_at") or time.time()
 
-            prior_text_hash = merged.get("text_hash")
-            if prior_text_hash == text_hash:
-                unchanged_urls.append(url)
+                prior_text_hash = merged.get("text_hash")
+                if prior_text_hash == text_hash:
+                    unchanged_urls.append(url)
 
-            pack_pages.append(
-                {
+                page = {
                     "url": url,
-                    "title": title,
+                    "title": result["title"],
                     "normalized_text": normalized_text,
                     "text_hash": text_hash,
-                    "etag": response.headers.get("ETag"),
-                    "last_modified": response.headers.get("Last-Modified"),
+                    "etag": result["etag"],
+                    "last_modified": result["last_modified"],
                     "fetched_at": fetched_at,
                 }
-            )
+                pack_pages.append(page)
+                # Fresh local copies are already stored; everything else was
+                # downloaded or revalidated just now.
+                if not (result.get("from_store") and not result.get("not_modified")):
+                    pages_to_store.append(page)
 
         pack_hash = _stable_pack_hash(pack_pages)
-        expires_at = next_sunday_235959_timestamp(now)
 
+        # Later entries win, so rebuilt pages override their 304 bookkeeping.
         for page in pack_pages:
-            upsert_page_metadata(
-                domain,
-                page["url"],
-                pack_hash=pack_hash,
-                etag=page.get("etag"),
-                last_modified=page.get("last_modified"),
-                text_hash=page.get("text_hash"),
-                last_checked_at=now,
+            metadata_updates.append(
+                {
+                    "url": page["url"],
+                    "pack_hash": pack_hash,
+                    "etag": page.get("etag"),
+                    "last_modified": page.get("last_modified"),
+                    "text_hash": page.get("text_hash"),
+                    "last_checked_at": now,
+                }
             )
+        upsert_pages_metadata(domain, metadata_updates)
+        save_pages(domain, pages_to_store, now)
 
         if should_save_pack and pack_pages:
-            save_pack(domain, pack_pages, pack_hash, now, expires_at)
+            save_pack(domain, pack_pages, pack_hash, now)
 
         return False, pack_pages, unchanged_urls, errors
     finally:
-        session.close()
+        for session in sessions:
+            session.close()
         release_domain_lock(domain)